@@ -0,0 +1,92 @@
+"""Run the benchmarks, e.g.
+
+    python -m benchmarks --sizes 1k,100k --save benchmarks/baseline.json
+    python -m benchmarks --sizes 1k,100k --compare benchmarks/baseline.json
+
+Exits with status 1 when a benchmark is slower or uses more memory than the baseline by more
+than --threshold.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import sys
+import tempfile
+
+import django
+
+DEFAULT_SIZES = "1k,10k,100k"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help=f"Comma separated row counts, e.g. 1k,1M,10M (default {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "--only", default="", help="Comma separated benchmarks to run (default all)"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs of each")
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "book_explorer_benchmarks",
+        help="Where generated CSVs are kept between runs",
+    )
+    parser.add_argument("--save", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed growth in median time or peak memory (default 0.2, i.e. 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "book_explorer.settings")
+    django.setup()
+    from django.conf import settings
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from books.storage import reset_upload_file_managers
+
+    from . import bench_storage, bench_views  # noqa: F401, registers the benchmarks
+    from .data import dataset, parse_size
+    from .harness import BENCHMARKS, compare, format_table, measure, save
+
+    settings.BOOKS_STORAGE_BACKEND = "benchmarks.fake_s3.FakeS3UploadFileManager"
+    settings.BOOKS_CONTENT_ADDRESSED = False
+    reset_upload_file_managers()
+    # The detail benchmarks save BookFiles, so never touch the configured database
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    names = [name for name in args.only.split(",") if name] or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(
+            f"unknown benchmarks {sorted(unknown)}, choose from {list(BENCHMARKS)}"
+        )
+    results = []
+    print(format_table([]), flush=True)
+    for rows in (parse_size(size) for size in args.sizes.split(",")):
+        path = dataset(args.data_dir, rows)
+        for name in names:
+            results.append(measure(name, path, rows, args.repeat))
+            print(format_table(results[-1:]).splitlines()[-1], flush=True)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Benchmarks of the upload and retrieve paths of S3UploadFileManager, against FakeS3Client."""
+
+from pathlib import Path
+
+from books.storage import NullWriter, UploadPipeline, get_upload_file_manager
+
+from .harness import register
+
+
+@register("upload")
+def upload(path: Path, rows: int):
+    """Hash, validate and store a file, as the upload view does."""
+    manager = get_upload_file_manager()
+
+    def run():
+        with open(path, "rb") as f:
+            book_file = manager.upload(f, commit=False)
+        manager.delete(book_file)
+
+    return run
+
+
+@register("validate")
+def validate(path: Path, rows: int):
+    """Validate the header and every row in a single read, without storing anything."""
+    manager = get_upload_file_manager()
+
+    def run():
+        with open(path, "rb") as f:
+            UploadPipeline(NullWriter(), manager.CSV_HEADERS).consume(f)
+
+    return run
+
+
+@register("validate_parallel")
+def validate_parallel(path: Path, rows: int):
+    """Validate every row of a staged file in worker processes, as large uploads are."""
+    manager = get_upload_file_manager()
+    return lambda: manager.validate_file_rows(str(path))
+
+
+def _stored(path: Path):
+    manager = get_upload_file_manager()
+    with open(path, "rb") as f:
+        book_file = manager.upload(f, commit=False)
+    return manager, book_file
+
+
+@register("retrieve_first_page")
+def retrieve_first_page(path: Path, rows: int):
+    """Read the first page of rows of a stored file, as the detail view does."""
+    manager, book_file = _stored(path)
+    return lambda: manager.retrieve_rows(book_file, 0, 50)
+
+
+@register("retrieve_last_page")
+def retrieve_last_page(path: Path, rows: int):
+    """Read the last page of rows, which the row index should make as cheap as the first."""
+    manager, book_file = _stored(path)
+    return lambda: manager.retrieve_rows(book_file, max(rows - 50, 0), 50)
+
+
+@register("retrieve_all")
+def retrieve_all(path: Path, rows: int):
+    """Parse a whole stored file into CsvRows."""
+    manager, book_file = _stored(path)
+
+    def run():
+        body = manager.retrieve(book_file)
+        try:
+            manager.csv_file_object_to_dict(body)
+        finally:
+            body.close()
+
+    return run
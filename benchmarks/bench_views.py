@@ -0,0 +1,51 @@
+"""Benchmarks of the detail view, from the request to the rendered page, against
+FakeS3Client and the throwaway database set up by __main__."""
+
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from books.cache import get_parsed_csv_cache
+from books.models import BookFile
+from books.views import DETAIL_PAGE_SIZE, detail
+
+from .bench_storage import _stored
+from .harness import register
+
+
+def _saved(path: Path) -> BookFile:
+    """BookFile of a stored dataset, saved once and shared by the detail benchmarks."""
+    manager, book_file = _stored(path)
+    saved = BookFile.objects.filter(md5_checksum=book_file.md5_checksum).first()
+    if saved is None:
+        book_file.save()
+        return book_file
+    manager.delete(book_file)
+    return saved
+
+
+def _detail(path: Path, page: int):
+    book_file = _saved(path)
+    request = RequestFactory().get(f"/books/{book_file.pk}/", {"page": page})
+    request.user = User(username="benchmark")
+
+    def run():
+        # Each run reads storage, as the first view of a page does
+        get_parsed_csv_cache().clear()
+        response = detail(request, book_file.pk)
+        assert response.status_code == 200, response.status_code
+
+    return run
+
+
+@register("detail_first_page")
+def detail_first_page(path: Path, rows: int):
+    """Render the first page of a list through the detail view, its paginator and template."""
+    return _detail(path, 1)
+
+
+@register("detail_last_page")
+def detail_last_page(path: Path, rows: int):
+    """Render the last page, which the row index should make as cheap as the first."""
+    return _detail(path, max(-(-rows // DETAIL_PAGE_SIZE), 1))
@@ -0,0 +1,62 @@
+"""Synthetic book list CSVs for the benchmarks."""
+
+from pathlib import Path
+import csv
+import random
+
+HEADER = [
+    "Book title",
+    "Book Author",
+    "Date published",
+    "Unique identifer",
+    "Publisher name",
+]
+WORDS = (
+    "the a of and night house garden river secret last first lost city war "
+    "love winter summer empire shadow light stone king queen letters return"
+).split()
+
+
+def parse_size(text: str) -> int:
+    """Parse a row count such as 1000, 10k or 10M."""
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(text.rstrip("kKmM")) * multiplier
+
+
+def iter_rows(rows: int, seed: int = 0):
+    """Yield rows of the five CSV_HEADERS columns, the same rows for the same seed.
+
+    Authors and publishers come from small pools, as in real catalogs, and some titles hold
+    commas so are quoted.
+    """
+    rng = random.Random(seed)
+    authors = [f"{rng.choice(WORDS).title()} Author{n}" for n in range(5_000)]
+    publishers = [f"{rng.choice(WORDS).title()} Press {n}" for n in range(500)]
+    for n in range(rows):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        if n % 10 == 0:
+            title += ", volume " + str(n % 7 + 1)
+        yield [
+            title.capitalize(),
+            rng.choice(authors),
+            f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(1900, 2023)}",
+            f"978{n:010d}",
+            rng.choice(publishers),
+        ]
+
+
+def write_csv(path: Path, rows: int, seed: int = 0) -> Path:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        writer.writerows(iter_rows(rows, seed))
+    return path
+
+
+def dataset(directory: Path, rows: int) -> Path:
+    """Path of a CSV of rows rows, generated once and reused by later runs."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"books-{rows}.csv"
+    if not path.exists():
+        write_csv(path.with_suffix(".tmp"), rows).rename(path)
+    return path
@@ -0,0 +1,72 @@
+"""In-memory stand-in for the boto3 S3 client, so benchmarks measure the app and not the
+network. Only the calls S3UploadFileManager makes are implemented."""
+
+import io
+import uuid
+
+from botocore.client import ClientError
+
+from books.storage import S3UploadFileManager
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+        self.multipart_uploads = {}
+
+    def _missing(self, operation: str):
+        return ClientError(
+            {"Error": {"Code": "404", "Message": "Not Found"}}, operation
+        )
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._missing("HeadObject")
+        return {"ContentLength": len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objects:
+            raise self._missing("GetObject")
+        data = self.objects[Key]
+        if Range is not None:
+            start, _, end = Range[len("bytes=") :].partition("-")
+            data = data[int(start) : int(end) + 1 if end else None]
+        return {"Body": io.BytesIO(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = uuid.uuid4().hex
+        self.multipart_uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, PartNumber, UploadId, Body):
+        self.multipart_uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.multipart_uploads.pop(UploadId)
+        self.objects[Key] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.multipart_uploads.pop(UploadId, None)
+
+
+_client = FakeS3Client()
+
+
+class FakeS3UploadFileManager(S3UploadFileManager):
+    """BOOKS_STORAGE_BACKEND for benchmarks, sharing one FakeS3Client."""
+
+    @classmethod
+    def from_settings(cls) -> "FakeS3UploadFileManager":
+        return cls(client=_client)
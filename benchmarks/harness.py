@@ -0,0 +1,129 @@
+"""Timing, memory measurement and baseline comparison for the benchmarks."""
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+# name -> function(path, rows) returning a function run once per repeat, see register
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def register(name: str):
+    """Add a benchmark, a function of the dataset path and row count which prepares anything
+    not being measured and returns the function to time."""
+
+    def decorator(setup: Callable) -> Callable:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+@dataclass
+class Result:
+    benchmark: str
+    rows: int
+    bytes: int
+    repeat: int
+    p50: float
+    p90: float
+    p99: float
+    rows_per_second: float
+    mb_per_second: float
+    peak_memory_mb: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.benchmark}[{self.rows}]"
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Percentile of samples, interpolating between the two nearest."""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(name: str, path: Path, rows: int, repeat: int) -> Result:
+    """Time repeat runs of a benchmark, then run it once more under tracemalloc for its peak
+    memory, as tracing slows the code it measures."""
+    run = BENCHMARKS[name](path, rows)
+    run()  # Warm up imports and caches
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    size = path.stat().st_size
+    p50 = percentile(samples, 50)
+    return Result(
+        benchmark=name,
+        rows=rows,
+        bytes=size,
+        repeat=repeat,
+        p50=p50,
+        p90=percentile(samples, 90),
+        p99=percentile(samples, 99),
+        rows_per_second=rows / p50,
+        mb_per_second=size / p50 / 1024 / 1024,
+        peak_memory_mb=peak / 1024 / 1024,
+    )
+
+
+def save(results: List[Result], path: Path) -> None:
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.key: asdict(result) for result in results},
+    }
+    path.write_text(json.dumps(report, indent=2) + "\n")
+
+
+def compare(results: List[Result], path: Path, threshold: float) -> List[str]:
+    """Compare results with a saved baseline.
+
+    Returns:
+        List[str]: A description of each benchmark whose median time or peak memory grew by
+            more than threshold, e.g. 0.2 for 20%
+    """
+    baseline = json.loads(path.read_text())["results"]
+    regressions = []
+    for result in results:
+        before = baseline.get(result.key)
+        if before is None:
+            continue
+        for field in ("p50", "peak_memory_mb"):
+            old, new = before[field], getattr(result, field)
+            if old and (new - old) / old > threshold:
+                regressions.append(
+                    f"{result.key} {field} {old:.4g} -> {new:.4g} "
+                    f"(+{(new - old) / old:.0%})"
+                )
+    return regressions
+
+
+def format_table(results: List[Result]) -> str:
+    lines = [
+        f"{'benchmark':<32}{'p50 s':>10}{'p90 s':>10}{'p99 s':>10}"
+        f"{'rows/s':>12}{'MB/s':>9}{'peak MB':>9}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result.key:<32}{result.p50:>10.4f}{result.p90:>10.4f}{result.p99:>10.4f}"
+            f"{result.rows_per_second:>12,.0f}{result.mb_per_second:>9.1f}"
+            f"{result.peak_memory_mb:>9.1f}"
+        )
+    return "\n".join(lines)
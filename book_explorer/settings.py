@@ -9,12 +9,12 @@ https://docs.djangoproject.com/en/4.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
+
 import os
 import sys
 from pathlib import Path
 from django.contrib.messages import constants as messages
 
-
 MESSAGE_TAGS = {
     messages.DEBUG: "alert-secondary",
     messages.INFO: "alert-info",
@@ -62,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "books.metrics.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -148,3 +149,85 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Celery settings
 CELERY_BROKER_URL = "redis://localhost:6379"
 CELERY_RESULT_BACKEND = "redis://localhost:6379"
+
+# Parsed CSV cache, keyed on BookFile md5 checksum. MAX_ENTRIES bounds the in process LRU,
+# BACKEND optionally names a CACHES alias (e.g. Redis or file based) shared between workers.
+BOOKS_CSV_CACHE = {
+    "MAX_ENTRIES": 128,
+    "BACKEND": None,
+    "TIMEOUT": None,
+}
+
+# Uploads are saved here and processed by a Celery task when uploaded in async mode
+BOOKS_UPLOAD_STAGING_DIR = BASE_DIR / "staging"
+BOOKS_ASYNC_UPLOADS = False
+
+# Upload notifications. With BATCHING on, urls are collected in Redis and sent BATCH_SIZE at a
+# time, or BATCH_WINDOW seconds after the first url arrives. POOL_SIZE is per worker process.
+BOOKS_NOTIFICATIONS = {
+    "URL": "https://postman-echo.com/post",
+    "BATCHING": False,
+    "BATCH_SIZE": 100,
+    "BATCH_WINDOW": 10,
+    "POOL_SIZE": 10,
+}
+
+# S3 storage. One client is shared per process, with MAX_POOL_CONNECTIONS pooled connections.
+# The bucket is checked/created by `manage.py ensure_s3_bucket`, or at startup if enabled.
+BOOKS_S3 = {
+    "BUCKET_NAME": "jc1976bucket",
+    "REGION_NAME": "eu-west-1",
+    "MAX_POOL_CONNECTIONS": 10,
+    "ENSURE_BUCKET_ON_STARTUP": False,
+}
+
+# Number of files uploaded to S3 at once by the bulk upload endpoint
+BOOKS_BULK_UPLOAD_WORKERS = 8
+
+# "keyset" paginates the book list index by (date_uploaded, id) cursors, "offset" by page number
+BOOKS_INDEX_PAGINATION = "keyset"
+
+# Where uploads are stored: books.storage.S3UploadFileManager, LocalFileUploadFileManager
+# (files under BOOKS_LOCAL_STORAGE_ROOT, read through mmap) or InMemoryUploadFileManager
+BOOKS_STORAGE_BACKEND = "books.storage.S3UploadFileManager"
+BOOKS_LOCAL_STORAGE_ROOT = BASE_DIR / "storage"
+
+# Write a Parquet copy of each upload next to the CSV and read from it (needs pyarrow)
+BOOKS_COLUMNAR_SIDECAR = True
+
+# Row validation. At most MAX_ERRORS errors are reported per file. Staged files of at least
+# PARALLEL_THRESHOLD bytes are checked in CHUNK_SIZE pieces by WORKERS processes (None: all CPUs)
+BOOKS_VALIDATION = {
+    "MAX_ERRORS": 100,
+    "PARALLEL_THRESHOLD": 64 * 1024 * 1024,
+    "CHUNK_SIZE": 16 * 1024 * 1024,
+    "WORKERS": None,
+}
+
+# Name stored objects by the SHA-256 of their content instead of a random uuid, so uploading
+# the same bytes again only needs an existence check rather than a transfer
+BOOKS_CONTENT_ADDRESSED = False
+
+# Resumable uploads are sent in CHUNK_SIZE chunks, each stored as a multipart upload part, so it
+# must be at least 5 MB for S3. Up to MAX_PIPELINES uploads per process are hashed as they arrive
+BOOKS_CHUNKED_UPLOADS = {
+    "CHUNK_SIZE": 8 * 1024 * 1024,
+    "MAX_PIPELINES": 64,
+}
+
+# Route the detail and upload pages to their async views, for serving under ASGI. Their storage
+# calls run on a pool of BOOKS_ASYNC_STORAGE_WORKERS threads per process
+BOOKS_ASYNC_VIEWS = False
+BOOKS_ASYNC_STORAGE_WORKERS = 32
+
+# Cache-Control of CSV downloads. Uploads never change, so they can be cached for good; make it
+# "public" to let a shared cache or CDN in front of the app serve them
+BOOKS_DOWNLOAD_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Prometheus metrics served at /metrics when ENABLED. SERVER_TIMING adds a Server-Timing header
+# of the stages of each request. Celery pool processes serve theirs on WORKER_PORT + pool index
+BOOKS_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": False,
+    "WORKER_PORT": None,
+}
@@ -13,10 +13,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.contrib import admin
 from django.urls import include, path
 
+from books import views as books_views
+
 urlpatterns = [
     path("books/", include("books.urls", "django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("metrics", books_views.metrics, name="metrics"),
 ]
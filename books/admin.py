@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import BookFile
+from .models import Book, BookFile
 
 
 admin.site.register(BookFile)
+admin.site.register(Book)
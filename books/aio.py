@@ -0,0 +1,51 @@
+"""Support for the async views, which must not block the event loop on storage I/O.
+
+boto3 only has a blocking client, so storage calls from async views run on a bounded thread
+pool. One ASGI worker can then have many slow S3 fetches in flight at once, while the pool
+size caps how many connections they use. Database access stays on the async ORM, or
+sync_to_async for code that needs a transaction, so pool threads never hold DB connections.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable
+import asyncio
+import contextvars
+
+from django.conf import settings
+
+_executor_lock = Lock()
+_executor = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Thread pool of settings.BOOKS_ASYNC_STORAGE_WORKERS threads shared by the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BOOKS_ASYNC_STORAGE_WORKERS,
+                thread_name_prefix="books-storage",
+            )
+        return _executor
+
+
+def reset_blocking_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call, e.g. to boto3, on the storage thread pool and wait for it.
+
+    The call runs in a copy of the caller's context, so it is timed as part of the request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_blocking_executor(), partial(context.run, func, *args, **kwargs)
+    )
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BooksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "books"
+
+    def ready(self):
+        from .storage import get_upload_file_manager, s3_settings
+
+        if s3_settings()["ENSURE_BUCKET_ON_STARTUP"]:
+            get_upload_file_manager().ensure_bucket()
@@ -0,0 +1,166 @@
+"""Registering CSVs which are already in storage but have no BookFile, e.g. ones copied into the
+bucket directly.
+
+The backfill_storage command lists the bucket in key order and sends the keys to
+task_backfill_keys in batches. Each task hashes and validates its objects with the upload
+pipeline and inserts their BookFiles with one bulk_create. The command keeps at most
+concurrency batches in flight and moves the BackfillCheckpoint on as each batch finishes, in
+the order they were sent, so a restarted backfill carries on after the last finished batch.
+Tasks skip keys which are already registered, so batches finished after an interruption are
+harmless to send again.
+"""
+
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import time
+
+from botocore.client import ClientError
+
+from .models import BackfillCheckpoint, BookFile
+from .storage import CsvFileValidationError, UploadFileManagerInterface
+
+BACKFILL_BATCH_SIZE = 100
+# Validation messages kept in a batch's report
+MAX_REPORTED_ERRORS = 10
+
+
+def iter_key_batches(
+    manager: UploadFileManagerInterface,
+    prefix: str = "",
+    start_after: str = "",
+    batch_size: int = BACKFILL_BATCH_SIZE,
+) -> Iterator[List[str]]:
+    """Yield the keys of the CSVs in storage in sorted batches of batch_size."""
+    keys = (
+        key
+        for key in manager.list_keys(prefix, start_after)
+        if key.lower().endswith(".csv")
+    )
+    while batch := list(islice(keys, batch_size)):
+        yield batch
+
+
+def register_keys(
+    manager: UploadFileManagerInterface, keys: List[str]
+) -> Tuple[List[BookFile], Dict[str, Any]]:
+    """Build and bulk insert the BookFiles of stored objects.
+
+    Objects already registered, invalid CSVs, objects which can't be read, e.g. ones deleted
+    since they were listed, and copies of a registered file, by checksum, are skipped. Objects
+    are never deleted, as the app didn't store them.
+
+    Returns:
+        Tuple[List[BookFile], Dict[str, Any]]: The saved BookFiles, and counts of the registered,
+            skipped and invalid or unreadable objects with the first of their errors
+    """
+    urls = {manager.key_url(key): key for key in keys}
+    registered = set(
+        BookFile.objects.filter(s3_url__in=urls).values_list("s3_url", flat=True)
+    )
+    book_files, errors = [], []
+    invalid = 0
+    for url, key in urls.items():
+        if url in registered:
+            continue
+        try:
+            book_files.append(manager.build_book_file_for_key(key))
+        except (CsvFileValidationError, ClientError, OSError) as e:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"{key}: {e}")
+    existing = set(
+        BookFile.objects.filter(
+            md5_checksum__in=[book_file.md5_checksum for book_file in book_files]
+        ).values_list("md5_checksum", flat=True)
+    )
+    unique = {}
+    for book_file in book_files:
+        if book_file.md5_checksum not in existing:
+            unique.setdefault(book_file.md5_checksum, book_file)
+    # A file registered by a concurrent upload since the query above is skipped by the index
+    BookFile.objects.bulk_create(unique.values(), ignore_conflicts=True)
+    saved = list(
+        BookFile.objects.filter(
+            s3_url__in=[book_file.s3_url for book_file in unique.values()]
+        )
+    )
+    return saved, {
+        "registered": len(saved),
+        "skipped": len(keys) - len(saved) - invalid,
+        "invalid": invalid,
+        "errors": errors,
+    }
+
+
+class RateLimiter:
+    """Spread work out to at most rate items per second, None for no limit."""
+
+    def __init__(self, rate: float | None):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.items = 0
+
+    def wait(self, items: int) -> None:
+        if self.rate:
+            delay = self.started + self.items / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.items += items
+
+
+def run_backfill(
+    manager: UploadFileManagerInterface,
+    send_batch: Callable[[List[str]], Any],
+    prefix: str = "",
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    concurrency: int = 4,
+    rate: float | None = None,
+    restart: bool = False,
+    report: Callable[[BackfillCheckpoint, Dict[str, Any]], None] | None = None,
+) -> BackfillCheckpoint:
+    """Register every CSV in storage under prefix, resuming from its BackfillCheckpoint.
+
+    Args:
+        manager (UploadFileManagerInterface): Storage to list
+        send_batch (Callable[[List[str]], Any]): Starts a batch, returning a result whose get()
+            waits for its report, e.g. task_backfill_keys.delay
+        prefix (str): Only register keys starting with prefix
+        batch_size (int): Keys per batch
+        concurrency (int): Batches in flight at once
+        rate (float | None): Most keys sent per second
+        restart (bool): Start again from the first key
+        report (Callable | None): Called with the checkpoint and report of each finished batch
+
+    Returns:
+        BackfillCheckpoint: Checkpoint after the last batch
+    """
+    checkpoint, _ = BackfillCheckpoint.objects.get_or_create(prefix=prefix)
+    if restart:
+        checkpoint.last_key = ""
+        checkpoint.registered_count = checkpoint.skipped_count = 0
+        checkpoint.invalid_count = 0
+        checkpoint.save()
+    in_flight = deque()
+    limiter = RateLimiter(rate)
+
+    def finish_oldest():
+        result, last_key = in_flight.popleft()
+        batch_report = result.get()
+        checkpoint.last_key = last_key
+        checkpoint.registered_count += batch_report["registered"]
+        checkpoint.skipped_count += batch_report["skipped"]
+        checkpoint.invalid_count += batch_report["invalid"]
+        checkpoint.save()
+        if report is not None:
+            report(checkpoint, batch_report)
+
+    batches = iter_key_batches(manager, prefix, checkpoint.last_key, batch_size)
+    for keys in batches:
+        while in_flight and (len(in_flight) >= concurrency or in_flight[0][0].ready()):
+            finish_oldest()
+        limiter.wait(len(keys))
+        in_flight.append((send_batch(keys), keys[-1]))
+    while in_flight:
+        finish_oldest()
+    return checkpoint
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    """Thread safe, size bounded, least recently used in process cache."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ParsedCsvCache:
+    """Cache of parsed CSV rows keyed on BookFile.md5_checksum.
+
+    Uploaded files never change, so the checksum identifies the parsed rows exactly and entries
+    never need invalidating. Lookups try the in process LRU first, then the optional shared Django
+    cache (e.g. Redis or the file system, so other workers benefit), and only then call loader.
+    """
+
+    _MISSING = object()
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        backend_alias: str | None = None,
+        timeout: int | None = None,
+    ):
+        self.local = LRUCache(max_entries)
+        self.backend_alias = backend_alias
+        self.timeout = timeout
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.backend_alias] if self.backend_alias else None
+
+    def _key(self, md5_checksum: str, part: str) -> str:
+        return f"books:rows:{md5_checksum}:{part}"
+
+    def get_or_load(
+        self, md5_checksum: str, part: str, loader: Callable[[], Any]
+    ) -> Any:
+        """Return cached rows for part of the file with md5_checksum, loading them on a miss.
+
+        Args:
+            md5_checksum (str): BookFile.md5_checksum
+            part (str): Which rows of the file, e.g. "0:50" for a page
+            loader (Callable[[], Any]): Reads and parses the rows from storage
+
+        Returns:
+            Any: Parsed rows
+        """
+        if not md5_checksum:
+            return loader()
+        key = self._key(md5_checksum, part)
+        value = self.local.get(key, self._MISSING)
+        if value is not self._MISSING:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self.hits += 1
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        value = loader()
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, self.timeout)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "entries": len(self.local),
+        }
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.hits = self.shared_hits = self.misses = 0
+
+
+_parsed_csv_cache = None
+
+
+def get_parsed_csv_cache() -> ParsedCsvCache:
+    """Process wide ParsedCsvCache, configured by settings.BOOKS_CSV_CACHE."""
+    global _parsed_csv_cache
+    if _parsed_csv_cache is None:
+        config = getattr(settings, "BOOKS_CSV_CACHE", {})
+        _parsed_csv_cache = ParsedCsvCache(
+            max_entries=config.get("MAX_ENTRIES", 128),
+            backend_alias=config.get("BACKEND"),
+            timeout=config.get("TIMEOUT"),
+        )
+    return _parsed_csv_cache
@@ -0,0 +1,181 @@
+"""Resumable uploads, sent as numbered chunks over several requests.
+
+Each chunk is stored as soon as it arrives as the part of a multipart upload with the same
+number, so a dropped connection only loses the chunk in flight and the client resends whatever
+the status reports missing. Chunks which arrive in order are also fed to a
+ChunkedUploadPipeline kept in process, so when the upload is completed its BookFile is built
+without reading the data again. Pipelines are held in a bounded LRU; if a session's pipeline is
+missing or out of step at completion, the stored object is read back once instead.
+"""
+
+from operator import itemgetter
+from threading import Lock
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import LRUCache
+from .models import BookFile, UploadSession
+from .storage import (
+    ChunkedUploadPipeline,
+    CsvFileExistsError,
+    CsvFileValidationError,
+    UploadFileManagerInterface,
+)
+
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+def chunked_upload_settings() -> dict:
+    config = {
+        "CHUNK_SIZE": 8 * 1024 * 1024,
+        "MAX_PIPELINES": 64,
+    }
+    config.update(getattr(settings, "BOOKS_CHUNKED_UPLOADS", {}))
+    return config
+
+
+_pipelines = None
+
+
+def get_pipelines() -> LRUCache:
+    """(Lock, ChunkedUploadPipeline) of the sessions being uploaded to this process."""
+    global _pipelines
+    if _pipelines is None:
+        _pipelines = LRUCache(chunked_upload_settings()["MAX_PIPELINES"])
+    return _pipelines
+
+
+def reset_pipelines() -> None:
+    global _pipelines
+    _pipelines = None
+
+
+def _fail(session: UploadSession, message: str) -> None:
+    get_pipelines().pop(str(session.id))
+    session.status = UploadSession.Status.FAILED
+    session.status_message = message
+    session.save(update_fields=["status", "status_message"])
+
+
+def init_upload(
+    user, file_name: str, file_size: int, manager: UploadFileManagerInterface
+) -> UploadSession:
+    """Start a resumable upload of file_size bytes.
+
+    Raises:
+        ChunkedUploadError: file_size is not positive
+    """
+    if file_size <= 0:
+        raise ChunkedUploadError("File size must be greater than 0.")
+    key, upload_id = manager.start_chunked_upload()
+    session = UploadSession.objects.create(
+        user=user,
+        file_name=file_name[: UploadSession._meta.get_field("file_name").max_length],
+        file_size=file_size,
+        chunk_size=chunked_upload_settings()["CHUNK_SIZE"],
+        key=key,
+        upload_id=upload_id,
+    )
+    get_pipelines().set(
+        str(session.id), (Lock(), ChunkedUploadPipeline(manager.CSV_HEADERS))
+    )
+    return session
+
+
+def upload_chunk(
+    session: UploadSession,
+    part_number: int,
+    data: bytes,
+    manager: UploadFileManagerInterface,
+) -> None:
+    """Store chunk part_number of an upload, replacing it if it was already sent.
+
+    Raises:
+        ChunkedUploadError: Upload is not active, or the chunk is out of range or the wrong size
+        CsvFileValidationError: CSV headers or rows are invalid, the upload is failed
+    """
+    if session.status != UploadSession.Status.ACTIVE:
+        raise ChunkedUploadError(f"Upload is {session.get_status_display().lower()}.")
+    if not 1 <= part_number <= session.chunk_count:
+        raise ChunkedUploadError(
+            f"Chunk {part_number} should be between 1 and {session.chunk_count}."
+        )
+    expected_size = session.expected_chunk_size(part_number)
+    if len(data) != expected_size:
+        raise ChunkedUploadError(
+            f"Chunk {part_number} has {len(data)} bytes and should have {expected_size}."
+        )
+    etag = manager.upload_part(session.key, session.upload_id, part_number, data)
+    sent = {part["PartNumber"]: part["ETag"] for part in session.parts}
+    entry = get_pipelines().get(str(session.id))
+    if entry is not None:
+        lock, pipeline = entry
+        with lock:
+            if part_number == pipeline.chunks + 1:
+                try:
+                    pipeline.feed(data)
+                except CsvFileValidationError as e:
+                    manager.abort_multipart(session.key, session.upload_id)
+                    _fail(session, str(e))
+                    raise
+            elif sent.get(part_number) != etag:
+                # Out of order, or resent with other data, so can't be hashed in order
+                get_pipelines().pop(str(session.id))
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        locked.parts = [
+            part for part in locked.parts if part["PartNumber"] != part_number
+        ] + [{"PartNumber": part_number, "ETag": etag}]
+        locked.save(update_fields=["parts"])
+    session.parts = locked.parts
+
+
+def complete_upload(
+    session: UploadSession, manager: UploadFileManagerInterface
+) -> BookFile:
+    """Join the chunks of an upload into the stored file and save its BookFile.
+
+    Raises:
+        ChunkedUploadError: Upload is not active or chunks are missing
+        CsvFileValidationError: CSV headers or rows are invalid, the upload is failed
+        CsvFileExistsError: Existing File exists, the upload is failed
+    """
+    if session.status != UploadSession.Status.ACTIVE:
+        raise ChunkedUploadError(f"Upload is {session.get_status_display().lower()}.")
+    if session.missing_parts:
+        raise ChunkedUploadError(f"Chunks {session.missing_parts} are missing.")
+    pipeline = None
+    entry = get_pipelines().pop(str(session.id))
+    if entry is not None and entry[1].chunks == session.chunk_count:
+        pipeline = entry[1]
+    parts = sorted(session.parts, key=itemgetter("PartNumber"))
+    try:
+        book_file = manager.complete_chunked_upload(
+            session.file_name, session.key, session.upload_id, parts, pipeline
+        )
+        manager.save_or_discard(book_file)
+    except (CsvFileValidationError, CsvFileExistsError) as e:
+        _fail(session, str(e))
+        raise
+    session.status = UploadSession.Status.COMPLETE
+    session.book_file = book_file
+    session.save(update_fields=["status", "book_file"])
+    return book_file
+
+
+def session_report(session: UploadSession) -> dict:
+    return {
+        "id": str(session.id),
+        "status": session.status,
+        "message": session.status_message,
+        "file_name": session.file_name,
+        "file_size": session.file_size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "bytes_received": session.bytes_received,
+        "missing_chunks": session.missing_parts,
+        "book_file_id": session.book_file_id,
+    }
@@ -0,0 +1,192 @@
+"""Exports of the rows of a book list matching filters, with only the columns asked for, as
+CSV or NDJSON.
+
+Rows are read from the stored file as they are streamed out, so memory is bounded by
+EXPORT_BUFFER_SIZE whatever the size of the file, and the first line goes out before the rest
+of the file is read.
+"""
+
+from datetime import date
+from itertools import chain
+from typing import IO, Callable, Iterator, List, NamedTuple
+import csv
+import io
+import json
+
+from .storage import iter_decoded_lines, iter_file_chunks
+from .validation import parse_date_published
+
+# Query parameter names of the CSV_HEADERS columns
+EXPORT_FIELDS = {
+    "title": "BOOK TITLE",
+    "author": "BOOK AUTHOR",
+    "published": "DATE PUBLISHED",
+    "identifier": "UNIQUE IDENTIFER",
+    "publisher": "PUBLISHER NAME",
+}
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+# Rows are written out in pieces of about this many characters
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+class ExportError(Exception):
+    pass
+
+
+def _date(value: str) -> date:
+    parsed = parse_date_published(value)
+    if parsed is None:
+        raise ExportError(f"'{value}' is not a date.")
+    return parsed
+
+
+class Predicate(NamedTuple):
+    column: str
+    test: Callable[[str], bool]
+
+
+def _predicate(field: str, lookup: str, values: List[str]) -> Predicate:
+    """Test of one column, e.g. ("publisher", "exact", ["Penguin", "Puffin"]) is true of rows
+    published by either.
+
+    Lookups are exact and contains, matching any of the values ignoring case and surrounding
+    spaces, and gte and lte, comparing dates, for published only.
+    """
+    column = EXPORT_FIELDS[field]
+    if lookup in ("exact", "contains"):
+        wanted = [value.strip().casefold() for value in values]
+        if lookup == "exact":
+            return Predicate(column, lambda v: v.strip().casefold() in wanted)
+        return Predicate(column, lambda v: any(w in v.casefold() for w in wanted))
+    if lookup in ("gte", "lte") and field == "published":
+        bound = _date(values[-1])
+
+        def test(value: str) -> bool:
+            published = parse_date_published(value)
+            if published is None:
+                return False
+            return published >= bound if lookup == "gte" else published <= bound
+
+        return Predicate(column, test)
+    raise ExportError(f"Unsupported filter {field}__{lookup}.")
+
+
+class ExportQuery(NamedTuple):
+    format: str
+    # CSV_HEADERS columns to output, in order, None for every column of the file
+    columns: List[str] | None
+    predicates: List[Predicate]
+
+    @classmethod
+    def from_params(cls, params) -> "ExportQuery":
+        """Parse export query parameters, e.g.
+        ?format=ndjson&columns=title,author&publisher=Penguin&published__gte=1980-01-01
+
+        Args:
+            params (QueryDict): Request query parameters
+
+        Raises:
+            ExportError: Unknown format, column or filter
+        """
+        export_format = params.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(
+                f"Unsupported format {export_format}, use one of {', '.join(EXPORT_FORMATS)}."
+            )
+        columns = None
+        if params.get("columns"):
+            fields = [field.strip() for field in params["columns"].split(",")]
+            unknown = [field for field in fields if field not in EXPORT_FIELDS]
+            if unknown:
+                raise ExportError(f"Unknown columns {', '.join(unknown)}.")
+            columns = [EXPORT_FIELDS[field] for field in fields]
+        predicates = []
+        for key in params:
+            if key in ("format", "columns"):
+                continue
+            field, _, lookup = key.partition("__")
+            if field not in EXPORT_FIELDS:
+                raise ExportError(f"Unknown filter {key}.")
+            predicates.append(_predicate(field, lookup or "exact", params.getlist(key)))
+        return cls(export_format, columns, predicates)
+
+
+def _csv_lines(header: List[str], rows: Iterator[List[str]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([header], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson_lines(header: List[str], rows: Iterator[List[str]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False) + "\n"
+
+
+def iter_export(
+    body: IO, query: ExportQuery, buffer_size: int = EXPORT_BUFFER_SIZE
+) -> Iterator[bytes]:
+    """Stream the rows of a stored CSV matching query, closing body once done.
+
+    The header is read and checked before returning, so a bad query fails before a response
+    is started. The first line is sent as soon as it is found, so a client sees the response
+    start, then lines are sent buffer_size characters at a time.
+
+    Raises:
+        ExportError: The file has no column for one of the query's columns or filters
+    """
+    try:
+        reader = csv.reader(iter_decoded_lines(iter_file_chunks(body)))
+        file_header = next(reader, [])
+        positions = {column.upper(): index for index, column in enumerate(file_header)}
+        columns = query.columns or [column.upper() for column in file_header]
+        missing = {
+            column
+            for column in columns + [predicate.column for predicate in query.predicates]
+            if column not in positions
+        }
+        if missing:
+            raise ExportError(f"File has no {', '.join(sorted(missing))} column.")
+    except Exception:
+        body.close()
+        raise
+    indexes = [positions[column] for column in columns]
+    tests = [
+        (positions[predicate.column], predicate.test) for predicate in query.predicates
+    ]
+    width = len(file_header)
+    rows = (
+        [row[index] for index in indexes]
+        for row in reader
+        if len(row) == width and all(test(row[index]) for index, test in tests)
+    )
+    header = [file_header[index] for index in indexes]
+    if query.format == "csv":
+        lines = _csv_lines(header, rows)
+    else:
+        lines = _ndjson_lines(header, rows)
+    return _iter_buffered(body, lines, buffer_size)
+
+
+def _iter_buffered(body: IO, lines: Iterator[str], buffer_size: int) -> Iterator[bytes]:
+    try:
+        for line in lines:
+            yield line.encode("utf-8")
+            break
+        pending, size = [], 0
+        for line in lines:
+            pending.append(line)
+            size += len(line)
+            if size >= buffer_size:
+                yield "".join(pending).encode("utf-8")
+                pending, size = [], 0
+        if pending:
+            yield "".join(pending).encode("utf-8")
+    finally:
+        body.close()
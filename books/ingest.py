@@ -0,0 +1,86 @@
+from itertools import islice
+import hashlib
+from typing import Any, Dict
+
+from django.db import transaction
+
+from . import models
+from .storage import UploadFileManagerInterface
+from .validation import parse_date_published
+
+INGEST_BATCH_SIZE = 1000
+
+
+def row_hash(row: Dict[str, str]) -> str:
+    """Digest of the values of a row keyed by upper case header, for finding repeated rows."""
+    key = "\x1f".join(
+        row[header].strip() for header in UploadFileManagerInterface.CSV_HEADERS
+    )
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def count_overlapping_rows(book_file: models.BookFile) -> int:
+    """Count the imported rows of book_file which are also rows of another list."""
+    others = models.Book.objects.exclude(book_file=book_file).values("row_hash")
+    return models.Book.objects.filter(book_file=book_file, row_hash__in=others).count()
+
+
+def book_from_row(
+    book_file: models.BookFile, row_number: int, row: Dict[str, Any]
+) -> models.Book:
+    """Build an unsaved Book from a CSV row, matching headers case insensitively."""
+    row = {header.upper(): (value or "") for header, value in row.items()}
+    return models.Book(
+        book_file=book_file,
+        row_number=row_number,
+        author=row["BOOK AUTHOR"][:255],
+        title=row["BOOK TITLE"][:255],
+        date_published=parse_date_published(row["DATE PUBLISHED"]),
+        publisher=row["PUBLISHER NAME"][:255],
+        unique_identifier=row["UNIQUE IDENTIFER"][:100],
+        row_hash=row_hash(row),
+    )
+
+
+def ingest_book_file(
+    book_file: models.BookFile,
+    manager: UploadFileManagerInterface,
+    batch_size: int = INGEST_BATCH_SIZE,
+) -> int:
+    """Import the rows of an uploaded file into the Book table.
+
+    Rows are streamed from storage and inserted with bulk_create in batches, so memory stays
+    bounded by batch_size. Any rows already imported for the file are replaced, so the import
+    can safely be retried. Afterwards the rows also found in other lists are counted into
+    book_file.overlapping_row_count.
+
+    The delete and each batch are committed in their own short transaction, so SQLite's write
+    lock is never held while rows are read from storage. Until the import finishes only some
+    of the file's rows are in the table.
+
+    Args:
+        book_file (models.BookFile): Uploaded file to import
+        manager (UploadFileManagerInterface): Storage the file was uploaded to
+        batch_size (int): Number of rows per INSERT
+
+    Returns:
+        int: Number of rows imported
+    """
+    body = manager.retrieve(book_file)
+    books = (
+        book_from_row(book_file, row_number, row)
+        for row_number, row in enumerate(manager.iter_csv_rows(body))
+    )
+    count = 0
+    try:
+        with transaction.atomic():
+            models.Book.objects.filter(book_file=book_file).delete()
+        while batch := list(islice(books, batch_size)):
+            with transaction.atomic():
+                models.Book.objects.bulk_create(batch)
+            count += len(batch)
+        book_file.overlapping_row_count = count_overlapping_rows(book_file)
+        book_file.save(update_fields=["overlapping_row_count"])
+    finally:
+        body.close()
+    return count
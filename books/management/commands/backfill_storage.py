@@ -0,0 +1,66 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from books.backfill import BACKFILL_BATCH_SIZE, run_backfill
+from books.storage import get_upload_file_manager
+from books.tasks import task_backfill_keys
+
+
+class Command(BaseCommand):
+    help = (
+        "Register the CSVs in the S3 bucket (or other storage) which have no BookFile, in "
+        "batches processed by Celery workers. Resumes where an interrupted run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="", help="Only keys starting with this")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BACKFILL_BATCH_SIZE,
+            help="Keys per task, and BookFiles per bulk insert",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Tasks in flight at once"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=None, help="Most keys sent per second"
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and start from the first key",
+        )
+        parser.add_argument(
+            "--no-follow-up",
+            action="store_false",
+            dest="follow_up",
+            help="Don't notify, import rows or build sidecars for registered files",
+        )
+
+    def report(self, checkpoint, batch_report):
+        self.stdout.write(
+            f"Up to {checkpoint.last_key}: {batch_report['registered']} registered, "
+            f"{batch_report['skipped']} skipped, {batch_report['invalid']} invalid."
+        )
+        for error in batch_report["errors"]:
+            self.stderr.write(error)
+
+    def handle(self, *args, **options):
+        checkpoint = run_backfill(
+            get_upload_file_manager(),
+            partial(task_backfill_keys.delay, follow_up=options["follow_up"]),
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+            restart=options["restart"],
+            report=self.report,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfill complete: {checkpoint.registered_count} registered, "
+                f"{checkpoint.skipped_count} skipped, {checkpoint.invalid_count} invalid."
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from books.storage import get_upload_file_manager
+
+
+class Command(BaseCommand):
+    help = "Create the S3 bucket (or other storage) book lists are uploaded to, if it doesn't exist."
+
+    def handle(self, *args, **options):
+        manager = get_upload_file_manager()
+        manager.ensure_bucket()
+        self.stdout.write(
+            self.style.SUCCESS(f"{type(manager).__name__} storage is ready.")
+        )
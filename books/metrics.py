@@ -0,0 +1,348 @@
+"""Counters and timers of the upload and retrieve paths, exposed in the Prometheus text format
+by the metrics view and per request in an optional Server-Timing header.
+
+Metrics are kept in process, so each process reports its own and Prometheus sums them across
+the processes it scrapes. Web processes serve them at /metrics; Celery worker processes serve
+them on a port of their own when BOOKS_METRICS["WORKER_PORT"] is set, see start_http_server.
+Stage timings of the request being
+handled are also collected in a context variable, which ServerTimingMiddleware sets up and
+turns into the Server-Timing header when BOOKS_METRICS["SERVER_TIMING"] is on.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Callable, Dict, Iterator, List, Tuple
+import bisect
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Seconds, from a cached page read to a large upload
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def metrics_settings() -> dict:
+    config = {
+        "ENABLED": True,
+        "SERVER_TIMING": False,
+        "WORKER_PORT": None,
+    }
+    config.update(getattr(settings, "BOOKS_METRICS", {}))
+    return config
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> ([count per bucket, the last for +Inf], sum)
+        self._values: Dict[Labels, Tuple[List[int], float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(tuple(sorted(labels.items())), ([], 0))
+        return sum(counts)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(c), s)) for key, (c, s) in self._values.items())
+        lines = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket = _format_labels(labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Registry:
+    """Metrics of the process, and callbacks reporting values kept elsewhere, such as the
+    hit counts of the parsed CSV cache."""
+
+    def __init__(self):
+        self.metrics: List[Counter | Histogram] = []
+        # (name, type, documentation, callback returning {labels: value})
+        self.callbacks: List[
+            Tuple[str, str, str, Callable[[], Dict[Labels, float]]]
+        ] = []
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        metric = Counter(name, documentation)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        metric_type: str,
+        documentation: str,
+        callback: Callable[[], Dict[Labels, float]],
+    ) -> None:
+        self.callbacks.append((name, metric_type, documentation, callback))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            metric_type = "counter" if isinstance(metric, Counter) else "histogram"
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric_type}")
+            lines.extend(metric.collect())
+        for name, metric_type, documentation, callback in self.callbacks:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(
+                f"{name}{_format_labels(labels)} {_format_value(value)}"
+                for labels, value in sorted(callback().items())
+            )
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "books_stage_seconds",
+    "Time spent in each stage of handling an upload or reading a file.",
+)
+BYTES_READ = REGISTRY.counter(
+    "books_bytes_read_total", "Bytes of CSV read by upload pipelines."
+)
+ROWS_PARSED = REGISTRY.counter(
+    "books_rows_parsed_total", "CSV rows parsed by upload pipelines."
+)
+S3_REQUEST_SECONDS = REGISTRY.histogram(
+    "books_s3_request_seconds",
+    "Latency of S3 API calls, until the response headers arrive.",
+)
+S3_ERRORS = REGISTRY.counter("books_s3_errors_total", "S3 API calls which failed.")
+TASK_RETRIES = REGISTRY.counter(
+    "books_task_retries_total", "Celery task retries, by task name."
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "books_request_seconds", "Time to build the response of each route."
+)
+
+
+def _csv_cache_stats() -> Dict[Labels, float]:
+    from .cache import get_parsed_csv_cache
+
+    stats = get_parsed_csv_cache().stats()
+    return {
+        (("result", "hit"),): stats["hits"] - stats["shared_hits"],
+        (("result", "shared_hit"),): stats["shared_hits"],
+        (("result", "miss"),): stats["misses"],
+    }
+
+
+REGISTRY.callback(
+    "books_csv_cache_requests_total",
+    "counter",
+    "Lookups of parsed CSV pages, by where they were found.",
+    _csv_cache_stats,
+)
+
+# Stage timings of the current request, [(stage, seconds)], None outside ServerTimingMiddleware
+_request_timings: ContextVar[List[Tuple[str, float]] | None] = ContextVar(
+    "books_request_timings", default=None
+)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record the duration of a stage, timed by the caller."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """Time the block as stage, whether or not it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def _s3_before_call(context, **kwargs) -> None:
+    context["books_start"] = time.perf_counter()
+
+
+def _s3_after_call(model, context, **kwargs) -> None:
+    start = context.pop("books_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    S3_REQUEST_SECONDS.observe(seconds, operation=model.name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append(("s3", seconds))
+
+
+def _s3_after_call_error(model, context, **kwargs) -> None:
+    S3_ERRORS.inc(operation=model.name)
+    _s3_after_call(model, context)
+
+
+def instrument_s3_client(client) -> None:
+    """Time every API call of a boto3 S3 client through its event hooks."""
+    events = client.meta.events
+    events.register("before-call.s3", _s3_before_call)
+    events.register("after-call.s3", _s3_after_call)
+    events.register("after-call-error.s3", _s3_after_call_error)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, address: str = "") -> ThreadingHTTPServer:
+    """Serve the metrics of a process without Django views, e.g. a Celery worker, from a
+    daemon thread."""
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    Thread(target=server.serve_forever, daemon=True, name="books-metrics").start()
+    return server
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing value of the stages of a request, summing repeated stages, e.g.
+    "validate;dur=12.5, s3;dur=40.1, total;dur=60.2"."""
+    durations: Dict[str, float] = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0) + seconds
+    durations["total"] = total
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in durations.items()
+    )
+
+
+class ServerTimingMiddleware:
+    """Time each request for books_request_seconds, collecting the stage timings of the request
+    for the Server-Timing header when BOOKS_METRICS["SERVER_TIMING"] is on."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _request_timings.set([])
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, start)
+        finally:
+            _request_timings.reset(token)
+
+    async def __acall__(self, request):
+        token = _request_timings.set([])
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, start)
+        finally:
+            _request_timings.reset(token)
+
+    def _finish(self, request, response, start: float):
+        total = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        # The route, e.g. "books/<int:pk>/", as ids would make a label value per file
+        route = match.route if match is not None else "unmatched"
+        REQUEST_SECONDS.observe(total, route=route)
+        if metrics_settings()["SERVER_TIMING"]:
+            response["Server-Timing"] = server_timing_header(
+                _request_timings.get(), total
+            )
+        return response
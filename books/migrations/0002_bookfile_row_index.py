@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookfile",
+            name="row_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="bookfile",
+            name="row_index",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_bookfile_row_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Book",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("row_number", models.PositiveIntegerField()),
+                ("author", models.CharField(max_length=255)),
+                ("title", models.CharField(max_length=255)),
+                (
+                    "date_published",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="date published"
+                    ),
+                ),
+                ("publisher", models.CharField(max_length=255)),
+                ("unique_identifier", models.CharField(blank=True, max_length=100)),
+                (
+                    "book_file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="books",
+                        to="books.bookfile",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["author"], name="books_book_author_b941fe_idx"
+                    ),
+                    models.Index(fields=["title"], name="books_book_title_d3218d_idx"),
+                    models.Index(
+                        fields=["unique_identifier"],
+                        name="books_book_unique__bf74f1_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+FTS_COLUMNS = "title, author, publisher, unique_identifier"
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE books_book_fts USING fts5(
+        {FTS_COLUMNS}, content='books_book', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER books_book_fts_insert AFTER INSERT ON books_book BEGIN
+        INSERT INTO books_book_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.title, new.author, new.publisher, new.unique_identifier);
+    END""",
+    f"""CREATE TRIGGER books_book_fts_delete AFTER DELETE ON books_book BEGIN
+        INSERT INTO books_book_fts(books_book_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.author, old.publisher, old.unique_identifier);
+    END""",
+    f"""CREATE TRIGGER books_book_fts_update AFTER UPDATE ON books_book BEGIN
+        INSERT INTO books_book_fts(books_book_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.author, old.publisher, old.unique_identifier);
+        INSERT INTO books_book_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.title, new.author, new.publisher, new.unique_identifier);
+    END""",
+    "INSERT INTO books_book_fts(books_book_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS books_book_fts_update",
+    "DROP TRIGGER IF EXISTS books_book_fts_delete",
+    "DROP TRIGGER IF EXISTS books_book_fts_insert",
+    "DROP TABLE IF EXISTS books_book_fts",
+]
+
+
+def run_on_sqlite(statements):
+    """FTS5 is SQLite only, other databases use the fallback in books.search."""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0003_book"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookfile",
+            name="bytes_processed",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="bookfile",
+            name="file_size",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="bookfile",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("complete", "Complete"),
+                    ("failed", "Failed"),
+                ],
+                default="complete",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookfile",
+            name="status_message",
+            field=models.TextField(blank=True),
+        ),
+    ]
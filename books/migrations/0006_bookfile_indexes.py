@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:50
+
+from django.db import migrations, models
+
+
+def delete_duplicate_checksums(apps, schema_editor):
+    """Keep only the first uploaded BookFile of each checksum, so the unique constraint can be
+    added. Concurrent uploads of the same file could both have passed the old existence check.
+    The Books imported for a deleted duplicate are the same rows as the kept file's, so are
+    deleted with it."""
+    BookFile = apps.get_model("books", "BookFile")
+    duplicated = (
+        BookFile.objects.exclude(md5_checksum="")
+        .values("md5_checksum")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for row in list(duplicated):
+        ids = list(
+            BookFile.objects.filter(md5_checksum=row["md5_checksum"])
+            .order_by("date_uploaded", "id")
+            .values_list("id", flat=True)
+        )
+        BookFile.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_bookfile_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bookfile",
+            name="date_uploaded",
+            field=models.DateTimeField(db_index=True, verbose_name="date uploaded"),
+        ),
+        migrations.AlterField(
+            model_name="bookfile",
+            name="s3_url",
+            field=models.URLField(db_index=True),
+        ),
+        migrations.RunPython(delete_duplicate_checksums, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="bookfile",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("md5_checksum", ""), _negated=True),
+                fields=("md5_checksum",),
+                name="books_bookfile_unique_md5_checksum",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0006_bookfile_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bookfile",
+            name="date_uploaded",
+            field=models.DateTimeField(verbose_name="date uploaded"),
+        ),
+        migrations.AddIndex(
+            model_name="bookfile",
+            index=models.Index(
+                fields=["date_uploaded", "id"], name="books_bookfile_date_id_idx"
+            ),
+        ),
+    ]
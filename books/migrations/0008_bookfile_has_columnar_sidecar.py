@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0007_bookfile_date_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookfile",
+            name="has_columnar_sidecar",
+            field=models.BooleanField(default=False),
+        ),
+    ]
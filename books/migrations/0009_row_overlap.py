@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:01
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module("books.migrations.0004_book_fts")
+
+# SQLite adds the column by rebuilding books_book, which drops the FTS triggers on it
+RECREATE_TRIGGERS_SQL = fts.DROP_SQL[:3] + fts.CREATE_SQL[1:]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0008_bookfile_has_columnar_sidecar"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, fts.run_on_sqlite(RECREATE_TRIGGERS_SQL)
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="row_hash",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="bookfile",
+            name="overlapping_row_count",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["row_hash"], name="books_book_row_has_fe145c_idx"
+            ),
+        ),
+        migrations.RunPython(
+            fts.run_on_sqlite(RECREATE_TRIGGERS_SQL), migrations.RunPython.noop
+        ),
+    ]
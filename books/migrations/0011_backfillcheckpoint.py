@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0010_uploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackfillCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(blank=True, max_length=255, unique=True)),
+                ("last_key", models.CharField(blank=True, max_length=1024)),
+                ("registered_count", models.PositiveIntegerField(default=0)),
+                ("skipped_count", models.PositiveIntegerField(default=0)),
+                ("invalid_count", models.PositiveIntegerField(default=0)),
+                (
+                    "date_updated",
+                    models.DateTimeField(auto_now=True, verbose_name="date updated"),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0011_backfillcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookfile",
+            name="summary",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,11 +1,174 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
 
 class BookFile(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETE = "complete", "Complete"
+        FAILED = "failed", "Failed"
+
     file_name = models.CharField(max_length=100)
-    s3_url = models.URLField(max_length=200)
+    s3_url = models.URLField(max_length=200, db_index=True)
     date_uploaded = models.DateTimeField("date uploaded")
     md5_checksum = models.CharField(max_length=50)
+    row_count = models.PositiveIntegerField(default=0)
+    # Byte offsets of every n'th row, written at upload so pages can be read by byte range
+    row_index = models.JSONField(default=dict, blank=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    # Uploads processed by a Celery task report progress here until they are complete
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.COMPLETE
+    )
+    status_message = models.TextField(blank=True)
+    bytes_processed = models.PositiveBigIntegerField(default=0)
+    # Set once a Parquet copy of the CSV is stored next to it, see books.columnar
+    has_columnar_sidecar = models.BooleanField(default=False)
+    # Rows also found in other lists, counted by matching Book.row_hash once rows are imported
+    overlapping_row_count = models.PositiveIntegerField(null=True, blank=True)
+    # Counts of authors, publishers and publication years, see books.summary
+    summary = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the index page walks this index
+            models.Index(
+                fields=["date_uploaded", "id"], name="books_bookfile_date_id_idx"
+            ),
+        ]
+        constraints = [
+            # Duplicate uploads are rejected by this index, pending uploads have no checksum yet
+            models.UniqueConstraint(
+                fields=["md5_checksum"],
+                condition=~models.Q(md5_checksum=""),
+                name="books_bookfile_unique_md5_checksum",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.file_name} - {self.md5_checksum}"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.status == self.Status.COMPLETE
+
+    @property
+    def progress_percent(self) -> int:
+        if self.is_complete:
+            return 100
+        if not self.file_size:
+            return 0
+        return min(100, self.bytes_processed * 100 // self.file_size)
+
+    @property
+    def overlap_percent(self) -> int | None:
+        if self.overlapping_row_count is None:
+            return None
+        if not self.row_count:
+            return 0
+        return self.overlapping_row_count * 100 // self.row_count
+
+
+class Book(models.Model):
+    """One row of an uploaded BookFile, imported so lists can be queried without reading S3."""
+
+    book_file = models.ForeignKey(
+        BookFile, on_delete=models.CASCADE, related_name="books"
+    )
+    # Position of the row in the CSV, not counting the header
+    row_number = models.PositiveIntegerField()
+    author = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    date_published = models.DateField("date published", null=True, blank=True)
+    publisher = models.CharField(max_length=255)
+    unique_identifier = models.CharField(max_length=100, blank=True)
+    # Digest of the row's values, the same for a row repeated in any list
+    row_hash = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["author"]),
+            models.Index(fields=["title"]),
+            models.Index(fields=["unique_identifier"]),
+            models.Index(fields=["row_hash"]),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.author}"
+
+
+class UploadSession(models.Model):
+    """A resumable upload, sent as numbered chunks which are stored as multipart upload parts."""
+
+    class Status(models.TextChoices):
+        ACTIVE = "active", "Active"
+        COMPLETE = "complete", "Complete"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    file_name = models.CharField(max_length=100)
+    file_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Storage key and multipart upload id the chunks are stored under
+    key = models.CharField(max_length=200)
+    upload_id = models.CharField(max_length=255)
+    # {"PartNumber": n, "ETag": etag} of each chunk received, in the order received
+    parts = models.JSONField(default=list, blank=True)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.ACTIVE
+    )
+    status_message = models.TextField(blank=True)
+    book_file = models.OneToOneField(
+        BookFile, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    date_created = models.DateTimeField("date created", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.file_name} - {self.status}"
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.file_size // self.chunk_size))
+
+    def expected_chunk_size(self, part_number: int) -> int:
+        if part_number < self.chunk_count:
+            return self.chunk_size
+        return self.file_size - (self.chunk_count - 1) * self.chunk_size
+
+    @property
+    def received_parts(self) -> list:
+        return sorted(part["PartNumber"] for part in self.parts)
+
+    @property
+    def bytes_received(self) -> int:
+        return sum(self.expected_chunk_size(n) for n in self.received_parts)
+
+    @property
+    def missing_parts(self) -> list:
+        received = set(self.received_parts)
+        return [n for n in range(1, self.chunk_count + 1) if n not in received]
+
+
+class BackfillCheckpoint(models.Model):
+    """Progress of registering the objects already in storage under prefix, see the
+    backfill_storage command. Keys are registered in sorted order, so one key marks how far
+    an interrupted backfill got."""
+
+    prefix = models.CharField(max_length=255, unique=True, blank=True)
+    # Every key up to and including this one has been registered or skipped
+    last_key = models.CharField(max_length=1024, blank=True)
+    registered_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    date_updated = models.DateTimeField("date updated", auto_now=True)
+
+    def __str__(self):
+        return f"{self.prefix or '(all)'} - {self.last_key}"
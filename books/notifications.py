@@ -0,0 +1,95 @@
+from typing import List
+
+from django.conf import settings
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+
+NOTIFICATION_URL = "https://postman-echo.com/post"
+
+_session = None
+_redis = None
+
+
+def get_notification_session() -> requests.Session:
+    """requests.Session shared by the notification tasks of one worker process, so connections
+    to the notification endpoint are pooled and kept alive between tasks."""
+    global _session
+    if _session is None:
+        pool_size = notification_settings()["POOL_SIZE"]
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def get_notification_redis() -> redis.Redis:
+    """Redis client shared by the NotificationBuffers of one process, so every upload reuses
+    its connection pool rather than opening a new one."""
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(notification_settings()["REDIS_URL"])
+    return _redis
+
+
+def reset_notification_session() -> None:
+    """Drop the session and Redis client, e.g. in a newly forked worker which must not share
+    its parent's sockets."""
+    global _session, _redis
+    _session = None
+    _redis = None
+
+
+def notification_settings() -> dict:
+    config = {
+        "URL": NOTIFICATION_URL,
+        "BATCHING": False,
+        "BATCH_SIZE": 100,
+        "BATCH_WINDOW": 10,
+        "POOL_SIZE": 10,
+        "REDIS_URL": settings.CELERY_BROKER_URL,
+    }
+    config.update(getattr(settings, "BOOKS_NOTIFICATIONS", {}))
+    return config
+
+
+class NotificationBuffer:
+    """Redis list of S3 urls waiting to be sent in the next notification batch.
+
+    Redis is already the Celery broker, and keeping the buffer there lets every web and worker
+    process add to the same batch.
+    """
+
+    KEY = "books:notifications:pending"
+    FLUSH_KEY = "books:notifications:flush-scheduled"
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+
+    @classmethod
+    def from_settings(cls) -> "NotificationBuffer":
+        return cls(get_notification_redis())
+
+    def push(self, s3_url: str) -> int:
+        """Add a url to the batch, returning how many urls are now waiting."""
+        return self.client.rpush(self.KEY, s3_url)
+
+    def pop(self, count: int) -> List[str]:
+        """Atomically take up to count urls from the front of the batch."""
+        pipeline = self.client.pipeline()
+        pipeline.lrange(self.KEY, 0, count - 1)
+        pipeline.ltrim(self.KEY, count, -1)
+        urls, _ = pipeline.execute()
+        return [url.decode("utf-8") for url in urls]
+
+    def pending(self) -> int:
+        return self.client.llen(self.KEY)
+
+    def claim_flush(self, window: int) -> bool:
+        """Return True if no flush is scheduled for the current window, marking one scheduled."""
+        return bool(self.client.set(self.FLUSH_KEY, 1, nx=True, ex=window * 2))
+
+    def release_flush(self) -> None:
+        self.client.delete(self.FLUSH_KEY)
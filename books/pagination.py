@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from django.db.models import Q, QuerySet
+
+
+def encode_cursor(date_uploaded: datetime, pk: int, direction: str) -> str:
+    """Opaque token for the page after ("next") or before ("previous") the given row."""
+    data = json.dumps([date_uploaded.isoformat(), pk, direction]).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int, str] | None:
+    """Inverse of encode_cursor, returning None for a missing or tampered token."""
+    try:
+        date_uploaded, pk, direction = json.loads(base64.urlsafe_b64decode(token))
+        if direction not in ("next", "previous"):
+            return None
+        return datetime.fromisoformat(date_uploaded), int(pk), direction
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """Page of a KeysetPaginator, with tokens for the pages either side instead of numbers."""
+
+    is_keyset = True
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        has_next: bool,
+        has_previous: bool,
+    ):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self) -> str | None:
+        if not self._has_next:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.date_uploaded, last.pk, "next")
+
+    @property
+    def previous_cursor(self) -> str | None:
+        if not self._has_previous:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.date_uploaded, first.pk, "previous")
+
+
+class KeysetPaginator:
+    """Paginate BookFiles by (date_uploaded, id) instead of by OFFSET.
+
+    Each page is a range scan of the (date_uploaded, id) index starting from the row in the
+    cursor, with no COUNT(*), so deep pages cost the same as the first one.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor: str | None) -> KeysetPage:
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            rows = list(
+                self.queryset.order_by("date_uploaded", "id")[: self.per_page + 1]
+            )
+            return KeysetPage(rows[: self.per_page], len(rows) > self.per_page, False)
+
+        date_uploaded, pk, direction = position
+        if direction == "next":
+            rows = list(
+                self.queryset.filter(
+                    Q(date_uploaded__gt=date_uploaded)
+                    | Q(date_uploaded=date_uploaded, id__gt=pk)
+                ).order_by("date_uploaded", "id")[: self.per_page + 1]
+            )
+            return KeysetPage(rows[: self.per_page], len(rows) > self.per_page, True)
+
+        rows = list(
+            self.queryset.filter(
+                Q(date_uploaded__lt=date_uploaded)
+                | Q(date_uploaded=date_uploaded, id__lt=pk)
+            ).order_by("-date_uploaded", "-id")[: self.per_page + 1]
+        )
+        return KeysetPage(
+            list(reversed(rows[: self.per_page])), True, len(rows) > self.per_page
+        )
+
+
+class KeysetPaginationMixin:
+    """ListView mixin paginating with KeysetPaginator, driven by the ?cursor= parameter.
+
+    Set pagination_mode to "offset" to use Django's Paginator and ?page= instead.
+    """
+
+    pagination_mode = "keyset"
+    cursor_kwarg = "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != "keyset":
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
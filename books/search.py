@@ -0,0 +1,64 @@
+import re
+from typing import List
+
+from django.db import connection
+from django.db.models import Q
+
+from . import models
+
+SEARCH_RESULT_LIMIT = 50
+FTS_TABLE = "books_book_fts"
+# Large JSON columns of the BookFile of each result, which results don't show
+DEFERRED_BOOK_FILE_FIELDS = ("book_file__row_index", "book_file__summary")
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression: every word must match, and the last word
+    may be a prefix, so results update while typing."""
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_books(text: str, limit: int = SEARCH_RESULT_LIMIT) -> List[models.Book]:
+    """Find books by title, author, publisher or identifier across all uploaded lists.
+
+    On SQLite this uses the FTS5 index kept in step with the Book table by triggers, with
+    results ordered by relevance. Other databases fall back to case insensitive matching.
+
+    Args:
+        text (str): Words to search for
+        limit (int): Maximum number of results
+
+    Returns:
+        List[models.Book]: Matching books, with their BookFile loaded
+    """
+    if connection.vendor != "sqlite":
+        return list(
+            models.Book.objects.filter(
+                Q(title__icontains=text)
+                | Q(author__icontains=text)
+                | Q(publisher__icontains=text)
+                | Q(unique_identifier=text)
+            )
+            .select_related("book_file")
+            .defer(*DEFERRED_BOOK_FILE_FIELDS)[:limit]
+        )
+    query = fts_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [query, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    books = (
+        models.Book.objects.select_related("book_file")
+        .defer(*DEFERRED_BOOK_FILE_FIELDS)
+        .in_bulk(ids)
+    )
+    return [books[id] for id in ids if id in books]
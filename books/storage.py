@@ -1,14 +1,39 @@
-from typing import Any, Dict, List, Tuple, IO, Callable
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, IO, Callable
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from threading import Lock
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 import uuid
 import csv
+import io
+import mmap
+import os
+import codecs
+import shutil
 import hashlib
 import abc
 
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.module_loading import import_string
 import boto3
-from botocore.client import ClientError
+from botocore.client import ClientError, Config
 
 from . import models
+from .metrics import BYTES_READ, ROWS_PARSED, instrument_s3_client, timer
+from .summary import SummaryCollector
+from .validation import (
+    RowError,
+    RowValidator,
+    describe_errors,
+    validate_file,
+    validation_settings,
+)
 
 
 class CsvFileExistsError(Exception):
@@ -16,10 +41,526 @@ class CsvFileExistsError(Exception):
 
 
 class CsvFileValidationError(Exception):
-    pass
+    def __init__(self, message: str, errors: List[RowError] | None = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+CHUNK_SIZE = 64 * 1024
+# Every ROW_INDEX_STRIDE'th row has its byte offset stored in BookFile.row_index
+ROW_INDEX_STRIDE = 1000
+# Smallest ranged GET of a sidecar, so a Parquet footer is read in one request
+SIDECAR_READ_SIZE = 64 * 1024
+
+
+def iter_file_chunks(file: IO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file like object (local file, Django upload or S3 StreamingBody) in chunks.
+
+    Args:
+        file (IO): File like object opened in binary mode
+        chunk_size (int): Number of bytes to read at a time
+
+    Yields:
+        bytes: Next chunk of the file
+    """
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
+def iter_decoded_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode byte chunks as UTF-8 incrementally and yield complete lines with their endings.
+
+    Only the current chunk and a partial trailing line are held in memory, so memory use does
+    not grow with the size of the file. The last line of each chunk is held back until the next
+    chunk arrives, as it may be incomplete or be a "\r" followed by a "\n".
+
+    Args:
+        chunks (Iterable[bytes]): Raw byte chunks of a CSV file
+
+    Yields:
+        str: Lines, as produced by str.splitlines(True)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).splitlines(True)
+        pending = lines.pop() if lines else ""
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield from pending.splitlines(True)
+
+
+@contextmanager
+def unreadable_csv_as_validation_error() -> Iterator[None]:
+    """Raise CsvFileValidationError for input which can't be read as a CSV at all, so it is
+    rejected like any other invalid file rather than failing with an unexpected error.
+
+    Raises:
+        CsvFileValidationError: Input isn't UTF-8 text, or the csv module can't parse it, e.g.
+            a field over its size limit
+    """
+    try:
+        yield
+    except UnicodeDecodeError as e:
+        raise CsvFileValidationError("File is not UTF-8 text.") from e
+    except csv.Error as e:
+        raise CsvFileValidationError(f"File is not a valid CSV: {e}.") from e
+
+
+def validate_csv_headers(fieldnames: List[str] | None, expected: List[str]) -> None:
+    """Check the CSV header names, ignoring case and order, match the expected headers.
+
+    Raises:
+        CsvFileValidationError: Headers do not match
+    """
+    fieldnames = fieldnames or []
+    if expected != sorted(map(lambda x: x.upper(), fieldnames)):
+        raise CsvFileValidationError(
+            f"CSV Column Headers were {sorted(fieldnames)} and should be {expected}!",
+        )
+
+
+class CsvRow(Mapping):
+    """Read only view of one row of CsvRows, behaving like a dict keyed by header."""
+
+    __slots__ = ("_rows", "_values")
+
+    def __init__(self, rows: "CsvRows", values: Tuple[str, ...]):
+        self._rows = rows
+        self._values = values
+
+    def __getitem__(self, header: str) -> str | None:
+        return self._values[self._rows.positions[header]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows.fields)
+
+    def __len__(self) -> int:
+        return len(self._rows.fields)
+
+    def values(self) -> Tuple[str, ...]:
+        return self._values
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class CsvRows(Sequence):
+    """Compact table of CSV rows.
+
+    The headers are kept once, in sorted order, and each row is a tuple of values in the same
+    order, instead of a dict per row. Indexing gives CsvRow views which behave like the dicts
+    they replace, so iteration and template rendering work unchanged.
+    """
+
+    __slots__ = ("fields", "positions", "_values")
+
+    def __init__(self, fields: Tuple[str, ...], values: List[Tuple[str, ...]]):
+        self.fields = tuple(fields)
+        self.positions = {field: i for i, field in enumerate(self.fields)}
+        self._values = values
+
+    @classmethod
+    def from_reader(cls, header: List[str], rows: Iterable[List[str]]) -> "CsvRows":
+        """Build from csv.reader rows under header, skipping blank lines."""
+        order = sorted(range(len(header)), key=lambda i: header[i])
+        pick = itemgetter(*order) if len(order) > 1 else lambda row: (row[order[0]],)
+        values = []
+        for row in rows:
+            if not row:
+                continue
+            if len(row) < len(header):
+                row = row + [None] * (len(header) - len(row))
+            values.append(pick(row) if order else ())
+        return cls(tuple(header[i] for i in order), values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CsvRows(self.fields, self._values[index])
+        return CsvRow(self, self._values[index])
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CsvRows):
+            return self.fields == other.fields and self._values == other._values
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __getstate__(self):
+        return (self.fields, self._values)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self) -> str:
+        return f"CsvRows({len(self)} rows of {self.fields})"
+
+
+class NullWriter:
+    """Writer for UploadPipeline which discards the bytes, for reading objects already stored."""
+
+    def write(self, chunk: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class S3ObjectWriter:
+    """Write an object to S3 incrementally.
+
+    Bytes are buffered until a full part is available and then sent as a multipart upload part,
+    so at most one part is held in memory. Objects smaller than one part are sent with a single
+    put_object call when the writer is closed.
+    """
+
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = PART_SIZE):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.completed = False
+
+    def write(self, chunk: bytes) -> None:
+        self.buffer += chunk
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+
+    def _upload_part(self) -> None:
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key
+            )
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            PartNumber=part_number,
+            UploadId=self.upload_id,
+            Body=bytes(self.buffer),
+        )
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        self.buffer.clear()
+
+    def close(self) -> None:
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer)
+            )
+        else:
+            if self.buffer:
+                self._upload_part()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        self.buffer.clear()
+        self.completed = True
+
+    def abort(self) -> None:
+        """Throw away anything written so far, before the writer was closed."""
+        if self.upload_id is not None and not self.completed:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        self.buffer.clear()
+
+
+class S3ObjectReader(io.RawIOBase):
+    """Seekable read only file of an S3 object, fetching only the bytes read with ranged GETs,
+    for formats which need random access, e.g. a Parquet footer and then its column chunks.
+
+    Wrap it in io.BufferedReader so small reads share a request.
+    """
+
+    def __init__(self, client, bucket: str, key: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+        body = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={self.position}-{end - 1}"
+        )["Body"]
+        try:
+            data = body.read()
+        finally:
+            body.close()
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class UploadPipeline:
+    """Read an upload once, feeding each chunk to the MD5 digest, the CSV validator and a
+    storage writer at the same time.
+
+    The CSV reader drives the reading, so by the time the last row has been validated every
+    chunk has also been hashed and written. The writer is aborted if validation fails.
+
+    While reading, the byte offset of every index_stride'th row is recorded so a page of rows can
+    later be read with a ranged request instead of the whole file.
+
+    Rows are checked against the validation COLUMN_RULES, reading stops once max_errors errors
+    have been found. Pass validate_rows=False when the rows have already been validated, e.g.
+    in parallel by validate_file, to only check the header and column counts, and also
+    check_columns=False to only check the header, e.g. to index a file stored under older rules.
+    """
+
+    def __init__(
+        self,
+        writer,
+        csv_headers: List[str],
+        chunk_size: int = CHUNK_SIZE,
+        index_stride: int = ROW_INDEX_STRIDE,
+        progress: Callable[[int], None] | None = None,
+        validate_rows: bool = True,
+        max_errors: int | None = None,
+        check_columns: bool = True,
+    ):
+        self.writer = writer
+        self.validate_rows = validate_rows
+        self.check_columns = check_columns
+        self.max_errors = max_errors or validation_settings()["MAX_ERRORS"]
+        self.csv_headers = csv_headers
+        self.chunk_size = chunk_size
+        self.index_stride = index_stride
+        self.progress = progress
+        self.md5 = hashlib.md5()
+        self.bytes_read = 0
+        self.line_offset = 0
+        self.row_count = 0
+        self.header = []
+        self.row_offsets = []
+        self.validator = None
+        self.summary = None
+
+    def _iter_chunks(self, file: IO) -> Iterator[bytes]:
+        for chunk in iter_file_chunks(file, self.chunk_size):
+            self.md5.update(chunk)
+            self.writer.write(chunk)
+            self.bytes_read += len(chunk)
+            if self.progress is not None:
+                self.progress(self.bytes_read)
+            yield chunk
+
+    def _count_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            # Advance before yielding, so between records line_offset is the next record's start
+            self.line_offset += (
+                len(line) if line.isascii() else len(line.encode("utf-8"))
+            )
+            yield line
+
+    def _iter_lines(self, file: IO) -> Iterator[str]:
+        return self._count_lines(iter_decoded_lines(self._iter_chunks(file)))
+
+    def _read_rows(self, reader, line_base: int = 0) -> None:
+        """Validate and index the rows of reader, the first being the header if it hasn't been
+        read yet. Line numbers are offset by line_base."""
+        while self.validator is None or not self.validator.is_full:
+            offset = self.line_offset
+            row = next(reader, None)
+            if row is None:
+                break
+            if self.validator is None:
+                validate_csv_headers(row, self.csv_headers)
+                self.header = row
+                self.validator = RowValidator(row, self.max_errors)
+                self.summary = SummaryCollector(row)
+                continue
+            if not row:
+                continue
+            if self.validate_rows or (
+                self.check_columns and len(row) != len(self.header)
+            ):
+                self.validator.check(line_base + reader.line_num, row)
+            if len(row) == len(self.header):
+                self.summary.add(row)
+            if self.row_count % self.index_stride == 0:
+                self.row_offsets.append(offset)
+            self.row_count += 1
+
+    def _finish_rows(self) -> None:
+        if self.validator is None:
+            validate_csv_headers(None, self.csv_headers)
+        if self.validator.errors:
+            raise CsvFileValidationError(
+                describe_errors(self.validator.errors, self.validator.error_count),
+                self.validator.errors,
+            )
+
+    def _validate_rows(self, reader) -> None:
+        self._read_rows(reader)
+        self._finish_rows()
+
+    @property
+    def row_index(self) -> Dict[str, Any]:
+        return {
+            "stride": self.index_stride,
+            "header": self.header,
+            "offsets": self.row_offsets,
+        }
+
+    def consume(self, file: IO) -> None:
+        """Read the whole file once, validating it and passing every chunk to the writer.
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid
+        """
+        try:
+            with unreadable_csv_as_validation_error():
+                self._validate_rows(csv.reader(self._iter_lines(file)))
+            self.writer.close()
+        except Exception:
+            self.writer.abort()
+            raise
+        finally:
+            self._count()
+
+    def _count(self) -> None:
+        BYTES_READ.inc(self.bytes_read)
+        ROWS_PARSED.inc(self.row_count)
+
+    def run(self, file: IO) -> str:
+        """Hash, validate and store the file.
+
+        Args:
+            file (IO): File like object of upload CSV, read from its current position
+
+        Returns:
+            str: md5 hexdigest
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid
+        """
+        self.consume(file)
+        return self.md5.hexdigest()
+
+
+class ChunkedUploadPipeline(UploadPipeline):
+    """UploadPipeline for a file which arrives as a series of chunks, e.g. the parts of a
+    resumable upload, so is pushed to the pipeline rather than read by it.
+
+    Between chunks only the running MD5, the row index and an incomplete record are kept. A
+    record is only parsed once a line ends with its quotes balanced, as a quoted field may
+    continue over several lines and chunks.
+    """
+
+    def __init__(
+        self,
+        csv_headers: List[str],
+        index_stride: int = ROW_INDEX_STRIDE,
+        max_errors: int | None = None,
+    ):
+        super().__init__(
+            NullWriter(), csv_headers, index_stride=index_stride, max_errors=max_errors
+        )
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.pending = ""
+        self.line_num = 0
+        self.chunks = 0
+
+    def _feed_text(self, text: str, final: bool = False) -> None:
+        lines = (self.pending + text).splitlines(True)
+        self.pending = ""
+        if not final:
+            # As in iter_decoded_lines, the last line may be incomplete
+            self.pending = lines.pop() if lines else ""
+            odd, end = 0, 0
+            for number, line in enumerate(lines, 1):
+                odd ^= line.count('"') & 1
+                if not odd:
+                    end = number
+            self.pending = "".join(lines[end:]) + self.pending
+            lines = lines[:end]
+        reader = csv.reader(self._count_lines(lines))
+        self._read_rows(reader, self.line_num)
+        self.line_num += reader.line_num
+        if self.validator is not None and self.validator.is_full:
+            self._finish_rows()
+
+    def feed(self, chunk: bytes) -> None:
+        """Hash, validate and index the next chunk of the file.
+
+        Raises:
+            CsvFileValidationError: CSV headers are invalid, or max_errors rows are
+        """
+        self.md5.update(chunk)
+        self.bytes_read += len(chunk)
+        self.chunks += 1
+        with unreadable_csv_as_validation_error():
+            self._feed_text(self.decoder.decode(chunk))
+
+    def finish(self) -> str:
+        """Validate the last record once every chunk has been fed.
+
+        Returns:
+            str: md5 hexdigest
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid
+        """
+        try:
+            with unreadable_csv_as_validation_error():
+                self._feed_text(self.decoder.decode(b"", final=True), final=True)
+            self._finish_rows()
+        finally:
+            self._count()
+        return self.md5.hexdigest()
 
 
 class UploadFileManagerInterface(metaclass=abc.ABCMeta):
+    # Store objects under a digest of their content, see upload
+    content_addressed = False
+
+    CSV_HEADERS = [
+        "BOOK AUTHOR",
+        "BOOK TITLE",
+        "DATE PUBLISHED",
+        "PUBLISHER NAME",
+        "UNIQUE IDENTIFER",
+    ]
+
     @classmethod
     def __subclasshook__(cls, subclass):
         return (
@@ -33,51 +574,393 @@ class UploadFileManagerInterface(metaclass=abc.ABCMeta):
     def _generate_file_name(self) -> str:
         return f"{str(uuid.uuid4())}.csv"
 
+    def _content_file_name(self, file: IO) -> str:
+        """Name a file by the SHA-256 digest of its content, leaving it at the start."""
+        digest = hashlib.sha256()
+        for chunk in iter_file_chunks(file):
+            digest.update(chunk)
+        file.seek(0)
+        return f"{digest.hexdigest()}.csv"
+
     def _create_csv_reader_from_file_object(self, file: IO) -> csv.DictReader:
-        lines = file.read().decode("utf-8").splitlines(True)
-        return csv.DictReader(lines)
+        return csv.DictReader(iter_decoded_lines(iter_file_chunks(file)))
+
+    def iter_csv_rows(self, file: IO) -> Iterator[Dict[str, Any]]:
+        """Stream rows of a CSV file object, keyed by header and with headers in sorted order.
 
-    def _generate_check_md5_checksum(self, file: IO) -> str:
-        """Create MD5 Checksum of File Object and check it doesn't exist already.
+        Args:
+            file (IO): File like object of CSV, read from its current position
 
-        If it does exist then Throw error
+        Yields:
+            Dict[str, Any]: Next row of the CSV
+        """
+        reader = self._create_csv_reader_from_file_object(file)
+        fields = sorted(reader.fieldnames or [])
+        for row in reader:
+            yield {header: row[header] for header in fields}
+
+    def csv_file_object_to_dict(self, file: IO) -> Dict[str, CsvRows]:
+        reader = csv.reader(iter_decoded_lines(iter_file_chunks(file)))
+        return {"rows": CsvRows.from_reader(next(reader, []), reader)}
+
+    def _retrieve_range(
+        self, file: models.BookFile, offset: int, end: int | None = None
+    ) -> IO:
+        """Return the stored file positioned at byte offset. Storage able to serve byte ranges
+        should override this to avoid reading the skipped bytes, and stop after byte end.
+        """
+        body = self.retrieve(file)
+        remaining = offset
+        while remaining and (chunk := body.read(min(remaining, CHUNK_SIZE))):
+            remaining -= len(chunk)
+        return body
+
+    def build_row_index(self, file: models.BookFile) -> None:
+        """Read a stored file once to fill in row_count, row_index and summary, for files
+        uploaded before they were recorded at upload time. Caller is responsible for saving the
+        model.
+
+        Rows aren't validated, as the file may have been accepted under older rules, e.g. with
+        empty identifiers.
+        """
+        pipeline = UploadPipeline(
+            NullWriter(), self.CSV_HEADERS, validate_rows=False, check_columns=False
+        )
+        body = self.retrieve(file)
+        try:
+            pipeline.consume(body)
+        finally:
+            body.close()
+        file.row_count = pipeline.row_count
+        file.row_index = pipeline.row_index
+        file.summary = pipeline.summary.as_dict()
+
+    def retrieve_rows(self, file: models.BookFile, start: int, count: int) -> CsvRows:
+        """Read rows start to start + count of a stored file.
+
+        The nearest indexed row at or before start is found in file.row_index and the file is
+        read from that byte offset, so at most ROW_INDEX_STRIDE + count rows are parsed whatever
+        the size of the file.
 
         Args:
-            file (IO): File like objecy of upload CSV
+            file (models.BookFile): Uploaded file
+            start (int): Index of first row to return, not counting the header
+            count (int): Maximum number of rows to return
 
         Returns:
-            str: md5 hexgist
+            CsvRows: Rows keyed by header, with headers in sorted order
+        """
+        with timer("retrieve"):
+            return self._retrieve_rows(file, start, count)
+
+    def _retrieve_rows(self, file: models.BookFile, start: int, count: int) -> CsvRows:
+        offsets = file.row_index.get("offsets") if file.row_index else None
+        if offsets:
+            checkpoint = min(start // file.row_index["stride"], len(offsets) - 1)
+            body = self._retrieve_range(file, offsets[checkpoint])
+            header = file.row_index["header"]
+            reader = csv.reader(iter_decoded_lines(iter_file_chunks(body)))
+            skip = start - checkpoint * file.row_index["stride"]
+        else:
+            body = self.retrieve(file)
+            reader = csv.reader(iter_decoded_lines(iter_file_chunks(body)))
+            header = next(reader, [])
+            skip = start
+        try:
+            rows = (row for row in reader if row)
+            return CsvRows.from_reader(header, islice(rows, skip, skip + count))
+        finally:
+            body.close()
+
+    def save_or_discard(self, file: models.BookFile) -> models.BookFile:
+        """Save the BookFile of a stored upload, relying on the unique md5_checksum index to
+        reject duplicates in the one INSERT, and delete the stored object if it is rejected.
 
         Raises:
             CsvFileExistsError: Existing File exists
         """
+        try:
+            with timer("save"), transaction.atomic():
+                file.save()
+        except IntegrityError:
+            self.discard(file)
+            raise CsvFileExistsError("File already been upload to system.")
+        return file
+
+    def discard(self, file: models.BookFile) -> None:
+        """Remove the stored object of a BookFile which will not be saved.
+
+        A content addressed object may be the same object as that of the BookFile it
+        duplicates, so is kept.
+        """
+        if not self.content_addressed:
+            self.delete(file)
+
+    def _key(self, file: models.BookFile) -> str:
+        """Storage key of a stored file, its url after the url of the storage root, so the
+        inverse of key_url, e.g. "lists/2020/a.csv" of a backfilled object."""
+        root = self._construct_url("")
+        if file.s3_url.startswith(root):
+            return file.s3_url[len(root) :]
+        # Recorded under another bucket or root, from before a settings change
+        return file.s3_url.split("/")[-1]
+
+    def upload(
+        self,
+        file: IO,
+        progress: Callable[[int], None] | None = None,
+        commit: bool = True,
+        validate_rows: bool = True,
+    ) -> models.BookFile:
+        """Hash, validate and store the file in a single read.
+
+        When content addressed, the file is first hashed to name its object. If an object of
+        that name is already stored, it holds the same bytes, so the file is only validated and
+        nothing is transferred.
+
+        Args:
+            file (IO): File like object of upload CSV
+            progress (Callable[[int], None] | None): Called with the bytes read so far
+            commit (bool): Save the DB Model, otherwise the caller must save it, e.g. with
+                save_or_discard or in a bulk_create
+            validate_rows (bool): Check every row against the validation rules, pass False if
+                validate_file_rows has already done so
+
+        Returns:
+            models.BookFile: DB Model for the uploaded file
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid
+            CsvFileExistsError: Existing File exists, only raised when commit is True
+        """
         file.seek(0)
-        md5 = hashlib.md5()
-        # handle content in binary form
-        while chunk := file.read(4096):
-            md5.update(chunk)
-        md5_checksum = md5.hexdigest()
+        if self.content_addressed:
+            with timer("hash"):
+                file_name = self._content_file_name(file)
+            if self._exists_key(file_name):
+                writer = NullWriter()
+            else:
+                writer = self._open_writer(file_name)
+        else:
+            file_name = self._generate_file_name()
+            writer = self._open_writer(file_name)
+        pipeline = UploadPipeline(
+            writer, self.CSV_HEADERS, progress=progress, validate_rows=validate_rows
+        )
+        with timer("upload"):
+            md5 = pipeline.run(file)
+        book_file = self._build_book_file(file.name, file_name, pipeline, md5)
+        if commit:
+            self.save_or_discard(book_file)
+        return book_file
 
-        if models.BookFile.objects.filter(md5_checksum=md5_checksum).exists():
-            raise CsvFileExistsError("File already been upload to system.")
+    def validate_file_rows(self, path: str, workers: int | None = None) -> None:
+        """Validate the header and every row of a CSV file on disk, checking chunks of a large
+        file in parallel processes.
 
-        return md5_checksum
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid, with the first errors found
+                in its errors attribute
+        """
+        with open(path, "rb") as f:
+            header = next(csv.reader(iter_decoded_lines(iter_file_chunks(f))), None)
+        validate_csv_headers(header, self.CSV_HEADERS)
+        with timer("validate"):
+            errors, error_count = validate_file(path, header, workers=workers)
+        if errors:
+            raise CsvFileValidationError(describe_errors(errors, error_count), errors)
 
-    def csv_file_object_to_dict(self, file: IO) -> Dict[str, List[Dict[str, Any]]]:
-        reader = self._create_csv_reader_from_file_object(file)
-        output = {"rows": []}
-        fields = sorted(reader.fieldnames)
-        for row in reader:
-            output["rows"].append({header: row[header] for header in fields})
-        return output
+    def _build_book_file(
+        self, name: str, key: str, pipeline: UploadPipeline, md5: str
+    ) -> models.BookFile:
+        return models.BookFile(
+            file_name=name,
+            s3_url=self._construct_url(key),
+            date_uploaded=timezone.now(),
+            md5_checksum=md5,
+            row_count=pipeline.row_count,
+            row_index=pipeline.row_index,
+            file_size=pipeline.bytes_read,
+            summary=pipeline.summary.as_dict(),
+        )
+
+    def start_chunked_upload(self) -> Tuple[str, str]:
+        """Begin a multipart upload for a file sent in chunks, see complete_chunked_upload.
+
+        The key can't be content addressed, as the content isn't known yet.
+
+        Returns:
+            Tuple[str, str]: Storage key and multipart upload id
+        """
+        key = self._generate_file_name()
+        return key, self.start_multipart(key)
+
+    def complete_chunked_upload(
+        self,
+        name: str,
+        key: str,
+        upload_id: str,
+        parts: List[Dict[str, Any]],
+        pipeline: "ChunkedUploadPipeline | None" = None,
+    ) -> models.BookFile:
+        """Join the parts of a chunked upload into the stored object and build its BookFile.
+
+        pipeline should have been fed every chunk in order as it arrived, so the BookFile is
+        built without reading the data again. Without one, e.g. when chunks arrived out of order
+        or at another process, the joined object is read back once instead.
+
+        Args:
+            name (str): Name of the uploaded file
+            key (str): Storage key the parts were uploaded to
+            upload_id (str): Id of the multipart upload
+            parts (List[Dict[str, Any]]): {"PartNumber": n, "ETag": etag} of every part, in order
+            pipeline (ChunkedUploadPipeline | None): Pipeline fed every chunk
+
+        Returns:
+            models.BookFile: Unsaved DB Model for the uploaded file, see save_or_discard
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid, the object is removed
+        """
+        try:
+            if pipeline is not None:
+                md5 = pipeline.finish()
+        except CsvFileValidationError:
+            self.abort_multipart(key, upload_id)
+            raise
+        with timer("complete"):
+            self.complete_multipart(key, upload_id, parts)
+        if pipeline is None:
+            pipeline = ChunkedUploadPipeline(self.CSV_HEADERS)
+            body = self._retrieve_key(key)
+            try:
+                for chunk in iter_file_chunks(body):
+                    pipeline.feed(chunk)
+                md5 = pipeline.finish()
+            except CsvFileValidationError:
+                self._delete_key(key)
+                raise
+            finally:
+                body.close()
+        return self._build_book_file(name, key, pipeline, md5)
+
+    def key_url(self, key: str) -> str:
+        """Url of a stored object, as recorded in BookFile.s3_url."""
+        return self._construct_url(key)
+
+    def build_book_file_for_key(self, key: str) -> models.BookFile:
+        """Hash and validate an object already in storage, e.g. one copied into the bucket
+        without being uploaded through the app, in a single streamed read.
+
+        Returns:
+            models.BookFile: Unsaved DB Model for the object, named after its key
+
+        Raises:
+            CsvFileValidationError: CSV headers or rows are invalid, or it isn't a CSV
+        """
+        pipeline = UploadPipeline(NullWriter(), self.CSV_HEADERS)
+        body = self._retrieve_key(key)
+        try:
+            md5 = pipeline.run(body)
+        finally:
+            body.close()
+        name = key.rsplit("/", 1)[-1][
+            : models.BookFile._meta.get_field("file_name").max_length
+        ]
+        return self._build_book_file(name, key, pipeline, md5)
+
+    @classmethod
+    def from_settings(cls) -> "UploadFileManagerInterface":
+        """Build the manager configured in settings, see get_upload_file_manager."""
+        return cls(content_addressed=settings.BOOKS_CONTENT_ADDRESSED)
+
+    def ensure_bucket(self):
+        """Storage which must be created before first use overrides this."""
+
+    @abc.abstractmethod
+    def _open_writer(self, file_name: str):
+        """Return a writer (write, close and abort) which stores an object under file_name."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _construct_url(self, file_name: str) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _exists_key(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def start_multipart(self, key: str) -> str:
+        """Begin storing an object in numbered parts, returning the id of the upload."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        """Store one part of a multipart upload, replacing any earlier one with the same
+        number, and return its ETag."""
+        raise NotImplementedError
 
     @abc.abstractmethod
-    def upload(self, file: IO) -> models.BookFile:
+    def complete_multipart(
+        self, key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        """Join the parts, given in order as {"PartNumber": n, "ETag": etag}, into the object."""
         raise NotImplementedError
 
     @abc.abstractmethod
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def sidecar_key(self, file: models.BookFile, suffix: str) -> str:
+        """Key of a derived object stored next to the CSV, e.g. "<uuid>.parquet"."""
+        return f"{self._key(file).rsplit('.', 1)[0]}{suffix}"
+
+    def store_sidecar(
+        self, file: models.BookFile, suffix: str, chunks: Iterable[bytes]
+    ) -> None:
+        writer = self._open_writer(self.sidecar_key(file, suffix))
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+    def retrieve_sidecar(self, file: models.BookFile, suffix: str) -> IO:
+        """Return a derived object as a seekable file, which storage without random access
+        overrides to read only the parts that are used."""
+        return self._retrieve_key(self.sidecar_key(file, suffix))
+
     def retrieve(self, file: models.BookFile) -> IO:
         """Extract text from the data set"""
+        return self._retrieve_key(self._key(file))
+
+    def retrieve_range(
+        self, file: models.BookFile, start: int, end: int | None = None
+    ) -> IO:
+        """Return the stored file from byte start, for serving a byte range ending at byte end
+        inclusive. The body may run past end, so the caller must stop reading there."""
+        return self._retrieve_range(file, start, end)
+
+    def delete(self, file: models.BookFile) -> None:
+        self._delete_key(self._key(file))
+
+    @abc.abstractmethod
+    def list_keys(self, prefix: str = "", start_after: str = "") -> Iterator[str]:
+        """Yield the keys of the stored objects starting with prefix in sorted order, from the
+        first key after start_after."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _retrieve_key(self, key: str) -> IO:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _delete_key(self, key: str) -> None:
         raise NotImplementedError
 
 
@@ -88,23 +971,31 @@ class S3UploadFileManager(UploadFileManagerInterface):
     Subclass of UploadFileManagerInterface in case cloud storage changes, interface can stay the same.
     """
 
-    CSV_HEADERS = [
-        "BOOK AUTHOR",
-        "BOOK TITLE",
-        "DATE PUBLISHED",
-        "PUBLISHER NAME",
-        "UNIQUE IDENTIFER",
-    ]
-
     def __init__(
-        self, s3_bucket_name: str = "jc1976bucket", aws_region_name: str = "eu-west-1"
+        self,
+        s3_bucket_name: str = "jc1976bucket",
+        aws_region_name: str = "eu-west-1",
+        client=None,
+        content_addressed: bool = False,
     ):
-        self.client = boto3.client("s3")
+        self.client = client if client is not None else boto3.client("s3")
         self.s3_bucket_name = s3_bucket_name
         self.aws_region_name = aws_region_name
-        self._create_bucket()
+        self.content_addressed = content_addressed
+
+    @classmethod
+    def from_settings(cls) -> "S3UploadFileManager":
+        config = s3_settings()
+        return cls(
+            s3_bucket_name=config["BUCKET_NAME"],
+            aws_region_name=config["REGION_NAME"],
+            client=get_s3_client(),
+            content_addressed=settings.BOOKS_CONTENT_ADDRESSED,
+        )
 
-    def _create_bucket(self):
+    def ensure_bucket(self):
+        """Create the bucket if it doesn't exist. Run once at startup, by the ensure_s3_bucket
+        management command or BOOKS_S3["ENSURE_BUCKET_ON_STARTUP"], not per request."""
         try:
             self.client.head_bucket(Bucket=self.s3_bucket_name)
         except ClientError:
@@ -116,31 +1007,341 @@ class S3UploadFileManager(UploadFileManagerInterface):
     def _contruct_s3_url(self, file_name: str) -> str:
         return f"https://{self.s3_bucket_name}.s3.{self.aws_region_name}.amazonaws.com/{file_name}"
 
-    def _validate_csv_file(self, file):
-        file.seek(0)
-        reader = self._create_csv_reader_from_file_object(file)
-        fieldnames = sorted(list(map(lambda x: x.upper(), reader.fieldnames)))
-        if self.CSV_HEADERS != fieldnames:
-            raise CsvFileValidationError(
-                f"CSV Column Headers were {sorted(reader.fieldnames)} and should be {self.CSV_HEADERS}!",
-            )
+    def _construct_url(self, file_name: str) -> str:
+        return self._contruct_s3_url(file_name)
 
-    def upload(self, file: IO) -> models.BookFile:
-        md5 = self._generate_check_md5_checksum(file)
-        file_name = self._generate_file_name()
-        self._validate_csv_file(file)
-        file.seek(0)
-        self.client.upload_fileobj(file, self.s3_bucket_name, file_name)
-        # Build DB Object to return
-        return models.BookFile(
-            file_name=file.name,
-            s3_url=self._contruct_s3_url(file_name),
-            date_uploaded=timezone.now(),
-            md5_checksum=md5,
+    def list_keys(
+        self, prefix: str = "", start_after: str = "", page_size: int = 1000
+    ) -> Iterator[str]:
+        """Yield the keys of the bucket, fetching page_size keys per list_objects_v2 request."""
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.s3_bucket_name,
+            Prefix=prefix,
+            StartAfter=start_after,
+            PaginationConfig={"PageSize": page_size},
         )
+        for page in pages:
+            for obj in page.get("Contents", []):
+                yield obj["Key"]
 
-    def retrieve(self, file: models.BookFile) -> IO:
+    def _open_writer(self, file_name: str) -> S3ObjectWriter:
+        return S3ObjectWriter(self.client, self.s3_bucket_name, file_name)
+
+    def _retrieve_key(self, key: str) -> IO:
+        obj = self.client.get_object(Bucket=self.s3_bucket_name, Key=key)
+        return obj["Body"]
+
+    def retrieve_sidecar(self, file: models.BookFile, suffix: str) -> IO:
+        return io.BufferedReader(
+            S3ObjectReader(
+                self.client, self.s3_bucket_name, self.sidecar_key(file, suffix)
+            ),
+            buffer_size=SIDECAR_READ_SIZE,
+        )
+
+    def _delete_key(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.s3_bucket_name, Key=key)
+
+    def _exists_key(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.s3_bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def start_multipart(self, key: str) -> str:
+        response = self.client.create_multipart_upload(
+            Bucket=self.s3_bucket_name, Key=key
+        )
+        return response["UploadId"]
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        response = self.client.upload_part(
+            Bucket=self.s3_bucket_name,
+            Key=key,
+            PartNumber=part_number,
+            UploadId=upload_id,
+            Body=data,
+        )
+        return response["ETag"]
+
+    def complete_multipart(
+        self, key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.s3_bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self.client.abort_multipart_upload(
+            Bucket=self.s3_bucket_name, Key=key, UploadId=upload_id
+        )
+
+    def _retrieve_range(
+        self, file: models.BookFile, offset: int, end: int | None = None
+    ) -> IO:
         obj = self.client.get_object(
-            Bucket=self.s3_bucket_name, Key=file.s3_url.split("/")[-1]
+            Bucket=self.s3_bucket_name,
+            Key=self._key(file),
+            Range=f"bytes={offset}-{'' if end is None else end}",
         )
         return obj["Body"]
+
+
+class LocalFileWriter:
+    """Write an object to a local file, which only appears under its final name once closed."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.partial_path = path.with_name(f"{path.name}.part")
+        self.file = open(self.partial_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+
+    def close(self) -> None:
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+    def abort(self) -> None:
+        self.file.close()
+        self.partial_path.unlink(missing_ok=True)
+
+
+class LocalFileUploadFileManager(UploadFileManagerInterface):
+    """Store uploads in a directory on local disk, e.g. for edge nodes or development.
+
+    Files are read back through mmap, so reads are served straight from the page cache
+    and seeking to a page of rows is free.
+    """
+
+    def __init__(self, root: str | Path, content_addressed: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.content_addressed = content_addressed
+
+    @classmethod
+    def from_settings(cls) -> "LocalFileUploadFileManager":
+        return cls(
+            settings.BOOKS_LOCAL_STORAGE_ROOT,
+            content_addressed=settings.BOOKS_CONTENT_ADDRESSED,
+        )
+
+    def _path(self, file_name: str) -> Path:
+        return self.root / file_name
+
+    def _construct_url(self, file_name: str) -> str:
+        return self._path(file_name).resolve().as_uri()
+
+    def _key(self, file: models.BookFile) -> str:
+        # as_uri quotes the path, e.g. spaces as %20
+        path = Path(url2pathname(urlparse(file.s3_url).path))
+        try:
+            return path.relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return super()._key(file)
+
+    def _open_writer(self, file_name: str) -> LocalFileWriter:
+        return LocalFileWriter(self._path(file_name))
+
+    def _retrieve_key(self, key: str) -> IO:
+        with open(self._path(key), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be mapped
+                return io.BytesIO()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _retrieve_range(
+        self, file: models.BookFile, offset: int, end: int | None = None
+    ) -> IO:
+        body = self.retrieve(file)
+        body.seek(offset)
+        return body
+
+    def _delete_key(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def list_keys(self, prefix: str = "", start_after: str = "") -> Iterator[str]:
+        keys = (
+            path.relative_to(self.root).as_posix()
+            for path in self.root.rglob("*")
+            if path.is_file()
+        )
+        for key in sorted(keys):
+            if key > start_after and key.startswith(prefix):
+                yield key
+
+    def _exists_key(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def _parts_path(self, key: str, upload_id: str) -> Path:
+        return self._path(f"{key}.{upload_id}.parts")
+
+    def start_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        self._parts_path(key, upload_id).mkdir()
+        return upload_id
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        path = self._parts_path(key, upload_id) / str(part_number)
+        path.write_bytes(data)
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(
+        self, key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        parts_path = self._parts_path(key, upload_id)
+        writer = self._open_writer(key)
+        try:
+            for part in parts:
+                with open(parts_path / str(part["PartNumber"]), "rb") as f:
+                    for chunk in iter_file_chunks(f):
+                        writer.write(chunk)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+        shutil.rmtree(parts_path)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._parts_path(key, upload_id), ignore_errors=True)
+
+
+class InMemoryWriter:
+    def __init__(self, objects: Dict[str, bytes], key: str):
+        self.objects = objects
+        self.key = key
+        self.buffer = io.BytesIO()
+
+    def write(self, chunk: bytes) -> None:
+        self.buffer.write(chunk)
+
+    def close(self) -> None:
+        self.objects[self.key] = self.buffer.getvalue()
+
+    def abort(self) -> None:
+        self.buffer = io.BytesIO()
+
+
+class InMemoryUploadFileManager(UploadFileManagerInterface):
+    """Keep uploads in a dict, for tests and for benchmarking parsing without storage cost."""
+
+    def __init__(self, content_addressed: bool = False):
+        self.objects = {}
+        self.multipart_uploads = {}
+        self.content_addressed = content_addressed
+
+    def _construct_url(self, file_name: str) -> str:
+        return f"memory://books/{file_name}"
+
+    def _open_writer(self, file_name: str) -> InMemoryWriter:
+        return InMemoryWriter(self.objects, file_name)
+
+    def _retrieve_key(self, key: str) -> IO:
+        return io.BytesIO(self.objects[key])
+
+    def _retrieve_range(
+        self, file: models.BookFile, offset: int, end: int | None = None
+    ) -> IO:
+        body = self.retrieve(file)
+        body.seek(offset)
+        return body
+
+    def _delete_key(self, key: str) -> None:
+        self.objects.pop(key, None)
+
+    def list_keys(self, prefix: str = "", start_after: str = "") -> Iterator[str]:
+        for key in sorted(self.objects):
+            if key > start_after and key.startswith(prefix):
+                yield key
+
+    def _exists_key(self, key: str) -> bool:
+        return key in self.objects
+
+    def start_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        self.multipart_uploads[upload_id] = {}
+        return upload_id
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        self.multipart_uploads[upload_id][part_number] = data
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(
+        self, key: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        uploaded = self.multipart_uploads.pop(upload_id)
+        self.objects[key] = b"".join(uploaded[part["PartNumber"]] for part in parts)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self.multipart_uploads.pop(upload_id, None)
+
+
+def s3_settings() -> dict:
+    config = {
+        "BUCKET_NAME": "jc1976bucket",
+        "REGION_NAME": "eu-west-1",
+        "MAX_POOL_CONNECTIONS": 10,
+        "ENSURE_BUCKET_ON_STARTUP": False,
+    }
+    config.update(getattr(settings, "BOOKS_S3", {}))
+    return config
+
+
+_registry_lock = Lock()
+_s3_client = None
+_upload_file_manager = None
+
+
+def get_s3_client():
+    """boto3 S3 client shared by every thread of the process.
+
+    Clients are thread safe once built, but building one is not and costs far more than a
+    request, so it is built once under a lock with a connection pool sized for the threads
+    that share it.
+    """
+    global _s3_client
+    with _registry_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client(
+                "s3",
+                config=Config(
+                    max_pool_connections=s3_settings()["MAX_POOL_CONNECTIONS"]
+                ),
+            )
+            instrument_s3_client(_s3_client)
+        return _s3_client
+
+
+def get_upload_file_manager() -> UploadFileManagerInterface:
+    """Upload file manager shared by every request of the process.
+
+    The class is named by settings.BOOKS_STORAGE_BACKEND and built by its from_settings.
+    """
+    global _upload_file_manager
+    if _upload_file_manager is None:
+        manager = import_string(settings.BOOKS_STORAGE_BACKEND).from_settings()
+        with _registry_lock:
+            if _upload_file_manager is None:
+                _upload_file_manager = manager
+    return _upload_file_manager
+
+
+def reset_upload_file_managers() -> None:
+    """Forget the shared client and manager, e.g. after settings change in tests, or in a
+    forked worker which must not share its parent's connections."""
+    global _s3_client, _upload_file_manager
+    with _registry_lock:
+        _s3_client = None
+        _upload_file_manager = None
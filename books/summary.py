@@ -0,0 +1,114 @@
+"""Summary statistics of each book list, counted once while it is uploaded and stored in
+BookFile.summary, so counts across every list are a merge of small dicts rather than a read of
+every file.
+
+A summary holds the row count, the number of distinct authors and publishers, the number of
+books of each of the SUMMARY_MAX_KEYS most common authors and publishers, and the number
+published each year:
+
+    {
+        "row_count": 4,
+        "distinct_authors": 4,
+        "distinct_publishers": 3,
+        "authors": {"aa": 1, ...},
+        "publishers": {"aaa": 2, ...},
+        "years": {"1976": 1, ...},
+        "undated": 0,
+        "truncated": false
+    }
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+# Authors and publishers counted in each summary, the most common first
+SUMMARY_MAX_KEYS = 1000
+# Authors and publishers returned by merge_summaries
+SUMMARY_TOP = 20
+
+
+def published_year(value: str) -> str | None:
+    """Year of a DATE PUBLISHED value in one of the DATE_PUBLISHED_FORMATS, e.g. "1984" of
+    15/2/1984 or 1984-02-15, without parsing the whole date."""
+    value = value.strip()
+    year = value.rsplit("/", 1)[-1] if "/" in value else value[:4]
+    return year if len(year) == 4 and year.isdigit() else None
+
+
+class SummaryCollector:
+    """Count the rows of a CSV as they are read, given its header, which must have the
+    CSV_HEADERS columns."""
+
+    def __init__(self, header: List[str]):
+        positions = {column.upper(): index for index, column in enumerate(header)}
+        self.author_index = positions["BOOK AUTHOR"]
+        self.publisher_index = positions["PUBLISHER NAME"]
+        self.date_index = positions["DATE PUBLISHED"]
+        self.row_count = 0
+        self.authors = Counter()
+        self.publishers = Counter()
+        self.years = Counter()
+        self.undated = 0
+
+    def add(self, row: List[str]) -> None:
+        self.row_count += 1
+        self.authors[row[self.author_index].strip()] += 1
+        self.publishers[row[self.publisher_index].strip()] += 1
+        year = published_year(row[self.date_index])
+        if year is None:
+            self.undated += 1
+        else:
+            self.years[year] += 1
+
+    def as_dict(self, max_keys: int = SUMMARY_MAX_KEYS) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "distinct_authors": len(self.authors),
+            "distinct_publishers": len(self.publishers),
+            "authors": dict(self.authors.most_common(max_keys)),
+            "publishers": dict(self.publishers.most_common(max_keys)),
+            "years": dict(sorted(self.years.items())),
+            "undated": self.undated,
+            "truncated": max(len(self.authors), len(self.publishers)) > max_keys,
+        }
+
+
+def merge_summaries(
+    summaries: Iterable[Dict[str, Any]], top: int = SUMMARY_TOP
+) -> Dict[str, Any]:
+    """Add up the summaries of several book lists.
+
+    Distinct author and publisher counts are of the names in the summaries, so are a lower
+    bound when any summary was truncated to SUMMARY_MAX_KEYS names, as is "truncated" then.
+
+    Args:
+        summaries (Iterable[Dict[str, Any]]): BookFile.summary of each list
+        top (int): Number of authors and publishers to return, the most common first
+
+    Returns:
+        Dict[str, Any]: Totals across the lists, with the number of lists as "file_count"
+    """
+    authors, publishers, years = Counter(), Counter(), Counter()
+    file_count = row_count = undated = most_authors = most_publishers = 0
+    truncated = False
+    for summary in summaries:
+        file_count += 1
+        row_count += summary["row_count"]
+        most_authors = max(most_authors, summary["distinct_authors"])
+        most_publishers = max(most_publishers, summary["distinct_publishers"])
+        undated += summary["undated"]
+        truncated = truncated or summary["truncated"]
+        authors.update(summary["authors"])
+        publishers.update(summary["publishers"])
+        years.update(summary["years"])
+    return {
+        "file_count": file_count,
+        "row_count": row_count,
+        "distinct_authors": max(len(authors), most_authors),
+        "distinct_publishers": max(len(publishers), most_publishers),
+        "authors": dict(authors.most_common(top)),
+        "publishers": dict(publishers.most_common(top)),
+        "years": dict(sorted(years.items())),
+        "undated": undated,
+        "truncated": truncated,
+    }
@@ -1,6 +1,33 @@
+import os
+import time
+
 from celery import shared_task, Task
+from celery.signals import worker_process_init
+from celery.utils.log import current_process_index
 import requests
 
+from .backfill import register_keys
+from .columnar import build_sidecar, columnar_enabled
+from .ingest import ingest_book_file
+from .metrics import TASK_RETRIES, metrics_settings, start_http_server, timer
+from .models import BookFile
+from .notifications import (
+    NotificationBuffer,
+    get_notification_session,
+    notification_settings,
+    reset_notification_session,
+)
+from .storage import (
+    CsvFileExistsError,
+    CsvFileValidationError,
+    get_upload_file_manager,
+    reset_upload_file_managers,
+)
+from .validation import validation_settings
+
+# Seconds between progress updates written to the BookFile while an upload is processed
+PROGRESS_INTERVAL = 1.0
+
 
 class BaseTaskWithRetry(Task):
     autoretry_for = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
@@ -8,11 +35,155 @@ class BaseTaskWithRetry(Task):
     retry_backoff = 5
     retry_jitter = (True,)
 
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        TASK_RETRIES.inc(task=self.name)
+        super().on_retry(exc, task_id, args, kwargs, einfo)
+
+
+@worker_process_init.connect
+def _reset_worker_connections(**kwargs):
+    """Drop the clients a forked pool process inherited, whose sockets its parent also uses,
+    e.g. the S3 client built by BooksConfig.ready to ensure the bucket."""
+    reset_notification_session()
+    reset_upload_file_managers()
+
+
+@worker_process_init.connect
+def _start_worker_metrics_server(**kwargs):
+    """Serve each pool process's metrics on WORKER_PORT plus its index in the pool."""
+    port = metrics_settings()["WORKER_PORT"]
+    if port:
+        start_http_server(port + (current_process_index(base=0) or 0))
+
 
 @shared_task(bind=True, base=BaseTaskWithRetry)
 def task_process_notification(self, s3_url):
-    requests.post(
-        "https://postman-echo.com/post",
+    get_notification_session().post(
+        notification_settings()["URL"],
         data=s3_url.encode("utf-8"),
         headers={"Content-Type": "text/plain"},
     )
+
+
+@shared_task(bind=True, base=BaseTaskWithRetry)
+def task_process_notification_batch(self, s3_urls):
+    get_notification_session().post(
+        notification_settings()["URL"], json={"s3_urls": s3_urls}
+    )
+
+
+@shared_task
+def task_flush_notifications():
+    """Send the urls waiting in the NotificationBuffer, BATCH_SIZE urls per request."""
+    config = notification_settings()
+    buffer = NotificationBuffer.from_settings()
+    buffer.release_flush()
+    while s3_urls := buffer.pop(config["BATCH_SIZE"]):
+        task_process_notification_batch.delay(s3_urls)
+
+
+def queue_notification(s3_url: str) -> None:
+    """Notify the 3rd party of an upload, batching the urls when BOOKS_NOTIFICATIONS["BATCHING"]
+    is on. A batch is sent once BATCH_SIZE urls are waiting or BATCH_WINDOW seconds after the
+    first url was added, whichever comes first."""
+    config = notification_settings()
+    if not config["BATCHING"]:
+        task_process_notification.delay(s3_url)
+        return
+    buffer = NotificationBuffer.from_settings()
+    # Only the push which fills a batch flushes, not every push while a flush is on its way
+    if buffer.push(s3_url) % config["BATCH_SIZE"] == 0:
+        task_flush_notifications.delay()
+    elif buffer.claim_flush(config["BATCH_WINDOW"]):
+        task_flush_notifications.apply_async(countdown=config["BATCH_WINDOW"])
+
+
+@shared_task
+def task_ingest_book_file(book_file_id):
+    book_file = BookFile.objects.get(pk=book_file_id)
+    return ingest_book_file(book_file, get_upload_file_manager())
+
+
+@shared_task
+def task_build_columnar_sidecar(book_file_id):
+    book_file = BookFile.objects.get(pk=book_file_id)
+    return build_sidecar(get_upload_file_manager(), book_file)
+
+
+def on_book_file_uploaded(book_file: BookFile) -> None:
+    """Queue the work that follows a successful upload."""
+    with timer("enqueue"):
+        # Don't waste url time with notification can be handled by celery
+        queue_notification(book_file.s3_url)
+        task_ingest_book_file.delay(book_file.id)
+        if columnar_enabled():
+            task_build_columnar_sidecar.delay(book_file.id)
+
+
+@shared_task
+def task_backfill_keys(keys, follow_up=True):
+    """Register a batch of CSVs already in storage, see books.backfill.
+
+    With follow_up, each registered file is handled like a new upload: notified, imported and
+    given its sidecar."""
+    book_files, report = register_keys(get_upload_file_manager(), keys)
+    if follow_up:
+        for book_file in book_files:
+            on_book_file_uploaded(book_file)
+    return report
+
+
+@shared_task
+def task_process_upload(book_file_id, staged_path):
+    """Validate and upload a file saved to local staging by the upload view, recording status
+    and progress on its pending BookFile."""
+    book_file = BookFile.objects.get(pk=book_file_id)
+    book_file.status = BookFile.Status.PROCESSING
+    book_file.save(update_fields=["status"])
+    last_update = time.monotonic()
+
+    def progress(bytes_read):
+        nonlocal last_update
+        if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+            BookFile.objects.filter(pk=book_file_id).update(bytes_processed=bytes_read)
+            last_update = time.monotonic()
+
+    manager = get_upload_file_manager()
+    try:
+        # Large files have their rows checked on every core before the single pass upload
+        parallel = (
+            os.path.getsize(staged_path) >= validation_settings()["PARALLEL_THRESHOLD"]
+        )
+        if parallel:
+            manager.validate_file_rows(staged_path)
+        with open(staged_path, "rb") as f:
+            uploaded = manager.upload(
+                f, progress=progress, commit=False, validate_rows=not parallel
+            )
+        book_file.s3_url = uploaded.s3_url
+        book_file.md5_checksum = uploaded.md5_checksum
+        book_file.row_count = uploaded.row_count
+        book_file.row_index = uploaded.row_index
+        book_file.summary = uploaded.summary
+        book_file.file_size = uploaded.file_size
+        book_file.bytes_processed = uploaded.file_size
+        book_file.status = BookFile.Status.COMPLETE
+        manager.save_or_discard(book_file)
+    except (CsvFileExistsError, CsvFileValidationError) as e:
+        book_file.status = BookFile.Status.FAILED
+        book_file.status_message = (
+            f"Failed to upload {book_file.file_name} due to validation - {e}."
+        )
+        book_file.save(update_fields=["status", "status_message"])
+        return
+    except Exception as e:
+        book_file.status = BookFile.Status.FAILED
+        book_file.status_message = (
+            f"Failed Unexpectedly to Upload {book_file.file_name} - {e}."
+        )
+        book_file.save(update_fields=["status", "status_message"])
+        raise
+    finally:
+        os.remove(staged_path)
+
+    on_book_file_uploaded(book_file)
@@ -1,7 +1,26 @@
 from datetime import datetime
 import pytest
 
+from books.cache import get_parsed_csv_cache
+from books.chunked import reset_pipelines
 from books.models import BookFile
+from books.storage import get_upload_file_manager, reset_upload_file_managers
+
+
+@pytest.fixture(autouse=True)
+def clear_parsed_csv_cache():
+    yield
+    get_parsed_csv_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_storage():
+    # Each test mocks boto3 afresh, so don't let the shared client outlive the test
+    reset_upload_file_managers()
+    reset_pipelines()
+    yield
+    reset_upload_file_managers()
+    reset_pipelines()
 
 
 @pytest.fixture
@@ -10,7 +29,15 @@ def create_bookfile():
         file_name="books/tests/resources/book-success.csv",
         s3_url="https://jc1976bucket.s3.eu-west-1.amazonaws.com/123456789.csv",
         date_uploaded=datetime.now(),
-        md5_checksum="3ec0c7f80abe671f09c2ecb0a7bb12ff",
+        md5_checksum="4d7413b5bc13664f4d823ab9ae14f2cf",
     )
     book_file.save()
     return book_file
+
+
+@pytest.fixture
+def memory_storage(settings):
+    """Store uploads in memory instead of S3 for the duration of the test."""
+    settings.BOOKS_STORAGE_BACKEND = "books.storage.InMemoryUploadFileManager"
+    reset_upload_file_managers()
+    return get_upload_file_manager()
@@ -0,0 +1,193 @@
+import pytest
+from botocore.client import ClientError
+from django.core.management import call_command
+
+from books.backfill import register_keys
+from books.models import BackfillCheckpoint, BookFile
+from books.storage import LocalFileUploadFileManager, S3UploadFileManager
+from books.tasks import task_backfill_keys
+
+HEADER = b"Book title,Book Author,Date published,Unique identifer,Publisher name\n"
+
+
+@pytest.fixture
+def stored_objects(memory_storage):
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        uploaded = memory_storage.upload(f)
+    memory_storage.objects.update(
+        {
+            "a.csv": HEADER + b"a,aa,12/12/1976,2001,aaa\n",
+            "b.csv": HEADER + b"b,bb,12/12/1976,2002,bbb\n",
+            # Same content as b.csv
+            "c.csv": HEADER + b"b,bb,12/12/1976,2002,bbb\n",
+            "d.csv": HEADER + b"d,,12/12/1976,2004,ddd\n",
+            "e.parquet": b"PAR1",
+            "f.csv": HEADER + b"f,ff,12/12/1976,2006,fff\n",
+        }
+    )
+    return memory_storage, uploaded
+
+
+@pytest.fixture
+def eager_batches(mocker):
+    """Run each batch in process, as a Celery worker would."""
+    return mocker.patch.object(
+        task_backfill_keys,
+        "delay",
+        side_effect=lambda keys, **kwargs: task_backfill_keys.apply((keys,), kwargs),
+    )
+
+
+@pytest.mark.django_db
+def test_backfill_storage_registers_unregistered_csvs(
+    stored_objects, eager_batches, mocker
+):
+    # Setup
+    manager, uploaded = stored_objects
+    uploaded_mock = mocker.patch("books.tasks.on_book_file_uploaded")
+    # Actions
+    call_command("backfill_storage", "--batch-size", "2", "--concurrency", "2")
+    # Assertions
+    assert sorted(BookFile.objects.values_list("file_name", flat=True)) == [
+        "a.csv",
+        "b.csv",
+        "books/tests/resources/book-success.csv",
+        "f.csv",
+    ]
+    backfilled = BookFile.objects.get(file_name="a.csv")
+    assert backfilled.s3_url == "memory://books/a.csv"
+    assert backfilled.row_count == 1
+    assert uploaded_mock.call_count == 3
+    checkpoint = BackfillCheckpoint.objects.get(prefix="")
+    assert checkpoint.last_key == max("f.csv", uploaded.s3_url.split("/")[-1])
+    assert checkpoint.registered_count == 3
+    # The file uploaded through the app, and c.csv which is a copy of b.csv
+    assert checkpoint.skipped_count == 2
+    assert checkpoint.invalid_count == 1
+    batches = [call.args[0] for call in eager_batches.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 2, 2]
+    assert sum(batches, []) == sorted(
+        ["a.csv", "b.csv", "c.csv", "d.csv", "f.csv", uploaded.s3_url.split("/")[-1]]
+    )
+
+
+@pytest.mark.django_db
+def test_backfill_storage_resumes_from_checkpoint(stored_objects, eager_batches):
+    # Setup
+    BackfillCheckpoint.objects.create(prefix="", last_key="c.csv")
+    # Actions
+    call_command("backfill_storage", "--batch-size", "10", "--no-follow-up")
+    # Assertions
+    sent = eager_batches.call_args_list
+    assert len(sent) == 1
+    assert {"d.csv", "f.csv"} <= set(sent[0].args[0])
+    assert not {"a.csv", "b.csv", "c.csv"} & set(sent[0].args[0])
+    assert sent[0].kwargs == {"follow_up": False}
+    assert not BookFile.objects.filter(file_name__in=["a.csv", "b.csv"]).exists()
+    assert BookFile.objects.filter(file_name="f.csv").exists()
+
+
+@pytest.mark.django_db
+def test_backfilled_nested_keys_are_retrieved_by_full_key(
+    memory_storage, eager_batches
+):
+    # Setup
+    content = HEADER + b"a,aa,12/12/1976,2001,aaa\n"
+    memory_storage.objects.update(
+        {"lists/2020/a.csv": content, "lists/2021/a.csv": HEADER}
+    )
+    # Actions
+    call_command("backfill_storage", "--no-follow-up")
+    # Assertions
+    book_file = BookFile.objects.get(s3_url="memory://books/lists/2020/a.csv")
+    assert book_file.file_name == "a.csv"
+    assert memory_storage.retrieve(book_file).read() == content
+    assert memory_storage.sidecar_key(book_file, ".parquet") == "lists/2020/a.parquet"
+    memory_storage.delete(book_file)
+    assert list(memory_storage.objects) == ["lists/2021/a.csv"]
+
+
+@pytest.mark.django_db
+def test_local_storage_retrieves_nested_keys(tmp_path):
+    # Setup
+    content = HEADER + b"a,aa,12/12/1976,2001,aaa\n"
+    (tmp_path / "lists" / "2020").mkdir(parents=True)
+    (tmp_path / "lists" / "2020" / "my books.csv").write_bytes(content)
+    manager = LocalFileUploadFileManager(tmp_path)
+    # Actions
+    saved, report = register_keys(manager, list(manager.list_keys()))
+    # Assertions
+    assert report["registered"] == 1
+    with manager.retrieve(saved[0]) as body:
+        assert body.read() == content
+
+
+@pytest.mark.django_db
+def test_register_keys_counts_unreadable_objects_as_invalid(memory_storage, mocker):
+    # Setup
+    memory_storage.objects.update(
+        {
+            "a.csv": HEADER + b"a,aa,12/12/1976,2001,aaa\n",
+            "latin1.csv": HEADER + "é,aa,12/12/1976,2002,aaa\n".encode("latin-1"),
+        }
+    )
+    retrieve_key = memory_storage._retrieve_key
+
+    def retrieve_or_raise(key):
+        if key not in memory_storage.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return retrieve_key(key)
+
+    mocker.patch.object(memory_storage, "_retrieve_key", side_effect=retrieve_or_raise)
+    # Actions
+    saved, report = register_keys(
+        memory_storage, ["a.csv", "deleted.csv", "latin1.csv"]
+    )
+    # Assertions
+    assert [book_file.file_name for book_file in saved] == ["a.csv"]
+    assert report["registered"] == 1
+    assert report["skipped"] == 0
+    assert report["invalid"] == 2
+    assert report["errors"][0].startswith("deleted.csv: An error occurred (NoSuchKey)")
+    assert report["errors"][1] == "latin1.csv: File is not UTF-8 text."
+
+
+@pytest.mark.django_db
+def test_register_keys_counts_oversized_fields_as_invalid(memory_storage):
+    # Setup
+    memory_storage.objects.update(
+        {
+            "a.csv": HEADER + b"a," + b"x" * 140_000 + b",12/12/1976,2001,aaa\n",
+            "b.csv": HEADER + b"b,bb,12/12/1976,2002,bbb\n",
+        }
+    )
+    # Actions
+    saved, report = register_keys(memory_storage, ["a.csv", "b.csv"])
+    # Assertions
+    assert [book_file.file_name for book_file in saved] == ["b.csv"]
+    assert report["invalid"] == 1
+    assert report["errors"] == [
+        "a.csv: File is not a valid CSV: field larger than field limit (131072)."
+    ]
+
+
+def test_s3_list_keys_pages_through_bucket(mocker):
+    # Setup
+    client = mocker.Mock()
+    client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "a.csv"}, {"Key": "b.csv"}]},
+        {"Contents": [{"Key": "c.csv"}]},
+        {},
+    ]
+    manager = S3UploadFileManager(client=client)
+    # Actions
+    keys = list(manager.list_keys("", start_after="0.csv", page_size=2))
+    # Assertions
+    assert keys == ["a.csv", "b.csv", "c.csv"]
+    client.get_paginator.assert_called_once_with("list_objects_v2")
+    client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket="jc1976bucket",
+        Prefix="",
+        StartAfter="0.csv",
+        PaginationConfig={"PageSize": 2},
+    )
@@ -0,0 +1,42 @@
+from books.cache import LRUCache, ParsedCsvCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    # Setup
+    subject = LRUCache(max_entries=2)
+    subject.set("a", 1)
+    subject.set("b", 2)
+    subject.get("a")
+    # Actions
+    subject.set("c", 3)
+    # Assertions
+    assert subject.get("a") == 1
+    assert subject.get("b") is None
+    assert subject.get("c") == 3
+
+
+def test_parsed_csv_cache_counts_hits_and_misses(mocker):
+    # Setup
+    subject = ParsedCsvCache(max_entries=2)
+    loader = mocker.Mock(return_value=[{"BOOK TITLE": "a"}])
+    # Actions
+    first = subject.get_or_load("abc", "0:50", loader)
+    second = subject.get_or_load("abc", "0:50", loader)
+    # Assertions
+    assert first == second == [{"BOOK TITLE": "a"}]
+    loader.assert_called_once_with()
+    assert subject.stats() == {"hits": 1, "shared_hits": 0, "misses": 1, "entries": 1}
+
+
+def test_parsed_csv_cache_uses_shared_backend(mocker):
+    # Setup - two processes sharing the default (local memory) Django cache
+    first_process = ParsedCsvCache(backend_alias="default")
+    second_process = ParsedCsvCache(backend_alias="default")
+    loader = mocker.Mock(return_value=[{"BOOK TITLE": "a"}])
+    # Actions
+    first_process.get_or_load("def", "0:50", loader)
+    rows = second_process.get_or_load("def", "0:50", loader)
+    # Assertions
+    assert rows == [{"BOOK TITLE": "a"}]
+    loader.assert_called_once_with()
+    assert second_process.stats()["shared_hits"] == 1
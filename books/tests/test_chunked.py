@@ -0,0 +1,162 @@
+import io
+
+import pytest
+
+from books.chunked import (
+    ChunkedUploadError,
+    complete_upload,
+    init_upload,
+    upload_chunk,
+)
+from books.models import UploadSession
+from books.storage import (
+    ChunkedUploadPipeline,
+    CsvFileValidationError,
+    NullWriter,
+    S3UploadFileManager,
+    UploadPipeline,
+)
+
+
+@pytest.fixture
+def csv_data():
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(username="uploader")
+
+
+@pytest.fixture
+def chunked_settings(settings):
+    settings.BOOKS_CHUNKED_UPLOADS = {"CHUNK_SIZE": 50}
+
+
+def send_chunks(session, data, manager, order=None):
+    size = session.chunk_size
+    chunks = [data[n : n + size] for n in range(0, len(data), size)]
+    for part_number in order or range(1, len(chunks) + 1):
+        upload_chunk(session, part_number, chunks[part_number - 1], manager)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024])
+def test_chunked_pipeline_matches_upload_pipeline(chunk_size):
+    # Setup - a quoted field with a newline, which chunks may split
+    data = (
+        b"Book title,Book Author,Date published,Unique identifer,Publisher name\r\n"
+        b'a,aa,12/12/1976,1001,"aaa\r\nand co"\r\nb,b\xc3\xa9,3/9/2013,1002,bbb\r\n'
+        b"c,cc,15/2/1984,1003,ccc"
+    )
+    expected = UploadPipeline(
+        NullWriter(), S3UploadFileManager.CSV_HEADERS, index_stride=1
+    )
+    expected_md5 = expected.run(io.BytesIO(data))
+    subject = ChunkedUploadPipeline(S3UploadFileManager.CSV_HEADERS, index_stride=1)
+    # Actions
+    for n in range(0, len(data), chunk_size):
+        subject.feed(data[n : n + chunk_size])
+    md5 = subject.finish()
+    # Assertions
+    assert md5 == expected_md5
+    assert subject.row_count == 3
+    assert subject.row_index == expected.row_index
+
+
+def test_chunked_pipeline_reports_line_numbers():
+    # Setup
+    subject = ChunkedUploadPipeline(S3UploadFileManager.CSV_HEADERS)
+    subject.feed(b"Book title,Book Author,Date published,Unique identifer,Publisher")
+    subject.feed(b" name\na,aa,12/12/1976,1001,aaa\nb,bb,3/9/2013,,bbb\n")
+    # Actions
+    with pytest.raises(CsvFileValidationError) as excinfo:
+        subject.finish()
+    # Assertions
+    assert str(excinfo.value) == "CSV line 3: UNIQUE IDENTIFER is empty"
+
+
+@pytest.mark.django_db
+def test_chunked_upload_in_order_is_not_read_again(
+    mocker, memory_storage, chunked_settings, user, csv_data
+):
+    # Setup
+    session = init_upload(user, "books.csv", len(csv_data), memory_storage)
+    send_chunks(session, csv_data, memory_storage)
+    retrieve_spy = mocker.spy(memory_storage, "_retrieve_key")
+    # Actions
+    book_file = complete_upload(session, memory_storage)
+    # Assertions
+    retrieve_spy.assert_not_called()
+    assert session.status == UploadSession.Status.COMPLETE
+    assert book_file.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert book_file.row_count == 4
+    assert memory_storage.objects[session.key] == csv_data
+
+
+@pytest.mark.django_db
+def test_chunked_upload_out_of_order_reads_object_back(
+    mocker, memory_storage, chunked_settings, user, csv_data
+):
+    # Setup
+    session = init_upload(user, "books.csv", len(csv_data), memory_storage)
+    send_chunks(session, csv_data, memory_storage, order=[2, 1, 4, 3])
+    retrieve_spy = mocker.spy(memory_storage, "_retrieve_key")
+    # Actions
+    book_file = complete_upload(session, memory_storage)
+    # Assertions
+    retrieve_spy.assert_called_once_with(session.key)
+    assert book_file.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert book_file.row_count == 4
+
+
+@pytest.mark.django_db
+def test_chunked_upload_rejects_missing_and_wrong_size_chunks(
+    memory_storage, chunked_settings, user, csv_data
+):
+    # Setup
+    session = init_upload(user, "books.csv", len(csv_data), memory_storage)
+    upload_chunk(session, 1, csv_data[:50], memory_storage)
+    # Actions
+    with pytest.raises(ChunkedUploadError) as size_error:
+        upload_chunk(session, 2, csv_data[50:60], memory_storage)
+    with pytest.raises(ChunkedUploadError) as missing_error:
+        complete_upload(session, memory_storage)
+    # Assertions
+    assert str(size_error.value) == "Chunk 2 has 10 bytes and should have 50."
+    assert str(missing_error.value) == "Chunks [2, 3, 4] are missing."
+    assert session.bytes_received == 50
+
+
+@pytest.mark.django_db
+def test_chunked_upload_maps_chunks_to_s3_parts(
+    mocker, chunked_settings, user, csv_data
+):
+    # Setup
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    client = boto3_mock.return_value
+    client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": f"etag-{kwargs['PartNumber']}"
+    }
+    manager = S3UploadFileManager()
+    session = init_upload(user, "books.csv", len(csv_data), manager)
+    # Actions
+    send_chunks(session, csv_data, manager)
+    complete_upload(session, manager)
+    # Assertions
+    assert [c.kwargs["PartNumber"] for c in client.upload_part.call_args_list] == [
+        1,
+        2,
+        3,
+        4,
+    ]
+    client.complete_multipart_upload.assert_called_once_with(
+        Bucket=manager.s3_bucket_name,
+        Key=session.key,
+        UploadId="upload-1",
+        MultipartUpload={
+            "Parts": [{"PartNumber": n, "ETag": f"etag-{n}"} for n in range(1, 5)]
+        },
+    )
+    client.get_object.assert_not_called()
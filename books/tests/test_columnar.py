@@ -0,0 +1,94 @@
+from datetime import date
+import io
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from books.columnar import (
+    SIDECAR_SUFFIX,
+    build_sidecar,
+    read_sidecar_rows,
+    read_sidecar_table,
+)
+from books.models import BookFile
+from books.storage import S3UploadFileManager
+
+
+@pytest.fixture
+def uploaded_bookfile(memory_storage):
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        return memory_storage.upload(f)
+
+
+@pytest.mark.django_db
+def test_build_sidecar(memory_storage, uploaded_bookfile):
+    # Actions
+    count = build_sidecar(memory_storage, uploaded_bookfile)
+    # Assertions
+    assert count == 4
+    assert BookFile.objects.get().has_columnar_sidecar
+    key = memory_storage.sidecar_key(uploaded_bookfile, SIDECAR_SUFFIX)
+    assert key == uploaded_bookfile.s3_url.split("/")[-1].replace(".csv", ".parquet")
+    assert memory_storage.objects[key].startswith(b"PAR1")
+
+
+@pytest.mark.django_db
+def test_read_sidecar_rows_matches_csv(memory_storage, uploaded_bookfile):
+    # Setup
+    build_sidecar(memory_storage, uploaded_bookfile)
+    # Actions
+    rows = read_sidecar_rows(memory_storage, uploaded_bookfile, 1, 2)
+    # Assertions
+    assert rows == memory_storage.retrieve_rows(uploaded_bookfile, 1, 2)
+
+
+@pytest.mark.django_db
+def test_read_sidecar_table_projects_typed_dates(memory_storage, uploaded_bookfile):
+    # Setup
+    build_sidecar(memory_storage, uploaded_bookfile)
+    # Actions
+    table = read_sidecar_table(
+        memory_storage, uploaded_bookfile, columns=["Book title", "date_published"]
+    )
+    # Assertions
+    assert table.column_names == ["Book title", "date_published"]
+    assert table.column("date_published").to_pylist() == [
+        date(1976, 12, 12),
+        date(2013, 9, 3),
+        date(1984, 2, 15),
+        date(2022, 1, 17),
+    ]
+
+
+@pytest.mark.django_db
+def test_read_sidecar_rows_fetches_ranges_from_s3(memory_storage, mocker):
+    # Setup
+    mocker.patch("books.columnar.ROW_GROUP_SIZE", 10_000)
+    lines = ["Book title,Book Author,Date published,Unique identifer,Publisher name"]
+    lines += [f"title {n},author {n},1/1/2000,{n},publisher {n}" for n in range(40_000)]
+    file = io.BytesIO("\n".join(lines).encode("utf-8"))
+    file.name = "many.csv"
+    book_file = memory_storage.upload(file)
+    build_sidecar(memory_storage, book_file)
+    data = memory_storage.objects[memory_storage.sidecar_key(book_file, SIDECAR_SUFFIX)]
+    client = mocker.Mock()
+    client.head_object.return_value = {"ContentLength": len(data)}
+
+    def get_object(Bucket, Key, Range):
+        start, end = map(int, Range[len("bytes=") :].split("-"))
+        return {"Body": io.BytesIO(data[start : end + 1])}
+
+    client.get_object.side_effect = get_object
+    subject = S3UploadFileManager(client=client)
+    # Actions
+    rows = read_sidecar_rows(subject, book_file, 25_000, 2)
+    # Assertions
+    assert rows == memory_storage.retrieve_rows(book_file, 25_000, 2)
+    ranges = [
+        tuple(map(int, call.kwargs["Range"][len("bytes=") :].split("-")))
+        for call in client.get_object.call_args_list
+    ]
+    # The footer and the third row group, never the first
+    assert min(start for start, _ in ranges) > 0
+    assert sum(end - start + 1 for start, end in ranges) < len(data)
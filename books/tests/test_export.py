@@ -0,0 +1,64 @@
+import io
+import json
+
+import pytest
+from django.http import QueryDict
+
+from books.export import ExportError, ExportQuery, iter_export
+
+CSV = (
+    "Book title,Book Author,Date published,Unique identifer,Publisher name\n"
+    'a,aa,12/12/1976,1001,"Penguin, UK"\n'
+    "b,bb,3/9/2013,1002,Puffin\n"
+    "c,cc,15/2/1984,1003,penguin, uk\n"
+    "d,dd,17/1/2022,1004,Puffin\n"
+).encode("utf-8")
+
+
+def export(params, buffer_size=64 * 1024):
+    body = io.BytesIO(CSV)
+    chunks = list(
+        iter_export(body, ExportQuery.from_params(QueryDict(params)), buffer_size)
+    )
+    assert body.closed
+    return chunks
+
+
+def test_iter_export_projects_and_filters_csv():
+    # Actions
+    chunks = export(
+        "columns=publisher,title&published__gte=1980-01-01&published__lte=2020-12-31"
+    )
+    # Assertions
+    assert b"".join(chunks) == b"Publisher name,Book title\r\nPuffin,b\r\n"
+
+
+def test_iter_export_ndjson_matches_any_value_ignoring_case():
+    # Actions
+    chunks = export(
+        "format=ndjson&columns=title,publisher&publisher=penguin, uk&publisher=PUFFIN",
+        buffer_size=1,
+    )
+    # Assertions
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == [
+        {"Book title": "a", "Publisher name": "Penguin, UK"},
+        {"Book title": "b", "Publisher name": "Puffin"},
+        {"Book title": "d", "Publisher name": "Puffin"},
+    ]
+    assert len(chunks) == 3  # Row c has 6 columns so is left out
+
+
+@pytest.mark.parametrize(
+    "params, message",
+    [
+        ("format=xml", "Unsupported format xml, use one of csv, ndjson."),
+        ("columns=title,isbn", "Unknown columns isbn."),
+        ("price=1", "Unknown filter price."),
+        ("author__gte=a", "Unsupported filter author__gte."),
+        ("published__gte=soon", "'soon' is not a date."),
+    ],
+)
+def test_export_query_rejects_bad_params(params, message):
+    with pytest.raises(ExportError) as excinfo:
+        ExportQuery.from_params(QueryDict(params))
+    assert str(excinfo.value) == message
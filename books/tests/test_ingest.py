@@ -0,0 +1,79 @@
+from datetime import date
+import io
+
+import pytest
+
+from books import ingest
+from books.ingest import ingest_book_file, parse_date_published
+from books.models import Book
+from books.storage import S3UploadFileManager
+
+
+def test_parse_date_published():
+    assert parse_date_published("15/2/1984") == date(1984, 2, 15)
+    assert parse_date_published("1984-02-15") == date(1984, 2, 15)
+    assert parse_date_published("not a date") is None
+
+
+@pytest.mark.django_db
+def test_ingest_book_file_in_batches(mocker, create_bookfile):
+    # Setup
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    body = open("books/tests/resources/book-success.csv", "rb")
+    boto3_mock.return_value.get_object.return_value = {"Body": body}
+    bulk_create_spy = mocker.spy(Book.objects, "bulk_create")
+    # Actions
+    count = ingest_book_file(create_bookfile, S3UploadFileManager(), batch_size=3)
+    # Assertions
+    assert count == 4
+    assert bulk_create_spy.call_count == 2
+    assert body.closed
+    book = Book.objects.get(book_file=create_bookfile, row_number=2)
+    assert book.title == "c"
+    assert book.author == "cc"
+    assert book.publisher == "ccc"
+    assert book.date_published == date(1984, 2, 15)
+    assert book.unique_identifier == "1003"
+
+
+@pytest.mark.django_db
+def test_ingest_book_file_commits_each_batch(mocker, create_bookfile):
+    # Setup
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    body = open("books/tests/resources/book-success.csv", "rb")
+    boto3_mock.return_value.get_object.return_value = {"Body": body}
+    book_from_row = ingest.book_from_row
+
+    def fail_on_fourth_row(book_file, row_number, row):
+        if row_number == 3:
+            raise ValueError("Connection lost")
+        return book_from_row(book_file, row_number, row)
+
+    mocker.patch("books.ingest.book_from_row", side_effect=fail_on_fourth_row)
+    # Actions
+    with pytest.raises(ValueError):
+        ingest_book_file(create_bookfile, S3UploadFileManager(), batch_size=3)
+    # Assertions
+    assert Book.objects.filter(book_file=create_bookfile).count() == 3
+    assert body.closed
+
+
+@pytest.mark.django_db
+def test_ingest_book_file_counts_rows_in_other_lists(memory_storage):
+    # Setup
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        first = memory_storage.upload(f)
+    content = (
+        b"Book title,Book Author,Date published,Unique identifer,Publisher name\n"
+        b"b,bb,3/9/2013,1002,bbb\ne,ee,1/1/2000,1005,eee\n"
+    )
+    upload = io.BytesIO(content)
+    upload.name = "second.csv"
+    second = memory_storage.upload(upload)
+    ingest_book_file(first, memory_storage)
+    # Actions
+    ingest_book_file(second, memory_storage)
+    # Assertions
+    second.refresh_from_db()
+    assert second.overlapping_row_count == 1
+    assert second.overlap_percent == 50
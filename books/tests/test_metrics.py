@@ -0,0 +1,111 @@
+import boto3
+import pytest
+from django.urls import reverse
+
+from books.metrics import (
+    REGISTRY,
+    Registry,
+    instrument_s3_client,
+    server_timing_header,
+)
+from books.tasks import task_process_notification
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_registry_renders_prometheus_text():
+    # Setup
+    registry = Registry()
+    uploads = registry.counter("uploads_total", "Uploads.")
+    seconds = registry.histogram("stage_seconds", "Stages.", buckets=(0.1, 1))
+    # Actions
+    uploads.inc(status="ok")
+    uploads.inc(2, status="ok")
+    seconds.observe(0.05, stage="hash")
+    seconds.observe(0.5, stage="hash")
+    # Assertions
+    assert registry.render().splitlines() == [
+        "# HELP uploads_total Uploads.",
+        "# TYPE uploads_total counter",
+        'uploads_total{status="ok"} 3',
+        "# HELP stage_seconds Stages.",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="hash",le="0.1"} 1',
+        'stage_seconds_bucket{stage="hash",le="1"} 2',
+        'stage_seconds_bucket{stage="hash",le="+Inf"} 2',
+        'stage_seconds_sum{stage="hash"} 0.55',
+        'stage_seconds_count{stage="hash"} 2',
+    ]
+
+
+def test_server_timing_header_sums_repeated_stages():
+    assert server_timing_header(
+        [("s3", 0.01), ("upload", 0.02), ("s3", 0.005)], 0.05
+    ) == ("s3;dur=15.0, upload;dur=20.0, total;dur=50.0")
+
+
+def test_instrument_s3_client_times_calls(mocker):
+    # Setup
+    client = boto3.client(
+        "s3",
+        region_name="eu-west-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    instrument_s3_client(client)
+    # Stands in for the HTTP request, leaving the event hooks around it
+    mocker.patch.object(
+        client, "_make_request", return_value=(mocker.Mock(status_code=204), {})
+    )
+    # Actions
+    client.delete_object(Bucket="bucket", Key="a.csv")
+    # Assertions
+    assert 'books_s3_request_seconds_count{operation="DeleteObject"} 1' in (
+        REGISTRY.render()
+    )
+
+
+def test_task_retries_are_counted(mocker):
+    # Actions
+    task_process_notification.on_retry(Exception(), "id", (), {}, None)
+    # Assertions
+    assert (
+        'books_task_retries_total{task="books.tasks.task_process_notification"} 1'
+        in REGISTRY.render()
+    )
+
+
+@pytest.mark.django_db
+def test_upload_reports_stages_in_server_timing_and_metrics(
+    client, django_user_model, memory_storage, mocker, settings
+):
+    # Setup
+    settings.BOOKS_METRICS = {"SERVER_TIMING": True}
+    user = django_user_model.objects.create_user(username="a", password="b")
+    client.force_login(user)
+    mocker.patch("books.tasks.queue_notification")
+    mocker.patch("books.tasks.task_ingest_book_file")
+    mocker.patch("books.tasks.task_build_columnar_sidecar")
+    # Actions
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        response = client.post(reverse("books:upload"), {"upload": f})
+    metrics = client.get(reverse("metrics"))
+    # Assertions
+    stages = [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+    assert stages == ["upload", "save", "enqueue", "total"]
+    assert metrics["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = metrics.content.decode("utf-8")
+    assert "books_bytes_read_total 169" in text
+    assert "books_rows_parsed_total 4" in text
+    assert 'books_request_seconds_count{route="books/upload"} 1' in text
+
+
+@pytest.mark.django_db
+def test_metrics_can_be_disabled(client, settings):
+    settings.BOOKS_METRICS = {"ENABLED": False}
+    assert client.get(reverse("metrics")).status_code == 404
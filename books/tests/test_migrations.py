@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+@pytest.fixture
+def migrate(transactional_db):
+    """Migrate books to a migration, returning its historical apps, and back to the latest
+    migration afterwards."""
+
+    def migrate(name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("books", name)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([("books", name)]).apps
+
+    yield migrate
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def test_unique_checksum_migration_deletes_later_duplicates(migrate):
+    # Setup
+    apps = migrate("0005_bookfile_status")
+    BookFile = apps.get_model("books", "BookFile")
+    uploaded = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for name, days, md5_checksum in [
+        ("first.csv", 0, "a" * 32),
+        ("duplicate.csv", 1, "a" * 32),
+        ("other.csv", 1, "b" * 32),
+        ("empty.csv", 2, ""),
+        ("pending.csv", 0, ""),
+    ]:
+        BookFile.objects.create(
+            file_name=name,
+            s3_url=f"https://bucket/{name}",
+            date_uploaded=uploaded + timedelta(days=days),
+            md5_checksum=md5_checksum,
+        )
+    # Actions
+    apps = migrate("0006_bookfile_indexes")
+    # Assertions
+    BookFile = apps.get_model("books", "BookFile")
+    assert sorted(BookFile.objects.values_list("file_name", flat=True)) == [
+        "empty.csv",
+        "first.csv",
+        "other.csv",
+        "pending.csv",
+    ]
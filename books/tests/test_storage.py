@@ -1,11 +1,24 @@
 from datetime import datetime
+import hashlib
+import io
+import mmap
+import pickle
+
 from botocore.client import ClientError
 
 from books.models import BookFile
 from books.storage import (
     CsvFileExistsError,
     CsvFileValidationError,
+    CsvRows,
+    InMemoryUploadFileManager,
+    LocalFileUploadFileManager,
+    NullWriter,
+    S3ObjectWriter,
     S3UploadFileManager,
+    UploadPipeline,
+    get_upload_file_manager,
+    iter_decoded_lines,
 )
 
 import pytest
@@ -32,21 +45,34 @@ def test_initialisation(mocker):
     boto3_mock = mocker.patch("books.storage.boto3.client")
     # Actions
     subject = S3UploadFileManager()
+    # Assertions - bucket is only checked once at startup, not per manager
+    boto3_mock.return_value.head_bucket.assert_not_called()
+    assert subject.client == boto3_mock.return_value
+
+
+def test_ensure_bucket(mocker):
+    # Setup
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    subject = S3UploadFileManager()
+    # Actions
+    subject.ensure_bucket()
     # Assertions
     boto3_mock.return_value.head_bucket.assert_called_once_with(
         Bucket=subject.s3_bucket_name
     )
+    boto3_mock.return_value.create_bucket.assert_not_called()
 
 
-def test_initialisation_no_bucket(mocker):
+def test_ensure_bucket_no_bucket(mocker):
     # Setup
     boto3_mock = mocker.patch("books.storage.boto3.client")
     error_response = {"Error": {"Code": "", "Message": ""}}
     boto3_mock.return_value.head_bucket.side_effect = ClientError(
         error_response, "head_bucket"
     )
-    # Actions
     subject = S3UploadFileManager()
+    # Actions
+    subject.ensure_bucket()
     # Assertions
     boto3_mock.return_value.head_bucket.assert_called_once_with(
         Bucket=subject.s3_bucket_name
@@ -57,14 +83,25 @@ def test_initialisation_no_bucket(mocker):
     )
 
 
+def test_get_upload_file_manager_is_shared(mocker, settings):
+    # Setup
+    settings.BOOKS_S3 = {"BUCKET_NAME": "other-bucket", "MAX_POOL_CONNECTIONS": 25}
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    # Actions
+    first = get_upload_file_manager()
+    second = get_upload_file_manager()
+    # Assertions
+    assert first is second
+    assert first.s3_bucket_name == "other-bucket"
+    boto3_mock.assert_called_once()
+    assert boto3_mock.call_args.kwargs["config"].max_pool_connections == 25
+    boto3_mock.return_value.head_bucket.assert_not_called()
+
+
 def basic_subject_setup(mocker):
     boto3_mock = mocker.patch("books.storage.boto3.client")
     # Actions
     subject = S3UploadFileManager()
-    # Assertions
-    boto3_mock.return_value.head_bucket.assert_called_once_with(
-        Bucket=subject.s3_bucket_name
-    )
     return (subject, boto3_mock)
 
 
@@ -77,9 +114,12 @@ def test_upload_success(mocker, csv_file_like_object):
     db_book_list_obj = subject.upload(csv_file_like_object)
     # Assertions
     s3_file_name = db_book_list_obj.s3_url.split("/")[-1]
-    boto3_mock.return_value.upload_fileobj.assert_called_once_with(
-        csv_file_like_object, subject.s3_bucket_name, s3_file_name
-    )
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        boto3_mock.return_value.put_object.assert_called_once_with(
+            Bucket=subject.s3_bucket_name, Key=s3_file_name, Body=f.read()
+        )
+    assert db_book_list_obj.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert BookFile.objects.get() == db_book_list_obj
     assert (
         db_book_list_obj.s3_url
         == f"https://jc1976bucket.s3.eu-west-1.amazonaws.com/{s3_file_name}"
@@ -102,6 +142,10 @@ def test_upload_failure_as_file_already_exists(
         subject.upload(csv_file_like_object)
     # Assertions
     assert str(excinfo.value) == "File already been upload to system."
+    s3_file_name = boto3_mock.return_value.put_object.call_args.kwargs["Key"]
+    boto3_mock.return_value.delete_object.assert_called_once_with(
+        Bucket=subject.s3_bucket_name, Key=s3_file_name
+    )
 
 
 @pytest.mark.freeze_time("2023-02-07")
@@ -119,6 +163,63 @@ def test_upload_failure_as_file_validation_of_fieldnames(
         str(excinfo.value)
         == "CSV Column Headers were ['Book Author', 'Book titlea', 'Date published', 'Publisher name', 'Unique identifer'] and should be ['BOOK AUTHOR', 'BOOK TITLE', 'DATE PUBLISHED', 'PUBLISHER NAME', 'UNIQUE IDENTIFER']!"
     )
+    boto3_mock.return_value.put_object.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_upload_pipeline_multipart_in_one_read(mocker, csv_file_like_object):
+    # Setup
+    client = mocker.Mock()
+    client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": f"etag-{kwargs['PartNumber']}"
+    }
+    writer = S3ObjectWriter(client, "bucket", "key.csv", part_size=32)
+    read_spy = mocker.spy(csv_file_like_object, "read")
+    # Actions
+    md5 = UploadPipeline(writer, S3UploadFileManager.CSV_HEADERS, chunk_size=16).run(
+        csv_file_like_object
+    )
+    # Assertions
+    assert md5 == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert read_spy.call_count == 12  # 169 bytes in 16 byte chunks, then EOF
+    uploaded = b"".join(c.kwargs["Body"] for c in client.upload_part.call_args_list)
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        assert uploaded == f.read()
+    client.complete_multipart_upload.assert_called_once_with(
+        Bucket="bucket",
+        Key="key.csv",
+        UploadId="upload-1",
+        MultipartUpload={
+            "Parts": [
+                {"PartNumber": n, "ETag": f"etag-{n}"}
+                for n in range(1, client.upload_part.call_count + 1)
+            ]
+        },
+    )
+    client.put_object.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_upload_pipeline_aborts_multipart_on_bad_row(mocker):
+    # Setup
+    client = mocker.Mock()
+    client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    client.upload_part.return_value = {"ETag": "etag"}
+    writer = S3ObjectWriter(client, "bucket", "key.csv", part_size=8)
+    content = (
+        b"Book title,Book Author,Date published,Unique identifer,Publisher name\na,aa\n"
+    )
+    # Actions
+    with pytest.raises(CsvFileValidationError) as excinfo:
+        UploadPipeline(writer, S3UploadFileManager.CSV_HEADERS).run(io.BytesIO(content))
+    # Assertions
+    assert str(excinfo.value) == "CSV line 2: expected 5 columns, found 2"
+    assert excinfo.value.errors == [(2, None, "expected 5 columns, found 2")]
+    client.abort_multipart_upload.assert_called_once_with(
+        Bucket="bucket", Key="key.csv", UploadId="upload-1"
+    )
+    client.complete_multipart_upload.assert_not_called()
 
 
 def test_retrieve_file(mocker, csv_file_like_object):
@@ -133,3 +234,195 @@ def test_retrieve_file(mocker, csv_file_like_object):
         Bucket=subject.s3_bucket_name, Key=input_book_file.s3_url.split("/")[-1]
     )
     assert output_file == csv_file_like_object
+
+
+def test_iter_decoded_lines_across_chunk_boundaries():
+    # Setup - split a multi-byte character and a "\r\n" pair across chunks
+    data = "a,é\r\nb,c\nd,e".encode("utf-8")
+    chunks = [data[:3], data[3:5], data[5:6], data[6:]]
+    # Actions
+    lines = list(iter_decoded_lines(chunks))
+    # Assertions
+    assert lines == ["a,é\r\n", "b,c\n", "d,e"]
+
+
+def test_csv_file_object_to_dict(mocker, csv_file_like_object):
+    # Setup
+    subject, boto3_mock = basic_subject_setup(mocker)
+    # Actions
+    output = subject.csv_file_object_to_dict(csv_file_like_object)
+    # Assertions
+    assert isinstance(output["rows"], CsvRows)
+    assert len(output["rows"]) == 4
+    assert output["rows"][0] == {
+        "Book Author": "aa",
+        "Book title": "a",
+        "Date published": "12/12/1976",
+        "Publisher name": "aaa",
+        "Unique identifer": "1001",
+    }
+
+
+def test_upload_pipeline_records_row_offsets(csv_file_like_object):
+    # Setup
+    pipeline = UploadPipeline(
+        NullWriter(), S3UploadFileManager.CSV_HEADERS, chunk_size=16, index_stride=2
+    )
+    # Actions
+    pipeline.consume(csv_file_like_object)
+    # Assertions
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        data = f.read()
+    assert pipeline.row_count == 4
+    assert pipeline.row_index == {
+        "stride": 2,
+        "header": [
+            "Book title",
+            "Book Author",
+            "Date published",
+            "Unique identifer",
+            "Publisher name",
+        ],
+        "offsets": [data.index(b"a,aa"), data.index(b"c,cc")],
+    }
+
+
+def test_retrieve_rows_reads_from_indexed_offset(mocker):
+    # Setup
+    subject, boto3_mock = basic_subject_setup(mocker)
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        data = f.read()
+    offset = data.index(b"c,cc")
+    boto3_mock.return_value.get_object.return_value = {
+        "Body": io.BytesIO(data[offset:])
+    }
+    book_file = BookFile(
+        s3_url="http://here.com/a.csv",
+        row_count=4,
+        row_index={
+            "stride": 2,
+            "header": [
+                "Book title",
+                "Book Author",
+                "Date published",
+                "Unique identifer",
+                "Publisher name",
+            ],
+            "offsets": [data.index(b"a,aa"), offset],
+        },
+    )
+    # Actions
+    rows = subject.retrieve_rows(book_file, 3, 10)
+    # Assertions
+    boto3_mock.return_value.get_object.assert_called_once_with(
+        Bucket=subject.s3_bucket_name, Key="a.csv", Range=f"bytes={offset}-"
+    )
+    assert rows == [
+        {
+            "Book Author": "dd",
+            "Book title": "d",
+            "Date published": "17/1/2022",
+            "Publisher name": "ddd",
+            "Unique identifer": "1004",
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_local_file_upload_and_mmap_retrieve(tmp_path, csv_file_like_object):
+    # Setup
+    subject = LocalFileUploadFileManager(tmp_path)
+    # Actions
+    book_file = subject.upload(csv_file_like_object)
+    body = subject.retrieve(book_file)
+    rows = subject.retrieve_rows(book_file, 1, 2)
+    # Assertions
+    key = book_file.s3_url.split("/")[-1]
+    assert book_file.s3_url == (tmp_path / key).as_uri()
+    assert isinstance(body, mmap.mmap)
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        assert body.read() == f.read()
+    assert [row["Book title"] for row in rows] == ["b", "c"]
+    subject.delete(book_file)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_local_file_upload_validation_failure_leaves_nothing(
+    tmp_path, csv_file_like_object_validation_errors
+):
+    # Setup
+    subject = LocalFileUploadFileManager(tmp_path)
+    # Actions
+    with pytest.raises(CsvFileValidationError):
+        subject.upload(csv_file_like_object_validation_errors)
+    # Assertions
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_in_memory_upload_duplicate_is_discarded(csv_file_like_object, create_bookfile):
+    # Setup
+    subject = InMemoryUploadFileManager()
+    # Actions
+    with pytest.raises(CsvFileExistsError):
+        subject.upload(csv_file_like_object)
+    # Assertions
+    assert subject.objects == {}
+
+
+@pytest.mark.django_db
+def test_content_addressed_upload_keeps_shared_object(csv_file_like_object):
+    # Setup
+    subject = InMemoryUploadFileManager(content_addressed=True)
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        key = f"{hashlib.sha256(f.read()).hexdigest()}.csv"
+    # Actions
+    book_file = subject.upload(csv_file_like_object)
+    with pytest.raises(CsvFileExistsError):
+        subject.upload(csv_file_like_object)
+    # Assertions
+    assert book_file.s3_url == f"memory://books/{key}"
+    assert list(subject.objects) == [key]
+
+
+@pytest.mark.django_db
+def test_content_addressed_s3_upload_skips_existing_object(
+    mocker, csv_file_like_object
+):
+    # Setup
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    subject = S3UploadFileManager(content_addressed=True)
+    # Actions
+    book_file = subject.upload(csv_file_like_object)
+    # Assertions
+    key = book_file.s3_url.split("/")[-1]
+    boto3_mock.return_value.head_object.assert_called_once_with(
+        Bucket=subject.s3_bucket_name, Key=key
+    )
+    boto3_mock.return_value.put_object.assert_not_called()
+    assert book_file.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert book_file.row_count == 4
+
+
+def test_get_upload_file_manager_uses_configured_backend(memory_storage):
+    assert isinstance(memory_storage, InMemoryUploadFileManager)
+    assert get_upload_file_manager() is memory_storage
+
+
+def test_csv_rows_are_compact_and_dict_like():
+    # Setup
+    header = ["Book title", "Book Author", "Date published"]
+    # Actions
+    rows = CsvRows.from_reader(header, [["a", "aa", "1/1/2000"], [], ["b", "bb"]])
+    # Assertions
+    assert rows.fields == ("Book Author", "Book title", "Date published")
+    assert rows._values == [("aa", "a", "1/1/2000"), ("bb", "b", None)]
+    assert list(rows[0].keys()) == ["Book Author", "Book title", "Date published"]
+    assert rows[0].values() == ("aa", "a", "1/1/2000")
+    assert rows[1]["Book title"] == "b"
+    assert rows[1:] == [
+        {"Book Author": "bb", "Book title": "b", "Date published": None}
+    ]
+    assert pickle.loads(pickle.dumps(rows)) == rows
+    assert not hasattr(rows[0], "__dict__")
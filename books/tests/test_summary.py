@@ -0,0 +1,73 @@
+from books.summary import SummaryCollector, merge_summaries, published_year
+
+HEADER = [
+    "Book title",
+    "Book Author",
+    "Date published",
+    "Unique identifer",
+    "Publisher name",
+]
+
+
+def summarize(rows, max_keys=1000):
+    collector = SummaryCollector(HEADER)
+    for row in rows:
+        collector.add(row)
+    return collector.as_dict(max_keys)
+
+
+def test_published_year():
+    assert published_year("15/2/1984") == "1984"
+    assert published_year(" 1984-02-15 ") == "1984"
+    assert published_year("") is None
+    assert published_year("15/2/84") is None
+
+
+def test_summary_collector_counts_rows():
+    # Actions
+    summary = summarize(
+        [
+            ["a", "aa", "12/12/1976", "1001", "aaa"],
+            ["b", "bb", "3/9/1976", "1002", "aaa"],
+            ["c", "aa ", "", "1003", "ccc"],
+        ]
+    )
+    # Assertions
+    assert summary == {
+        "row_count": 3,
+        "distinct_authors": 2,
+        "distinct_publishers": 2,
+        "authors": {"aa": 2, "bb": 1},
+        "publishers": {"aaa": 2, "ccc": 1},
+        "years": {"1976": 2},
+        "undated": 1,
+        "truncated": False,
+    }
+
+
+def test_merge_summaries_adds_counts():
+    # Setup
+    first = summarize(
+        [
+            ["a", "aa", "12/12/1976", "1001", "aaa"],
+            ["b", "bb", "3/9/2013", "1002", "bbb"],
+            ["c", "cc", "3/9/2013", "1003", "bbb"],
+        ],
+        max_keys=2,
+    )
+    second = summarize([["d", "aa", "1/1/2013", "1004", "bbb"]])
+    # Actions
+    merged = merge_summaries([first, second], top=1)
+    # Assertions
+    assert merged == {
+        "file_count": 2,
+        "row_count": 4,
+        # A lower bound, as the first summary only kept two authors
+        "distinct_authors": 3,
+        "distinct_publishers": 2,
+        "authors": {"aa": 2},
+        "publishers": {"bbb": 3},
+        "years": {"1976": 1, "2013": 3},
+        "undated": 0,
+        "truncated": True,
+    }
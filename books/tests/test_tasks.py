@@ -0,0 +1,191 @@
+import shutil
+
+import pytest
+from django.utils import timezone
+
+from books.models import BookFile
+from books.notifications import NotificationBuffer, reset_notification_session
+from books.storage import get_upload_file_manager
+from books.tasks import (
+    _reset_worker_connections,
+    queue_notification,
+    task_flush_notifications,
+    task_process_notification_batch,
+    task_process_upload,
+)
+
+
+@pytest.fixture
+def pending_bookfile():
+    return BookFile.objects.create(
+        file_name="book-success.csv",
+        s3_url="",
+        date_uploaded=timezone.now(),
+        md5_checksum="",
+        file_size=169,
+        status=BookFile.Status.PENDING,
+    )
+
+
+@pytest.fixture
+def staged_path(tmp_path):
+    path = tmp_path / "staged.csv"
+    shutil.copy("books/tests/resources/book-success.csv", path)
+    return path
+
+
+@pytest.mark.django_db
+def test_task_process_upload_completes(mocker, pending_bookfile, staged_path):
+    # Setup
+    mocker.patch("books.storage.boto3.client")
+    uploaded_mock = mocker.patch("books.tasks.on_book_file_uploaded")
+    # Actions
+    task_process_upload(pending_bookfile.id, str(staged_path))
+    # Assertions
+    pending_bookfile.refresh_from_db()
+    assert pending_bookfile.status == BookFile.Status.COMPLETE
+    assert pending_bookfile.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert pending_bookfile.s3_url.startswith("https://jc1976bucket.s3")
+    assert pending_bookfile.row_count == 4
+    assert pending_bookfile.progress_percent == 100
+    assert not staged_path.exists()
+    uploaded_mock.assert_called_once_with(pending_bookfile)
+
+
+@pytest.mark.django_db
+def test_task_process_upload_records_failure(
+    mocker, pending_bookfile, staged_path, create_bookfile
+):
+    # Setup - create_bookfile has the same checksum as the staged file
+    mocker.patch("books.storage.boto3.client")
+    uploaded_mock = mocker.patch("books.tasks.on_book_file_uploaded")
+    # Actions
+    task_process_upload(pending_bookfile.id, str(staged_path))
+    # Assertions
+    pending_bookfile.refresh_from_db()
+    assert pending_bookfile.status == BookFile.Status.FAILED
+    assert pending_bookfile.status_message == (
+        "Failed to upload book-success.csv due to validation - "
+        "File already been upload to system.."
+    )
+    assert not staged_path.exists()
+    uploaded_mock.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_task_process_upload_validates_large_file_in_parallel(
+    mocker, settings, pending_bookfile, staged_path
+):
+    # Setup
+    settings.BOOKS_VALIDATION = {
+        "PARALLEL_THRESHOLD": 0,
+        "CHUNK_SIZE": 64,
+        "WORKERS": 2,
+    }
+    staged_path.write_bytes(staged_path.read_bytes() + b"\ne,ee,1/1/2000,,eee\n")
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    # Actions
+    task_process_upload(pending_bookfile.id, str(staged_path))
+    # Assertions
+    pending_bookfile.refresh_from_db()
+    assert pending_bookfile.status == BookFile.Status.FAILED
+    assert pending_bookfile.status_message == (
+        "Failed to upload book-success.csv due to validation - "
+        "CSV line 6: UNIQUE IDENTIFER is empty."
+    )
+    boto3_mock.return_value.put_object.assert_not_called()
+
+
+@pytest.fixture
+def batching(settings, mocker):
+    settings.BOOKS_NOTIFICATIONS = {
+        "BATCHING": True,
+        "BATCH_SIZE": 2,
+        "BATCH_WINDOW": 5,
+    }
+    buffer = mocker.Mock(spec=NotificationBuffer)
+    mocker.patch("books.tasks.NotificationBuffer.from_settings", return_value=buffer)
+    return buffer
+
+
+def test_queue_notification_schedules_flush_for_window(mocker, batching):
+    # Setup
+    batching.push.return_value = 1
+    batching.claim_flush.return_value = True
+    flush_mock = mocker.patch("books.tasks.task_flush_notifications")
+    # Actions
+    queue_notification("https://bucket/a.csv")
+    # Assertions
+    batching.push.assert_called_once_with("https://bucket/a.csv")
+    batching.claim_flush.assert_called_once_with(5)
+    flush_mock.apply_async.assert_called_once_with(countdown=5)
+    flush_mock.delay.assert_not_called()
+
+
+def test_queue_notification_flushes_full_batch(mocker, batching):
+    # Setup
+    batching.push.return_value = 2
+    flush_mock = mocker.patch("books.tasks.task_flush_notifications")
+    # Actions
+    queue_notification("https://bucket/b.csv")
+    # Assertions
+    flush_mock.delay.assert_called_once_with()
+    batching.claim_flush.assert_not_called()
+
+
+def test_queue_notification_flushes_only_when_batch_fills(mocker, batching):
+    # Setup
+    batching.push.return_value = 3
+    batching.claim_flush.return_value = False
+    flush_mock = mocker.patch("books.tasks.task_flush_notifications")
+    # Actions
+    queue_notification("https://bucket/c.csv")
+    # Assertions
+    flush_mock.delay.assert_not_called()
+    flush_mock.apply_async.assert_not_called()
+
+
+def test_notification_buffers_share_redis_client(mocker):
+    # Setup
+    reset_notification_session()
+    from_url_mock = mocker.patch("books.notifications.redis.Redis.from_url")
+    # Actions
+    first = NotificationBuffer.from_settings()
+    second = NotificationBuffer.from_settings()
+    reset_notification_session()
+    # Assertions
+    from_url_mock.assert_called_once()
+    assert first.client is second.client
+
+
+def test_task_flush_notifications_sends_batches(mocker, batching):
+    # Setup
+    batching.pop.side_effect = [["a", "b"], ["c"], []]
+    batch_mock = mocker.patch("books.tasks.task_process_notification_batch")
+    # Actions
+    task_flush_notifications()
+    # Assertions
+    batching.release_flush.assert_called_once_with()
+    assert batch_mock.delay.call_args_list == [
+        mocker.call(["a", "b"]),
+        mocker.call(["c"]),
+    ]
+
+
+def test_task_process_notification_batch_uses_pooled_session(mocker):
+    # Setup
+    session = mocker.Mock()
+    mocker.patch("books.tasks.get_notification_session", return_value=session)
+    # Actions
+    task_process_notification_batch(["a", "b"])
+    # Assertions
+    session.post.assert_called_once_with(
+        "https://postman-echo.com/post", json={"s3_urls": ["a", "b"]}
+    )
+
+
+def test_worker_process_drops_inherited_storage_client(memory_storage):
+    # Actions
+    _reset_worker_connections()
+    # Assertions
+    assert get_upload_file_manager() is not memory_storage
@@ -0,0 +1,160 @@
+import io
+import multiprocessing
+
+import pytest
+
+from books.storage import (
+    CsvFileValidationError,
+    InMemoryUploadFileManager,
+    UploadPipeline,
+    NullWriter,
+)
+from books import validation
+from books.validation import RowError, RowValidator, split_chunks, validate_file
+
+HEADER = [
+    "Book title",
+    "Book Author",
+    "Date published",
+    "Unique identifer",
+    "Publisher name",
+]
+
+
+def write_csv(path, rows):
+    lines = [",".join(HEADER)] + rows
+    path.write_bytes(("\n".join(lines) + "\n").encode("utf-8"))
+    return path
+
+
+def test_row_validator_checks_each_column():
+    # Setup
+    subject = RowValidator(HEADER)
+    # Actions
+    valid = subject.check(2, ["a", "aa", "12/12/1976", "1001", "aaa"])
+    subject.check(3, ["b", "bb", "31/31/2000", "1002", "bbb"])
+    subject.check(4, ["c", "cc", "15/2/1984", " ", "ccc"])
+    subject.check(5, ["d", "dd"])
+    # Assertions
+    assert valid
+    assert subject.errors == [
+        RowError(3, "DATE PUBLISHED", "DATE PUBLISHED '31/31/2000' is not a date"),
+        RowError(4, "UNIQUE IDENTIFER", "UNIQUE IDENTIFER is empty"),
+        RowError(5, None, "expected 5 columns, found 2"),
+    ]
+
+
+def test_row_validator_caps_errors():
+    # Setup
+    subject = RowValidator(HEADER, max_errors=2)
+    # Actions
+    for line in range(2, 6):
+        subject.check(line, ["a", "aa", "12/12/1976", "", "aaa"])
+    # Assertions
+    assert [error.line for error in subject.errors] == [2, 3]
+    assert subject.error_count == 4
+    assert subject.is_full
+
+
+def test_split_chunks_ends_on_newlines(tmp_path):
+    # Setup
+    path = write_csv(tmp_path / "a.csv", [f"t{n},a,1/1/2000,{n},p" for n in range(50)])
+    data = path.read_bytes()
+    # Actions
+    bounds = split_chunks(str(path), 100)
+    # Assertions
+    assert len(bounds) > 1
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(data)
+    for (_, end), (start, _) in zip(bounds, bounds[1:]):
+        assert end == start
+        assert data[end - 1 : end] == b"\n"
+
+
+def test_validate_file_numbers_lines_across_chunks(tmp_path):
+    # Setup
+    rows = [f"t{n},a,1/1/2000,{n},p" for n in range(200)]
+    rows[10] = "t10,a,not a date,10,p"
+    rows[150] = "t150,a,1/1/2000,,p"
+    path = write_csv(tmp_path / "a.csv", rows)
+    # Actions
+    errors, error_count = validate_file(str(path), HEADER, chunk_size=256, workers=2)
+    # Assertions
+    assert error_count == 2
+    assert [(error.line, error.column) for error in errors] == [
+        (12, "DATE PUBLISHED"),
+        (152, "UNIQUE IDENTIFER"),
+    ]
+
+
+def test_validate_file_rechecks_quoted_newline_split_between_chunks(tmp_path, mocker):
+    # Setup
+    validate_chunk_spy = mocker.spy(validation, "validate_chunk")
+    rows = [f"t{n},a,1/1/2000,{n},p" for n in range(20)]
+    rows[5] = (
+        't5,a,1/1/2000,5,"publisher\n' + "\n".join(f"line {n}" for n in range(20)) + '"'
+    )
+    rows[15] = "t15,,1/1/2000,15,p"
+    path = write_csv(tmp_path / "a.csv", rows)
+    # Actions
+    errors, error_count = validate_file(str(path), HEADER, chunk_size=64, workers=2)
+    # Assertions
+    assert error_count == 1
+    assert errors == [RowError(37, "BOOK AUTHOR", "BOOK AUTHOR is empty")]
+    # Streamed again rather than read whole as one chunk
+    validate_chunk_spy.assert_not_called()
+
+
+def _validate_in_child(path, queue):
+    errors, error_count = validate_file(path, HEADER, chunk_size=256, workers=2)
+    queue.put((len(errors), error_count))
+
+
+def test_validate_file_runs_in_daemonic_process(tmp_path):
+    """Celery's prefork pool runs tasks in daemonic processes."""
+    # Setup
+    rows = [f"t{n},a,1/1/2000,{n},p" for n in range(200)]
+    rows[10] = "t10,a,1/1/2000,,p"
+    path = write_csv(tmp_path / "a.csv", rows)
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    worker = context.Process(
+        target=_validate_in_child, args=(str(path), queue), daemon=True
+    )
+    # Actions
+    worker.start()
+    result = queue.get(timeout=60)
+    worker.join()
+    # Assertions
+    assert result == (1, 1)
+    assert worker.exitcode == 0
+
+
+def test_upload_pipeline_reports_row_errors():
+    # Setup
+    content = (
+        ",".join(HEADER)
+        + "\na,aa,12/12/1976,,aaa\nb,bb,1/1/2000,1002,bbb\nc,cc,x,1003,\n"
+    ).encode("utf-8")
+    # Actions
+    with pytest.raises(CsvFileValidationError) as excinfo:
+        UploadPipeline(NullWriter(), InMemoryUploadFileManager.CSV_HEADERS).run(
+            io.BytesIO(content)
+        )
+    # Assertions
+    assert str(excinfo.value) == (
+        "CSV line 2: UNIQUE IDENTIFER is empty; "
+        "CSV line 4: DATE PUBLISHED 'x' is not a date; "
+        "CSV line 4: PUBLISHER NAME is empty"
+    )
+    assert len(excinfo.value.errors) == 3
+
+
+def test_validate_file_rows_checks_header_first(tmp_path):
+    # Setup
+    path = tmp_path / "a.csv"
+    path.write_bytes(b"Book title,Author\na,b\n")
+    # Actions
+    with pytest.raises(CsvFileValidationError) as excinfo:
+        InMemoryUploadFileManager().validate_file_rows(str(path))
+    # Assertions
+    assert str(excinfo.value).startswith("CSV Column Headers were")
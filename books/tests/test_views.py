@@ -1,12 +1,22 @@
 import pytest
 
-from django.urls import reverse
+from datetime import timedelta
 
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+
+import importlib
+import io
 import uuid
+import zipfile
 
 import pytest
 
-from books.models import BookFile
+import book_explorer.urls
+import books.urls
+import books.views
+from books.models import Book, BookFile
+from books.views import parse_range
 
 
 @pytest.fixture
@@ -44,13 +54,429 @@ def test_book_file_homepage(auto_login_user):
     assert "Current Book list Files" in response.content.decode("utf-8")
 
 
-# @pytest.mark.django_db
-# def test_book_file_detail(auto_login_user, django_user_model, create_bookfile):
-#     client, user = auto_login_user()
-#     assert BookFile.objects.count() == 1
-#     found_book_list = BookFile.objects.first()
-#     print(found_book_list.pk)
-#     url = reverse("books:detail", kwargs={"pk": found_book_list.pk})
-#     response = client.get(url)
-#     assert response.status_code == 200
-#     assert "someone" in response.content.decode("utf-8")
+@pytest.mark.django_db
+def test_book_file_detail_paginates_rows(auto_login_user, create_bookfile, mocker):
+    client, user = auto_login_user()
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        data = f.read()
+
+    def get_object(Bucket, Key, Range="bytes=0-"):
+        return {"Body": io.BytesIO(data[int(Range[6:-1]) :])}
+
+    boto3_mock.return_value.get_object.side_effect = get_object
+    url = reverse("books:detail", kwargs={"pk": create_bookfile.pk})
+    response = client.get(url, {"page": 2, "page_size": 3})
+    assert response.status_code == 200
+    create_bookfile.refresh_from_db()
+    assert create_bookfile.row_count == 4
+    assert [row["Book title"] for row in response.context["csv_row_list"]] == ["d"]
+    assert response.context["page_obj"].paginator.num_pages == 2
+    # Second view of the same page is served from the parsed CSV cache
+    boto3_mock.return_value.get_object.reset_mock()
+    response = client.get(url, {"page": 2, "page_size": 3})
+    assert [row["Book title"] for row in response.context["csv_row_list"]] == ["d"]
+    boto3_mock.return_value.get_object.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_book_file_detail_indexes_legacy_file_without_validating(
+    auto_login_user, memory_storage
+):
+    # Setup
+    client, user = auto_login_user()
+    memory_storage.objects["legacy.csv"] = (
+        b"Book title,Book Author,Date published,Unique identifer,Publisher name\n"
+        b"a,aa,12/12/1976,,aaa\nb,bb,not a date,,bbb\nc,cc\n"
+    )
+    book_file = BookFile.objects.create(
+        file_name="legacy.csv",
+        s3_url=memory_storage.key_url("legacy.csv"),
+        date_uploaded=timezone.now(),
+        md5_checksum="legacy",
+    )
+    # Actions
+    response = client.get(reverse("books:detail", args=[book_file.id]))
+    # Assertions
+    assert response.status_code == 200
+    assert [row["Book title"] for row in response.context["csv_row_list"]] == [
+        "a",
+        "b",
+        "c",
+    ]
+    book_file.refresh_from_db()
+    assert book_file.row_count == 3
+    assert book_file.summary["row_count"] == 2
+
+
+@pytest.mark.django_db
+def test_upload_saves_book_file_and_queues_tasks(auto_login_user, mocker):
+    client, user = auto_login_user()
+    mocker.patch("books.storage.boto3.client")
+    notification_mock = mocker.patch("books.tasks.task_process_notification")
+    ingest_mock = mocker.patch("books.tasks.task_ingest_book_file")
+    sidecar_mock = mocker.patch("books.tasks.task_build_columnar_sidecar")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        response = client.post(reverse("books:upload"), {"upload": f})
+    book_file = BookFile.objects.get()
+    assert response.status_code == 302
+    assert response.url == reverse("books:detail", args=[book_file.id])
+    assert book_file.row_count == 4
+    notification_mock.delay.assert_called_once_with(book_file.s3_url)
+    ingest_mock.delay.assert_called_once_with(book_file.id)
+    sidecar_mock.delay.assert_called_once_with(book_file.id)
+
+
+@pytest.mark.django_db
+def test_search_finds_books_across_lists(auto_login_user, create_bookfile):
+    client, user = auto_login_user()
+    Book.objects.bulk_create(
+        [
+            Book(
+                book_file=create_bookfile,
+                row_number=0,
+                author="Mary Shelley",
+                title="Frankenstein",
+                publisher="Lackington",
+            ),
+            Book(
+                book_file=create_bookfile,
+                row_number=120,
+                author="Bram Stoker",
+                title="Dracula",
+                publisher="Constable",
+            ),
+        ]
+    )
+    response = client.get(reverse("books:search"), {"q": "drac"})
+    assert response.status_code == 200
+    results = response.context["results"]
+    assert [result["book"].title for result in results] == ["Dracula"]
+    assert results[0]["page"] == 3
+    assert {"row_index", "summary"} <= results[0][
+        "book"
+    ].book_file.get_deferred_fields()
+    assert f"/books/{create_bookfile.id}/?page=3" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_async_upload_stages_file_and_reports_status(
+    auto_login_user, mocker, settings, tmp_path
+):
+    client, user = auto_login_user()
+    settings.BOOKS_UPLOAD_STAGING_DIR = tmp_path
+    process_mock = mocker.patch("books.views.task_process_upload")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        response = client.post(reverse("books:upload"), {"upload": f, "async": "1"})
+    book_file = BookFile.objects.get()
+    assert response.url == reverse("books:detail", args=[book_file.id])
+    assert book_file.status == BookFile.Status.PENDING
+    staged_path = process_mock.delay.call_args.args[1]
+    with open(staged_path, "rb") as staged, open(
+        "books/tests/resources/book-success.csv", "rb"
+    ) as f:
+        assert staged.read() == f.read()
+    response = client.get(reverse("books:upload_status", args=[book_file.id]))
+    assert response.json() == {
+        "id": book_file.id,
+        "status": "pending",
+        "message": "",
+        "bytes_processed": 0,
+        "file_size": 169,
+        "progress": 0,
+    }
+    response = client.get(reverse("books:detail", args=[book_file.id]))
+    assert "Upload Pending" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_bulk_upload_zip_and_csv_files(auto_login_user, mocker, create_bookfile):
+    client, user = auto_login_user()
+    boto3_mock = mocker.patch("books.storage.boto3.client")
+    uploaded_mock = mocker.patch("books.views.on_book_file_uploaded")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        success = f.read()
+    with open("books/tests/resources/book-failure.csv", "rb") as f:
+        failure = f.read()
+    other = success.replace(b"d,dd", b"e,ee")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("lists/other.csv", other)
+        zf.writestr("lists/other-again.csv", other)
+        zf.writestr("lists/failure.csv", failure)
+        zf.writestr("readme.txt", b"not a book list")
+    archive.name = "lists.zip"
+    archive.seek(0)
+    existing = io.BytesIO(success)
+    existing.name = "existing.csv"
+    response = client.post(
+        reverse("books:bulk_upload"), {"upload": [archive, existing]}
+    )
+    report = response.json()
+    assert response.status_code == 200
+    assert [r["file_name"] for r in report["results"]] == [
+        "lists/other.csv",
+        "lists/other-again.csv",
+        "lists/failure.csv",
+        "existing.csv",
+    ]
+    assert [r["success"] for r in report["results"]] == [True, False, False, False]
+    assert report["uploaded"] == 1
+    assert report["failed"] == 3
+    book_file = BookFile.objects.get(pk=report["results"][0]["id"])
+    assert book_file.file_name == "lists/other.csv"
+    assert book_file.row_count == 4
+    assert BookFile.objects.count() == 2
+    # The duplicates were uploaded, then removed once found
+    assert boto3_mock.return_value.delete_object.call_count == 2
+    uploaded_mock.assert_called_once_with(book_file)
+
+
+@pytest.mark.django_db
+def test_book_file_homepage_keyset_pagination(auto_login_user):
+    client, user = auto_login_user()
+    uploaded = timezone.now()
+    BookFile.objects.bulk_create(
+        BookFile(
+            file_name=f"list-{i}.csv",
+            s3_url=f"https://jc1976bucket.s3.eu-west-1.amazonaws.com/{i}.csv",
+            date_uploaded=uploaded + timedelta(minutes=i // 2),
+            md5_checksum=f"{i}",
+        )
+        for i in range(25)
+    )
+    response = client.get(reverse("books:index"))
+    page = response.context["page_obj"]
+    assert [f.file_name for f in page] == [f"list-{i}.csv" for i in range(10)]
+    assert all({"row_index", "summary"} <= f.get_deferred_fields() for f in page)
+    assert page.previous_cursor is None
+    response = client.get(reverse("books:index"), {"cursor": page.next_cursor})
+    page = response.context["page_obj"]
+    assert [f.file_name for f in page] == [f"list-{i}.csv" for i in range(10, 20)]
+    response = client.get(reverse("books:index"), {"cursor": page.next_cursor})
+    page = response.context["page_obj"]
+    assert [f.file_name for f in page] == [f"list-{i}.csv" for i in range(20, 25)]
+    assert page.next_cursor is None
+    response = client.get(reverse("books:index"), {"cursor": page.previous_cursor})
+    page = response.context["page_obj"]
+    assert [f.file_name for f in page] == [f"list-{i}.csv" for i in range(10, 20)]
+    assert f"?cursor={page.next_cursor}" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_chunked_upload_resumes_after_dropped_chunk(
+    auto_login_user, memory_storage, settings, mocker
+):
+    # Setup
+    client, user = auto_login_user()
+    settings.BOOKS_CHUNKED_UPLOADS = {"CHUNK_SIZE": 100}
+    uploaded_mock = mocker.patch("books.views.on_book_file_uploaded")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        data = f.read()
+    response = client.post(
+        reverse("books:chunked_upload_init"),
+        {"file_name": "books.csv", "file_size": len(data)},
+    )
+    session_id = response.json()["id"]
+
+    def put_chunk(part_number, chunk):
+        return client.generic(
+            "PUT",
+            reverse("books:chunked_upload_chunk", args=[session_id, part_number]),
+            chunk,
+            content_type="application/octet-stream",
+        )
+
+    # Actions
+    first = put_chunk(1, data[:100])
+    status = client.get(reverse("books:chunked_upload_status", args=[session_id]))
+    second = put_chunk(2, data[100:])
+    complete = client.post(reverse("books:chunked_upload_complete", args=[session_id]))
+    # Assertions
+    assert response.status_code == 201
+    assert response.json()["chunk_count"] == 2
+    assert first.status_code == 200
+    assert status.json()["missing_chunks"] == [2]
+    assert second.json()["bytes_received"] == len(data)
+    assert complete.status_code == 201
+    book_file = BookFile.objects.get(pk=complete.json()["book_file_id"])
+    assert book_file.md5_checksum == "4d7413b5bc13664f4d823ab9ae14f2cf"
+    assert book_file.file_name == "books.csv"
+    uploaded_mock.assert_called_once_with(book_file)
+
+
+@pytest.mark.parametrize(
+    "row,message",
+    [
+        (b"\xff\xfe,aa,12/12/1976,1,aaa\n", "File is not UTF-8 text."),
+        (
+            b"a," + b"x" * 140_000 + b",12/12/1976,1,aaa\n",
+            "File is not a valid CSV: field larger than field limit (131072).",
+        ),
+    ],
+)
+@pytest.mark.django_db
+def test_chunked_upload_fails_unreadable_chunk(
+    auto_login_user, memory_storage, settings, row, message
+):
+    # Setup
+    client, user = auto_login_user()
+    settings.BOOKS_CHUNKED_UPLOADS = {"CHUNK_SIZE": 200_000}
+    data = (
+        b"Book title,Book Author,Date published,Unique identifer,Publisher name\n"
+        + row
+        + b"b,bb,12/12/1976,2,bbb\n"
+    )
+    session_id = client.post(
+        reverse("books:chunked_upload_init"),
+        {"file_name": "books.csv", "file_size": len(data)},
+    ).json()["id"]
+    # Actions
+    response = client.generic(
+        "PUT",
+        reverse("books:chunked_upload_chunk", args=[session_id, 1]),
+        data,
+        content_type="application/octet-stream",
+    )
+    status = client.get(reverse("books:chunked_upload_status", args=[session_id]))
+    # Assertions
+    assert response.status_code == 400
+    assert response.json()["message"] == message
+    assert status.json()["status"] == "failed"
+    assert memory_storage.multipart_uploads == {}
+    assert memory_storage.objects == {}
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.BOOKS_ASYNC_VIEWS = True
+    importlib.reload(books.urls)
+    importlib.reload(book_explorer.urls)
+    clear_url_caches()
+    yield
+    settings.BOOKS_ASYNC_VIEWS = False
+    importlib.reload(books.urls)
+    importlib.reload(book_explorer.urls)
+    clear_url_caches()
+
+
+@pytest.mark.django_db
+def test_async_views_upload_and_show_rows(
+    auto_login_user, async_views, memory_storage, mocker
+):
+    client, user = auto_login_user()
+    uploaded_mock = mocker.patch("books.views.on_book_file_uploaded")
+    blocking_spy = mocker.spy(books.views, "run_blocking")
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        response = client.post(reverse("books:upload"), {"upload": f})
+    book_file = BookFile.objects.get()
+    detail = client.get(reverse("books:detail", args=[book_file.id]), {"page_size": 2})
+    assert response.url == reverse("books:detail", args=[book_file.id])
+    uploaded_mock.assert_called_once_with(book_file)
+    assert detail.status_code == 200
+    assert [row["Book title"] for row in detail.context["csv_row_list"]] == ["a", "b"]
+    assert blocking_spy.call_count == 3  # upload, notification and fetching the page
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=x-1", 100) is None
+    assert parse_range("", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+@pytest.mark.django_db
+def test_download_streams_file_with_etag_and_ranges(
+    auto_login_user, memory_storage, mocker
+):
+    client, user = auto_login_user()
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        data = f.read()
+        f.seek(0)
+        book_file = memory_storage.upload(f)
+    url = reverse("books:download", args=[book_file.id])
+    etag = f'"{book_file.md5_checksum}"'
+
+    full = client.get(url)
+    retrieve_spy = mocker.spy(memory_storage, "retrieve")
+    not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    partial = client.get(url, HTTP_RANGE="bytes=10-19")
+    stale_range = client.get(url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"other"')
+    past_end = client.get(url, HTTP_RANGE=f"bytes={len(data)}-")
+
+    assert full.status_code == 200
+    assert b"".join(full.streaming_content) == data
+    assert full["ETag"] == etag
+    assert full["Content-Length"] == str(len(data))
+    assert full["Accept-Ranges"] == "bytes"
+    assert "immutable" in full["Cache-Control"]
+    assert not_modified.status_code == 304
+    assert partial.status_code == 206
+    assert b"".join(partial.streaming_content) == data[10:20]
+    assert partial["Content-Range"] == f"bytes 10-19/{len(data)}"
+    assert stale_range.status_code == 200
+    assert b"".join(stale_range.streaming_content) == data
+    assert past_end.status_code == 416
+    assert retrieve_spy.call_count == 2  # the partial and the stale range requests
+
+
+@pytest.mark.django_db
+def test_export_streams_matching_rows(auto_login_user, memory_storage):
+    client, user = auto_login_user()
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        book_file = memory_storage.upload(f)
+    url = reverse("books:export", args=[book_file.id])
+
+    response = client.get(url, {"columns": "title,published", "publisher": "bbb"})
+    bad = client.get(url, {"columns": "price"})
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/csv"
+    assert b"".join(response.streaming_content) == (
+        b"Book title,Date published\r\nb,3/9/2013\r\n"
+    )
+    assert 'filename="book-success.csv"' in response["Content-Disposition"]
+    assert bad.status_code == 400
+    assert bad.json() == {"message": "Unknown columns price."}
+
+
+@pytest.mark.django_db
+def test_summary_merges_book_file_summaries(auto_login_user, memory_storage):
+    client, user = auto_login_user()
+    with open("books/tests/resources/book-success.csv", "rb") as f:
+        book_file = memory_storage.upload(f)
+    BookFile.objects.create(
+        file_name="old.csv",
+        s3_url="memory://books/old.csv",
+        date_uploaded=timezone.now(),
+        md5_checksum="old",
+    )
+
+    response = client.get(reverse("books:summary"), {"top": 2})
+    selected = client.get(reverse("books:summary"), {"ids": str(book_file.id + 1)})
+
+    assert book_file.summary["years"] == {
+        "1976": 1,
+        "1984": 1,
+        "2013": 1,
+        "2022": 1,
+    }
+    assert response.json() == {
+        "file_count": 1,
+        "row_count": 4,
+        "distinct_authors": 4,
+        "distinct_publishers": 4,
+        "authors": {"aa": 1, "bb": 1},
+        "publishers": {"aaa": 1, "bbb": 1},
+        "years": {"1976": 1, "1984": 1, "2013": 1, "2022": 1},
+        "undated": 0,
+        "truncated": False,
+        "files_without_summary": 1,
+    }
+    assert selected.json()["file_count"] == 0
+    assert selected.json()["files_without_summary"] == 1
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import AuthenticationForm
@@ -5,14 +6,42 @@ from django.contrib.auth.forms import AuthenticationForm
 from . import views
 
 app_name = "books"
+# Under ASGI the async views keep the event loop free while storage responds
+if settings.BOOKS_ASYNC_VIEWS:
+    detail_view, upload_view = views.detail_async, views.upload_async
+else:
+    detail_view, upload_view = views.detail, views.upload
+
 urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
     # path('<int:pk>/', views.DetailView.as_view(), name='detail'),
-    path("<int:pk>/", views.detail, name="detail"),
+    path("<int:pk>/", detail_view, name="detail"),
+    path("<int:pk>/status", views.upload_status, name="upload_status"),
+    path("<int:pk>/download", views.download, name="download"),
+    path("<int:pk>/export", views.export, name="export"),
     # path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
     # path('<int:question_id>/vote/', views.vote, name='vote'),
     path("register/", views.register_request, name="register"),
     path("login/", auth_views.LoginView.as_view(), name="login"),
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
-    path("upload", views.upload, name="upload"),
+    path("upload", upload_view, name="upload"),
+    path("upload/bulk", views.bulk_upload, name="bulk_upload"),
+    path("upload/chunked", views.chunked_upload_init, name="chunked_upload_init"),
+    path(
+        "upload/chunked/<uuid:pk>",
+        views.chunked_upload_status,
+        name="chunked_upload_status",
+    ),
+    path(
+        "upload/chunked/<uuid:pk>/<int:part_number>",
+        views.chunked_upload_chunk,
+        name="chunked_upload_chunk",
+    ),
+    path(
+        "upload/chunked/<uuid:pk>/complete",
+        views.chunked_upload_complete,
+        name="chunked_upload_complete",
+    ),
+    path("search/", views.search, name="search"),
+    path("summary", views.summary, name="summary"),
 ]
@@ -0,0 +1,264 @@
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+import csv
+import io
+import os
+
+from billiard.pool import Pool
+from django.conf import settings
+
+DATE_PUBLISHED_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+# Errors kept per file, enough to fix a file without reporting every row of a broken one
+MAX_ERRORS = 100
+
+
+def parse_date_published(value: str) -> date | None:
+    """Parse a DATE PUBLISHED value such as 15/2/1984, returning None when it can't be."""
+    for date_format in DATE_PUBLISHED_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format).date()
+        except (AttributeError, ValueError):
+            continue
+    return None
+
+
+def required(value: str) -> str | None:
+    if not value.strip():
+        return "is empty"
+    return None
+
+
+def is_date(value: str) -> str | None:
+    if value.strip() and parse_date_published(value) is None:
+        return f"'{value}' is not a date"
+    return None
+
+
+# Checks for each of the CSV_HEADERS, each returns a problem description or None
+COLUMN_RULES: Dict[str, Tuple[Callable[[str], str | None], ...]] = {
+    "BOOK AUTHOR": (required,),
+    "BOOK TITLE": (required,),
+    "DATE PUBLISHED": (required, is_date),
+    "PUBLISHER NAME": (required,),
+    "UNIQUE IDENTIFER": (required,),
+}
+
+
+class RowError(NamedTuple):
+    line: int
+    column: str | None
+    message: str
+
+    def __str__(self) -> str:
+        return f"CSV line {self.line}: {self.message}"
+
+
+def describe_errors(
+    errors: Sequence[RowError], error_count: int, shown: int = 3
+) -> str:
+    """Summarise errors for a status message, e.g. "CSV line 2: ...; CSV line 5: ... and 7
+    more errors"."""
+    message = "; ".join(str(error) for error in errors[:shown])
+    if error_count > shown:
+        message += f" and {error_count - shown} more errors"
+    return message
+
+
+class RowValidator:
+    """Apply COLUMN_RULES to the rows of a CSV, keeping the first max_errors errors.
+
+    Rules are matched to columns by header name, ignoring case, so the order of the columns
+    doesn't matter.
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        max_errors: int = MAX_ERRORS,
+        rules: Dict[str, Tuple[Callable[[str], str | None], ...]] = COLUMN_RULES,
+    ):
+        self.max_errors = max_errors
+        self.columns = [
+            (column.upper(), rules.get(column.upper(), ())) for column in header
+        ]
+        self.errors: List[RowError] = []
+        self.error_count = 0
+
+    @property
+    def is_full(self) -> bool:
+        return self.error_count >= self.max_errors
+
+    def _add(self, error: RowError) -> None:
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+        self.error_count += 1
+
+    def check(self, line: int, row: List[str]) -> bool:
+        """Validate one row, recording any errors against line.
+
+        Returns:
+            bool: The row is valid
+        """
+        if len(row) != len(self.columns):
+            self._add(
+                RowError(
+                    line,
+                    None,
+                    f"expected {len(self.columns)} columns, found {len(row)}",
+                )
+            )
+            return False
+        valid = True
+        for value, (column, checks) in zip(row, self.columns):
+            for check in checks:
+                problem = check(value)
+                if problem is not None:
+                    self._add(RowError(line, column, f"{column} {problem}"))
+                    valid = False
+                    break
+        return valid
+
+
+class ChunkResult(NamedTuple):
+    errors: List[RowError]
+    error_count: int
+    lines: int
+    quotes: int
+
+
+def split_chunks(path: str, chunk_size: int) -> List[Tuple[int, int]]:
+    """Split a file into (start, end) byte ranges of about chunk_size, each ending just after
+    a newline so no line is split between chunks."""
+    size = os.path.getsize(path)
+    bounds = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = start + chunk_size
+            if end < size:
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            else:
+                end = size
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def validate_chunk(
+    path: str,
+    start: int,
+    end: int,
+    header: List[str],
+    max_errors: int = MAX_ERRORS,
+    skip_header: bool = False,
+) -> ChunkResult:
+    """Validate the rows in bytes start to end of a CSV file, run in a worker process.
+
+    Line numbers of the errors are relative to the start of the chunk. The chunk's newline and
+    quote counts are returned so the caller can number lines across chunks and detect a quoted
+    field which spans two chunks.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Chunks end at a newline, so never split a multi byte character
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+    validator = RowValidator(header, max_errors)
+    if skip_header:
+        next(reader, None)
+    for row in reader:
+        if row:
+            validator.check(reader.line_num, row)
+    return ChunkResult(
+        validator.errors, validator.error_count, data.count(b"\n"), data.count(b'"')
+    )
+
+
+def merge_chunk_results(
+    results: Iterable[ChunkResult], max_errors: int = MAX_ERRORS
+) -> Tuple[List[RowError], int]:
+    """Renumber the errors of consecutive chunks from the start of the file and cap them."""
+    errors, error_count, lines = [], 0, 0
+    for result in results:
+        errors.extend(
+            error._replace(line=error.line + lines)
+            for error in result.errors[: max_errors - len(errors)]
+        )
+        error_count += result.error_count
+        lines += result.lines
+    return errors, error_count
+
+
+def validate_file(
+    path: str,
+    header: List[str],
+    max_errors: int | None = None,
+    chunk_size: int | None = None,
+    workers: int | None = None,
+) -> Tuple[List[RowError], int]:
+    """Validate every row of a CSV file on disk, checking chunks of it in parallel processes.
+
+    A quoted field may hold a newline, in which case a chunk could start inside it. Quotes come
+    in pairs, so a chunk with an odd number of them means that might have happened and the file
+    is checked again as a single chunk.
+
+    Args:
+        path (str): Path of the CSV file, whose first line is header
+        header (List[str]): Column names of the file
+        max_errors (int | None): Number of errors to return
+        chunk_size (int | None): Bytes validated by each task
+        workers (int | None): Number of processes, defaults to the number of CPUs
+
+    Returns:
+        Tuple[List[RowError], int]: The first max_errors errors and the total number of errors
+    """
+    config = validation_settings()
+    max_errors = max_errors or config["MAX_ERRORS"]
+    chunk_size = chunk_size or config["CHUNK_SIZE"]
+    workers = workers or config["WORKERS"]
+    bounds = split_chunks(path, chunk_size)
+    if len(bounds) <= 1:
+        results = [
+            validate_chunk(path, 0, os.path.getsize(path), header, max_errors, True)
+        ]
+        return merge_chunk_results(results, max_errors)
+    # billiard, unlike multiprocessing, starts processes from daemonic Celery worker processes
+    with Pool(processes=workers) as pool:
+        pending = [
+            pool.apply_async(
+                validate_chunk, (path, start, end, header, max_errors, index == 0)
+            )
+            for index, (start, end) in enumerate(bounds)
+        ]
+        results = [result.get() for result in pending]
+    if any(result.quotes % 2 for result in results):
+        return validate_file_serially(path, header, max_errors)
+    return merge_chunk_results(results, max_errors)
+
+
+def validate_file_serially(
+    path: str, header: List[str], max_errors: int = MAX_ERRORS
+) -> Tuple[List[RowError], int]:
+    """Validate every row of a CSV file on disk in one process, streaming it so memory doesn't
+    grow with the size of the file."""
+    validator = RowValidator(header, max_errors)
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                validator.check(reader.line_num, row)
+    return validator.errors, validator.error_count
+
+
+def validation_settings() -> dict:
+    config = {
+        "MAX_ERRORS": MAX_ERRORS,
+        "PARALLEL_THRESHOLD": 64 * 1024 * 1024,
+        "CHUNK_SIZE": 16 * 1024 * 1024,
+        "WORKERS": None,
+    }
+    config.update(getattr(settings, "BOOKS_VALIDATION", {}))
+    return config
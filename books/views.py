@@ -1,34 +1,127 @@
-from typing import IO, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Tuple
+import uuid
+import zipfile
+
+from django.conf import settings
 from django.http import (
+    Http404,
     HttpRequest,
     HttpResponse,
     HttpResponsePermanentRedirect,
     HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
 )
-from django.shortcuts import get_object_or_404, render, redirect
+from django.core.paginator import Paginator
+from django.shortcuts import aget_object_or_404, get_object_or_404, render, redirect
 from django.views import generic
 from django.contrib.auth import login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import (
+    etag,
+    require_GET,
+    require_http_methods,
+    require_POST,
+    require_safe,
+)
+
+from asgiref.sync import sync_to_async
+
+from books.tasks import on_book_file_uploaded, task_process_upload
 
-from books.tasks import task_process_notification
+from .aio import run_blocking
 
-from .storage import CsvFileExistsError, CsvFileValidationError, S3UploadFileManager
-from .models import BookFile
+from .cache import get_parsed_csv_cache
+from .chunked import (
+    ChunkedUploadError,
+    complete_upload,
+    init_upload,
+    session_report,
+    upload_chunk,
+)
+from .columnar import columnar_enabled, read_sidecar_rows
+from .export import EXPORT_FORMATS, ExportError, ExportQuery, iter_export
+from .metrics import CONTENT_TYPE, REGISTRY, metrics_settings, timer
+from .pagination import KeysetPaginationMixin
+from .search import search_books
+from .summary import SUMMARY_MAX_KEYS, SUMMARY_TOP, merge_summaries
+from .storage import (
+    CHUNK_SIZE,
+    CsvFileExistsError,
+    CsvFileValidationError,
+    UploadFileManagerInterface,
+    get_upload_file_manager,
+)
+from .models import BookFile, UploadSession
 from .forms import NewUserForm
 
 
-class IndexView(LoginRequiredMixin, generic.ListView):
+class IndexView(LoginRequiredMixin, KeysetPaginationMixin, generic.ListView):
     paginate_by = 10
     model = BookFile
+    ordering = ["date_uploaded", "id"]
     template_name = "books/index.html"
+    pagination_mode = settings.BOOKS_INDEX_PAGINATION
+
+    def get_queryset(self):
+        # The index doesn't show them, and both grow with the size of a list
+        return super().get_queryset().defer("row_index", "summary")
+
+
+DETAIL_PAGE_SIZE = 50
+DETAIL_MAX_PAGE_SIZE = 500
+
+
+class BookFileRows:
+    """Sequence over the rows of a BookFile for Paginator, which only fetches the slice
+    asked for, from the parsed CSV cache or else from storage, preferring the columnar
+    sidecar when there is one."""
+
+    def __init__(self, manager: UploadFileManagerInterface, book_file: BookFile):
+        self.manager = manager
+        self.book_file = book_file
+
+    def count(self) -> int:
+        return self.book_file.row_count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice):
+        start, stop, _ = key.indices(self.count())
+        if stop <= start:
+            return []
+        return get_parsed_csv_cache().get_or_load(
+            self.book_file.md5_checksum,
+            f"{start}:{stop}",
+            lambda: self._load(start, stop - start),
+        )
+
+    def _load(self, start: int, count: int):
+        if self.book_file.has_columnar_sidecar and columnar_enabled():
+            return read_sidecar_rows(self.manager, self.book_file, start, count)
+        return self.manager.retrieve_rows(self.book_file, start, count)
+
+
+def _page_size(request: HttpRequest) -> int:
+    try:
+        page_size = int(request.GET.get("page_size", DETAIL_PAGE_SIZE))
+    except ValueError:
+        return DETAIL_PAGE_SIZE
+    return min(max(page_size, 1), DETAIL_MAX_PAGE_SIZE)
 
 
 @login_required
 def detail(request: HttpRequest, pk: int) -> HttpResponse:
     """Returns details of BookFile from Database row and S3 File. Allow contents of cvs to to
-    displayed on page.
+    displayed on page, one page of rows at a time, selected with ?page= and ?page_size=.
 
     Args:
         request (HttpRequest): Http Request
@@ -38,14 +131,299 @@ def detail(request: HttpRequest, pk: int) -> HttpResponse:
         HttpResponse: Page to display
     """
     book_list = get_object_or_404(BookFile, pk=pk)
-    manager = S3UploadFileManager()
-    s3_file = manager.retrieve(book_list)
-    csv_row_list = manager.csv_file_object_to_dict(s3_file)
+    if not book_list.is_complete:
+        # Still being processed by task_process_upload, nothing in storage to show yet
+        return render(request, "books/detail.html", {"book_list": book_list})
+    manager = get_upload_file_manager()
+    if not book_list.row_index:
+        # Uploaded before row indexes were recorded, index once and keep it
+        manager.build_row_index(book_list)
+        book_list.save(update_fields=["row_count", "row_index", "summary"])
+    page_size = _page_size(request)
+    page_obj = Paginator(BookFileRows(manager, book_list), page_size).get_page(
+        request.GET.get("page")
+    )
     return render(
         request,
         "books/detail.html",
-        {"book_list": book_list, "csv_row_list": csv_row_list["rows"]},
+        {
+            "book_list": book_list,
+            "csv_row_list": page_obj.object_list,
+            "page_obj": page_obj,
+            "page_extra": f"page_size={page_size}",
+        },
+    )
+
+
+@login_required
+async def detail_async(request: HttpRequest, pk: int) -> HttpResponse:
+    """Async version of detail for ASGI, fetching rows on the storage thread pool so the
+    event loop is free while S3 responds.
+
+    Args:
+        request (HttpRequest): Http Request
+        pk (int): id of BookList
+
+    Returns:
+        HttpResponse: Page to display
+    """
+    book_list = await aget_object_or_404(BookFile, pk=pk)
+    if not book_list.is_complete:
+        return await sync_to_async(render)(
+            request, "books/detail.html", {"book_list": book_list}
+        )
+    manager = get_upload_file_manager()
+    if not book_list.row_index:
+        await run_blocking(manager.build_row_index, book_list)
+        await book_list.asave(update_fields=["row_count", "row_index", "summary"])
+    page_size = _page_size(request)
+    paginator = Paginator(BookFileRows(manager, book_list), page_size)
+    # The page's rows are fetched as it is built
+    page_obj = await run_blocking(paginator.get_page, request.GET.get("page"))
+    # Rendering reads request.user, which is loaded with a blocking query
+    return await sync_to_async(render)(
+        request,
+        "books/detail.html",
+        {
+            "book_list": book_list,
+            "csv_row_list": page_obj.object_list,
+            "page_obj": page_obj,
+            "page_extra": f"page_size={page_size}",
+        },
+    )
+
+
+@login_required
+def upload_status(request: HttpRequest, pk: int) -> JsonResponse:
+    """Report the progress of an upload, for clients to poll after an async upload.
+
+    Args:
+        request (HttpRequest): Http Request
+        pk (int): id of BookList
+
+    Returns:
+        JsonResponse: Status, message and progress of the upload
+    """
+    book_list = get_object_or_404(BookFile, pk=pk)
+    return JsonResponse(
+        {
+            "id": book_list.id,
+            "status": book_list.status,
+            "message": book_list.status_message,
+            "bytes_processed": book_list.bytes_processed,
+            "file_size": book_list.file_size,
+            "progress": book_list.progress_percent,
+        }
+    )
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int] | None:
+    """Parse a Range header for a single byte range of a file of size bytes.
+
+    Args:
+        header (str): Range header, e.g. "bytes=0-499", "bytes=500-" or "bytes=-500"
+        size (int): Size of the file
+
+    Returns:
+        Tuple[int, int] | None: First and last byte of the range, or None when the header is
+            missing, malformed or asks for several ranges, so the whole file should be sent
+
+    Raises:
+        ValueError: The range starts beyond the end of the file
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    if not (start + end).isdigit():
+        return None
+    if not start:
+        # Suffix range, the last n bytes
+        if int(end) == 0:
+            raise ValueError(header)
+        return max(0, size - int(end)), size - 1
+    first, last = int(start), int(end) if end else size - 1
+    if first >= size:
+        raise ValueError(header)
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def _iter_body(body: IO, length: int | None) -> Iterator[bytes]:
+    """Stream length bytes, or all, of a stored file in chunks and close it."""
+    try:
+        while length is None or length > 0:
+            chunk = body.read(CHUNK_SIZE if length is None else min(length, CHUNK_SIZE))
+            if not chunk:
+                break
+            if length is not None:
+                length -= len(chunk)
+            yield chunk
+    finally:
+        body.close()
+
+
+def _download_etag(request: HttpRequest, pk: int) -> str | None:
+    return (
+        BookFile.objects.filter(pk=pk, status=BookFile.Status.COMPLETE)
+        .values_list("md5_checksum", flat=True)
+        .first()
+    )
+
+
+@login_required
+@require_safe
+@etag(_download_etag)
+def download(request: HttpRequest, pk: int) -> HttpResponse:
+    """Stream the uploaded CSV of a BookFile from storage.
+
+    Uploaded files never change, so the md5_checksum is the ETag: a matching If-None-Match
+    gets a 304 without touching storage, and the response may be cached for a long time, see
+    settings.BOOKS_DOWNLOAD_CACHE_CONTROL. A single byte Range is served as a 206, fetching
+    only that range from storage.
+
+    Args:
+        request (HttpRequest): Http Request
+        pk (int): id of BookList
+
+    Returns:
+        HttpResponse: Streamed file, part of it, or a 416 if the range is past the end
+    """
+    book_file = get_object_or_404(BookFile, pk=pk, status=BookFile.Status.COMPLETE)
+    manager = get_upload_file_manager()
+    size = book_file.file_size
+    byte_range = None
+    # If-Range asks for the range only if the file is unchanged, otherwise for all of it
+    if_range = request.headers.get("If-Range")
+    if size and (if_range is None or if_range == f'"{book_file.md5_checksum}"'):
+        try:
+            byte_range = parse_range(request.headers.get("Range", ""), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    if byte_range is None:
+        response = StreamingHttpResponse(
+            _iter_body(manager.retrieve(book_file), size or None),
+            content_type="text/csv",
+        )
+        if size:
+            response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_body(manager.retrieve_range(book_file, start, end), end - start + 1),
+            status=206,
+            content_type="text/csv",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = settings.BOOKS_DOWNLOAD_CACHE_CONTROL
+    response["Content-Disposition"] = content_disposition_header(
+        True, Path(book_file.file_name).name
     )
+    return response
+
+
+@login_required
+@require_safe
+def export(request: HttpRequest, pk: int) -> HttpResponse:
+    """Stream the rows of a BookFile matching filters as CSV or NDJSON, with only the columns
+    asked for, reading them from storage as they are sent. See ExportQuery for the parameters,
+    e.g. ?format=ndjson&columns=title,author&publisher=Penguin&published__gte=1980-01-01
+
+    Args:
+        request (HttpRequest): Http Request
+        pk (int): id of BookList
+
+    Returns:
+        HttpResponse: Streamed rows, or a 400 with a message if the query is invalid
+    """
+    book_file = get_object_or_404(BookFile, pk=pk, status=BookFile.Status.COMPLETE)
+    try:
+        query = ExportQuery.from_params(request.GET)
+        chunks = iter_export(get_upload_file_manager().retrieve(book_file), query)
+    except ExportError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[query.format])
+    response["Content-Disposition"] = content_disposition_header(
+        True, f"{Path(book_file.file_name).stem}.{query.format}"
+    )
+    return response
+
+
+@login_required
+@require_GET
+def summary(request: HttpRequest) -> JsonResponse:
+    """Counts of books per author, publisher and publication year across the uploaded lists,
+    merged from the summary each list was given at upload, so no file is read.
+
+    Args:
+        request (HttpRequest): Http Request, optionally with "ids" of the lists to include,
+            comma separated, and "top", the number of authors and publishers to return
+
+    Returns:
+        JsonResponse: Merged summary, see merge_summaries, and the number of lists left out as
+            they have no summary yet
+    """
+    try:
+        top = min(max(int(request.GET.get("top", SUMMARY_TOP)), 1), SUMMARY_MAX_KEYS)
+        ids = (
+            [int(id) for id in request.GET["ids"].split(",")]
+            if request.GET.get("ids")
+            else None
+        )
+    except ValueError:
+        return JsonResponse({"message": "top and ids must be numbers."}, status=400)
+    book_files = BookFile.objects.filter(status=BookFile.Status.COMPLETE)
+    if ids is not None:
+        book_files = book_files.filter(pk__in=ids)
+    summaries = book_files.exclude(summary={}).values_list("summary", flat=True)
+    return JsonResponse(
+        {
+            **merge_summaries(summaries.iterator(), top),
+            "files_without_summary": book_files.filter(summary={}).count(),
+        }
+    )
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Metrics of this process in the Prometheus text format, for Prometheus to scrape.
+
+    Not behind a login, as scrapers don't have one; the endpoint is off when
+    BOOKS_METRICS["ENABLED"] is False, and can be restricted at the proxy.
+
+    Args:
+        request (HttpRequest): Http Request
+
+    Returns:
+        HttpResponse: Metrics, or 404 when they are disabled
+    """
+    if not metrics_settings()["ENABLED"]:
+        raise Http404("Metrics are disabled.")
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@login_required
+def search(request: HttpRequest) -> HttpResponse:
+    """Search titles, authors, publishers and identifiers across every uploaded book list.
+
+    Args:
+        request (HttpRequest): Http Request, with the words to find in ?q=
+
+    Returns:
+        HttpResponse: Page to display, each result linking to its row in the source BookFile
+    """
+    query = request.GET.get("q", "").strip()
+    books = search_books(query) if query else []
+    results = [
+        {"book": book, "page": book.row_number // DETAIL_PAGE_SIZE + 1}
+        for book in books
+    ]
+    return render(request, "books/search.html", {"query": query, "results": results})
 
 
 def register_request(request: HttpRequest) -> HttpResponse | HttpResponseRedirect:
@@ -82,7 +460,7 @@ def upload_file_to_cloud(upload: IO) -> Tuple[bool, str | None, BookFile | None]
     Returns:
         Tuple(bool, str): Details of Success or failure
     """
-    manager = S3UploadFileManager()
+    manager = get_upload_file_manager()
     is_success = True
     message, db_book_file = None, None
     try:
@@ -100,6 +478,34 @@ def upload_file_to_cloud(upload: IO) -> Tuple[bool, str | None, BookFile | None]
     )
 
 
+def stage_upload(upload) -> BookFile:
+    """Save an upload to local staging and queue it for processing by Celery.
+
+    Args:
+        upload (UploadedFile): File uploaded to the view
+
+    Returns:
+        BookFile: Saved BookFile with a pending status
+    """
+    staging_dir = Path(settings.BOOKS_UPLOAD_STAGING_DIR)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    staged_path = staging_dir / f"{uuid.uuid4()}.csv"
+    with timer("stage"), open(staged_path, "wb") as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    db_book_file = BookFile.objects.create(
+        file_name=upload.name,
+        s3_url="",
+        date_uploaded=timezone.now(),
+        md5_checksum="",
+        file_size=upload.size,
+        status=BookFile.Status.PENDING,
+    )
+    with timer("enqueue"):
+        task_process_upload.delay(db_book_file.id, str(staged_path))
+    return db_book_file
+
+
 @login_required
 def upload(
     request: HttpRequest,
@@ -110,6 +516,10 @@ def upload(
 
     If successful will trigger a Celery Task to send S3 Url to 3rd Party Interface as Async.
 
+    In async mode (the "async" form field, or settings.BOOKS_ASYNC_UPLOADS) the file is only
+    staged locally, and validation and upload happen in a Celery task which the detail page and
+    the upload_status endpoint report progress of.
+
     Args:
         request (HttpRequest): Http Request
 
@@ -117,18 +527,272 @@ def upload(
         HttpResponseRedirect | HttpResponsePermanentRedirect: Will Redirect to required page.
     """
     if request.method == "POST" and request.FILES["upload"]:
+        default_async = "1" if settings.BOOKS_ASYNC_UPLOADS else ""
+        if request.POST.get("async", default_async) == "1":
+            db_book_file = stage_upload(request.FILES["upload"])
+            messages.info(request, f"Processing {db_book_file.file_name}.")
+            return redirect("books:detail", db_book_file.id)
         uploade_success, upload_message, db_book_file = upload_file_to_cloud(
             request.FILES["upload"]
         )
         if not uploade_success:
             messages.error(request, upload_message)
             return redirect("books:index")
-        db_book_file.save()
-        saved_db_book_file = BookFile.objects.filter(s3_url=db_book_file.s3_url).first()
         messages.info(request, f"You have successfully create {db_book_file}.")
-        # Don't waste url time with notification can be handled by celery
-        task_process_notification.delay(db_book_file.s3_url)
-        return redirect("books:detail", saved_db_book_file.id)
+        on_book_file_uploaded(db_book_file)
+        return redirect("books:detail", db_book_file.id)
 
     messages.info(request, "No file was uploaded.")
     return redirect("books:index")
+
+
+@login_required
+async def upload_async(
+    request: HttpRequest,
+) -> HttpResponseRedirect | HttpResponsePermanentRedirect:
+    """Async version of upload for ASGI. The file is validated and sent to storage on the
+    storage thread pool, and the BookFile saved through sync_to_async.
+
+    Args:
+        request (HttpRequest): Http Request
+
+    Returns:
+        HttpResponseRedirect | HttpResponsePermanentRedirect: Will Redirect to required page.
+    """
+    if request.method == "POST" and request.FILES.get("upload"):
+        upload = request.FILES["upload"]
+        default_async = "1" if settings.BOOKS_ASYNC_UPLOADS else ""
+        if request.POST.get("async", default_async) == "1":
+            db_book_file = await sync_to_async(stage_upload)(upload)
+            messages.info(request, f"Processing {db_book_file.file_name}.")
+            return redirect("books:detail", db_book_file.id)
+        manager = get_upload_file_manager()
+        try:
+            db_book_file = await run_blocking(manager.upload, upload, commit=False)
+            await sync_to_async(manager.save_or_discard)(db_book_file)
+        except (CsvFileExistsError, CsvFileValidationError) as e:
+            messages.error(
+                request, f"Failed to upload {upload.name} due to validation - {e}."
+            )
+            return redirect("books:index")
+        except Exception as e:
+            messages.error(
+                request, f"Failed Unexpectedly to Upload {upload.name} - {e}."
+            )
+            return redirect("books:index")
+        messages.info(request, f"You have successfully create {db_book_file}.")
+        await run_blocking(on_book_file_uploaded, db_book_file)
+        return redirect("books:detail", db_book_file.id)
+
+    messages.info(request, "No file was uploaded.")
+    return redirect("books:index")
+
+
+def iter_bulk_upload_files(files: List[Any]) -> Iterator[Tuple[str, Callable[[], IO]]]:
+    """Yield the name and an opener of every CSV in a bulk upload, expanding ZIP archives into
+    their CSV members. Members are opened by the worker uploading them, so each is streamed
+    straight out of the archive without being extracted first."""
+    for upload in files:
+        if zipfile.is_zipfile(upload):
+            archive = zipfile.ZipFile(upload)
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.lower().endswith(".csv"):
+                    yield member.filename, lambda a=archive, m=member: a.open(m)
+        else:
+            upload.seek(0)
+            yield upload.name, lambda u=upload: u
+
+
+def _duplicate_message(name: str) -> str:
+    return f"Failed to upload {name} due to validation - File already been upload to system.."
+
+
+def bulk_upload_to_cloud(files: List[Any]) -> List[Dict[str, Any]]:
+    """Upload many CSV files concurrently and save their BookFiles with one bulk_create.
+
+    Files are hashed, validated and uploaded by a pool of settings.BOOKS_BULK_UPLOAD_WORKERS
+    threads. Duplicates within the batch are dropped before the bulk_create. If it is rejected
+    by the unique md5_checksum index, because some file had already been uploaded, each
+    BookFile is saved on its own so only the duplicates are removed from storage again.
+
+    Args:
+        files (List[Any]): Uploaded CSV files or ZIP archives of CSV files
+
+    Returns:
+        List[Dict[str, Any]]: Result for each CSV, in upload order
+    """
+    manager = get_upload_file_manager()
+
+    def upload_one(name: str, opener: Callable[[], IO]) -> Dict[str, Any]:
+        try:
+            with opener() as file:
+                book_file = manager.upload(file, commit=False)
+            book_file.file_name = name[
+                : BookFile._meta.get_field("file_name").max_length
+            ]
+            return {"file_name": name, "book_file": book_file}
+        except CsvFileValidationError as e:
+            return {
+                "file_name": name,
+                "error": f"Failed to upload {name} due to validation - {e}.",
+            }
+        except Exception as e:
+            return {
+                "file_name": name,
+                "error": f"Failed Unexpectedly to Upload {name} - {e}.",
+            }
+
+    with ThreadPoolExecutor(max_workers=settings.BOOKS_BULK_UPLOAD_WORKERS) as executor:
+        results = list(
+            executor.map(lambda item: upload_one(*item), iter_bulk_upload_files(files))
+        )
+
+    seen = set()
+    new_results = []
+    for result in results:
+        if "book_file" not in result:
+            continue
+        if result["book_file"].md5_checksum in seen:
+            manager.discard(result.pop("book_file"))
+            result["error"] = _duplicate_message(result["file_name"])
+        else:
+            seen.add(result["book_file"].md5_checksum)
+            new_results.append(result)
+    try:
+        with transaction.atomic():
+            BookFile.objects.bulk_create(
+                [result["book_file"] for result in new_results]
+            )
+    except IntegrityError:
+        for result in new_results:
+            try:
+                manager.save_or_discard(result["book_file"])
+            except CsvFileExistsError:
+                del result["book_file"]
+                result["error"] = _duplicate_message(result["file_name"])
+    for result in new_results:
+        if "book_file" in result:
+            on_book_file_uploaded(result["book_file"])
+
+    report = []
+    for result in results:
+        if "book_file" in result:
+            report.append(
+                {
+                    "file_name": result["file_name"],
+                    "success": True,
+                    "id": result["book_file"].id,
+                    "md5_checksum": result["book_file"].md5_checksum,
+                    "row_count": result["book_file"].row_count,
+                }
+            )
+        else:
+            report.append(
+                {
+                    "file_name": result["file_name"],
+                    "success": False,
+                    "message": result["error"],
+                }
+            )
+    return report
+
+
+@login_required
+@require_POST
+def bulk_upload(request: HttpRequest) -> JsonResponse:
+    """Upload several CSV files, or ZIP archives of CSV files, in one request.
+
+    Args:
+        request (HttpRequest): Http Request, with the files in the "upload" field
+
+    Returns:
+        JsonResponse: Report with the result for each CSV
+    """
+    files = request.FILES.getlist("upload")
+    if not files:
+        return JsonResponse(
+            {"message": "No file was uploaded.", "results": []}, status=400
+        )
+    report = bulk_upload_to_cloud(files)
+    return JsonResponse(
+        {
+            "uploaded": sum(result["success"] for result in report),
+            "failed": sum(not result["success"] for result in report),
+            "results": report,
+        }
+    )
+
+
+@login_required
+@require_POST
+def chunked_upload_init(request: HttpRequest) -> JsonResponse:
+    """Start a resumable upload of a file, which is then sent in chunks.
+
+    Args:
+        request (HttpRequest): Http Request, with the "file_name" and "file_size" in bytes
+
+    Returns:
+        JsonResponse: Id, chunk size and chunk count of the upload
+    """
+    try:
+        file_name = request.POST["file_name"]
+        file_size = int(request.POST["file_size"])
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"message": "file_name and file_size are required."}, status=400
+        )
+    try:
+        session = init_upload(
+            request.user, file_name, file_size, get_upload_file_manager()
+        )
+    except ChunkedUploadError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+    return JsonResponse(session_report(session), status=201)
+
+
+@login_required
+@require_http_methods(["PUT"])
+def chunked_upload_chunk(
+    request: HttpRequest, pk: uuid.UUID, part_number: int
+) -> JsonResponse:
+    """Store chunk part_number of a resumable upload, sent as the request body. Every chunk but
+    the last is chunk_size bytes, and a chunk can be sent again, e.g. after a dropped connection.
+
+    Returns:
+        JsonResponse: Status of the upload
+    """
+    session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+    try:
+        upload_chunk(session, part_number, request.read(), get_upload_file_manager())
+    except (ChunkedUploadError, CsvFileValidationError) as e:
+        return JsonResponse({**session_report(session), "message": str(e)}, status=400)
+    return JsonResponse(session_report(session))
+
+
+@login_required
+@require_POST
+def chunked_upload_complete(request: HttpRequest, pk: uuid.UUID) -> JsonResponse:
+    """Finish a resumable upload once every chunk has been sent, creating its BookFile.
+
+    Returns:
+        JsonResponse: Status of the upload, with the id of the BookFile
+    """
+    session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+    try:
+        book_file = complete_upload(session, get_upload_file_manager())
+    except (ChunkedUploadError, CsvFileValidationError, CsvFileExistsError) as e:
+        return JsonResponse({**session_report(session), "message": str(e)}, status=400)
+    on_book_file_uploaded(book_file)
+    return JsonResponse(session_report(session), status=201)
+
+
+@login_required
+@require_GET
+def chunked_upload_status(request: HttpRequest, pk: uuid.UUID) -> JsonResponse:
+    """Report which chunks of a resumable upload are still missing, for resuming it.
+
+    Returns:
+        JsonResponse: Status of the upload
+    """
+    session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+    return JsonResponse(session_report(session))